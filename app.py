@@ -1,102 +1,741 @@
 # app.py - Flask Demo Application for Password Strength Analyzer
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+import concurrent.futures
+import functools
+import hmac
 import json
+import math
 import os
-from models.password_analyzer import PasswordAnalyzer
+import threading
+import time
+import uuid
+from collections import deque
+from models.password_analyzer import PasswordAnalyzer, PasswordStrengthResult
 from models.genai import PasswordGenAI
+from models.llm_backend import AsyncRunner, HTTPLLMBackend
+from models.result_cache import AnalysisCache, LRUStore, UnixSocketCacheBackend
+from models.metrics import MetricsRegistry
+from models.profiler import SamplingProfiler
+from models.incremental import SessionStore
+from models.generator import PasswordGenerator
+from models.policy import PasswordPolicy, load_policies
+from models.leak_segments import BackgroundCompactor, is_store
+
+try:
+    import orjson
+except ImportError:  # Optional: several times faster than the json module on /analyze responses
+    orjson = None
 
 
 app = Flask(__name__)
 
-# Initialize components
+# Per-stage timings and counters for GET /metrics. METRICS_ENABLED=0 turns
+# them off; the components then skip all timing.
+metrics = MetricsRegistry() if os.environ.get('METRICS_ENABLED', '1') != '0' else None
+
+# Cache results of repeated analyses (the UI re-sends the same password as users
+# backspace and retype). Set PASSWORD_CACHE_SOCKET to a running
+# `python -m models.result_cache serve` socket, and the same
+# PASSWORD_CACHE_SECRET in every worker, to share entries between workers.
+# Suggestions quote the password, so they are never shared; each worker
+# rebuilds them from the password it was sent.
+cache_socket = os.environ.get('PASSWORD_CACHE_SOCKET')
+cache_secret = os.environ.get('PASSWORD_CACHE_SECRET')
+result_cache = AnalysisCache(
+    max_size=10000,
+    ttl_seconds=300,
+    secret=cache_secret.encode() if cache_secret else None,
+    backend=UnixSocketCacheBackend(cache_socket) if cache_socket else None,
+    value_type=PasswordStrengthResult,
+    private_fields=('suggestions',)
+)
+
+# Initialize components. The dictionary, leak index and ML model are loaded on
+# first use, or all at once by preload(): gunicorn.conf.py calls it before
+# forking workers so they share one copy, and the dev server calls it below.
+# LEAK_DB_PATH may name an index file or a segmented store directory.
+leak_db_path = os.environ.get('LEAK_DB_PATH', 'data/leaked_passwords.db')
 analyzer = PasswordAnalyzer(
-    ml_model_path="models/password_strength_model.pkl", 
-    leaked_password_db_path="data/leaked_passwords.db"
+    ml_model_path="ml_model/strength_model.bin",
+    leaked_password_db_path=leak_db_path,
+    common_words_path="data/common_words.txt",
+    result_cache=result_cache,
+    metrics=metrics
+)
+
+# GenAI text comes from local heuristics unless GENAI_BACKEND_URL points at an
+# OpenAI-style chat completions endpoint. Backend calls run on a shared event
+# loop so they never hold a request thread longer than the slowest completion;
+# the local heuristics run on the request thread.
+genai_backend_url = os.environ.get('GENAI_BACKEND_URL')
+genai_model = os.environ.get('GENAI_MODEL', 'gpt-3.5-turbo')
+genai = PasswordGenAI(
+    model_name=genai_model,
+    backend=HTTPLLMBackend(
+        genai_backend_url,
+        model=genai_model,
+        api_key=os.environ.get('GENAI_API_KEY'),
+        timeout=float(os.environ.get('GENAI_TIMEOUT', '10'))
+    ) if genai_backend_url else None,
+    metrics=metrics
 )
-genai = PasswordGenAI()
+genai_runner = AsyncRunner()
+sessions = SessionStore(analyzer)
+
+# With a segmented store, merge its segments in the background every
+# LEAK_COMPACTION_INTERVAL seconds (0 leaves compaction to the CLI).
+# Several workers may run one; only one compaction runs at a time.
+leak_compaction_interval = float(os.environ.get('LEAK_COMPACTION_INTERVAL', '600'))
+if leak_compaction_interval > 0 and is_store(leak_db_path):
+    BackgroundCompactor(leak_db_path, leak_compaction_interval).start()
+generator = PasswordGenerator(analyzer)
+
+MAX_GENERATE_COUNT = 100
+
+# Longest password the API analyzes. Analysis time grows linearly with the
+# length, so this only bounds the work one request can ask for; no real
+# password comes close
+MAX_PASSWORD_LENGTH = 256
+
+# Fields of an analysis response. ?fields=a,b or ?mode=lite selects a subset,
+# and fields that aren't requested aren't computed: no suggestions, ML score
+# or GenAI calls unless asked for. Lite is what the live score display shows.
+RESULT_FIELDS = ('score', 'time_to_crack', 'vulnerability_factors', 'patterns_detected',
+                 'is_compromised', 'is_leaked_variant', 'attack_vector', 'suggestions', 'ml_strength')
+GENAI_FIELDS = ('improved_password', 'reasoning', 'improvement_explanation')
+LITE_FIELDS = frozenset({'score', 'time_to_crack', 'attack_vector'})
+
+# k-anonymity range queries: clients send only this many leading hex characters
+# of their password's digest. Responses change only when the leak index is
+# rebuilt, which changes its build id and so every ETag.
+RANGE_PREFIX_LENGTH = 5
+RANGE_CACHE_MAX_AGE = 86400
+
+# Requests sent with an X-Profile header equal to PROFILER_TOKEN are sampled;
+# the collapsed stacks are kept for an hour under the X-Profile-Id returned.
+# Unset, the header is ignored.
+PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+profiles = LRUStore(max_size=32, ttl_seconds=3600)
+
+# Named (per-tenant) policies for /policy/check, compiled at startup from the
+# JSON file at POLICY_FILE. Requests may also send a policy inline.
+policy_file = os.environ.get('POLICY_FILE', 'data/policies.json')
+policies = load_policies(policy_file) if os.path.exists(policy_file) else {}
+MAX_POLICY_BATCH = 10000
+
+# Passwords per /analyze_batch request; larger audits belong in audit.py
+MAX_BATCH_SIZE = 10000
+
+_preload_lock = threading.Lock()
+_preload_thread = None
+
+def preload():
+    """Load every heavy resource now and return the startup report"""
+    analyzer.preload()
+    generator.preload()
+    return startup_report()
+
+def startup_report():
+    """Seconds each heavy resource took to load, and whether all of them are loaded"""
+    load_times = {**analyzer.load_times, **generator.load_times}
+    return {
+        'ready': analyzer.is_ready() and generator.is_ready(),
+        'load_seconds': {name: round(seconds, 4) for name, seconds in load_times.items()},
+        'total_load_seconds': round(sum(load_times.values()), 4)
+    }
+
+def after_fork():
+    """Make the shared components safe to use in a process forked from this one while it serves
+
+    Other threads of the parent may hold locks at the fork, and the GenAI
+    backend's connections and event loop belong to the parent.
+    """
+    global _preload_lock
+    _preload_lock = threading.Lock()
+    analyzer.after_fork()
+    generator.after_fork()
+    if genai.backend is not None:
+        genai.backend.after_fork()
+    genai_runner.after_fork()
+
+def _preload_in_background():
+    """Start preload() on a background thread unless it has already been started"""
+    global _preload_thread
+    with _preload_lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(target=preload, name='preload', daemon=True)
+            _preload_thread.start()
+
+def _profiler_authorized():
+    token = request.headers.get('X-Profile')
+    return bool(PROFILER_TOKEN and token and hmac.compare_digest(token.encode(), PROFILER_TOKEN.encode()))
+
+def _register_app_metrics(registry):
+    """Request latency, plus the counters the cache, leak filter and loader already keep"""
+    registry.request_seconds = registry.histogram(
+        'http_request_seconds', 'Time to produce each response, excluding streamed bodies',
+        ['route', 'method', 'status'])
+    registry.callback(
+        'password_cache_events_total', 'Analysis result cache lookups and removals, by event',
+        'counter', ['event'], lambda: [((event,), value) for event, value in result_cache.stats().items()
+                                       if event not in ('hit_rate', 'size')])
+    registry.callback(
+        'password_cache_entries', 'Analysis results currently cached in this worker',
+        'gauge', [], lambda: [((), result_cache.stats()['size'])])
+    registry.callback(
+        'password_leak_filter_events_total', 'Bloom prefilter outcomes of leak checks',
+        'counter', ['event'], _leak_filter_events)
+    registry.callback(
+        'password_resource_load_seconds', 'Seconds each heavy resource took to load',
+        'gauge', ['resource'], lambda: [((name,), seconds) for name, seconds in
+                                        {**analyzer.load_times, **generator.load_times}.items()])
+
+def _leak_filter_events():
+    # Only a filtered index keeps counters, and loading it here would defeat lazy loading
+    if not analyzer.is_ready('leak_index') or not hasattr(analyzer.leak_index, 'stats'):
+        return []
+    stats = analyzer.leak_index.stats()
+    return [((event,), stats[event]) for event in ('filter_hits', 'filter_misses', 'false_positives')]
+
+if metrics is not None:
+    _register_app_metrics(metrics)
+
+@app.before_request
+def _start_request_instrumentation():
+    if metrics is not None:
+        g.request_started = time.perf_counter()
+    if PROFILER_TOKEN and _profiler_authorized():
+        g.profiler = SamplingProfiler(threading.get_ident()).start()
+
+@app.after_request
+def _finish_request_instrumentation(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        profile_id = uuid.uuid4().hex
+        profiles.set(profile_id.encode(), profiler.collapsed())
+        response.headers['X-Profile-Id'] = profile_id
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.request_seconds.observe(time.perf_counter() - started, route, request.method,
+                                        str(response.status_code))
+    return response
 
 @app.route('/')
 def index():
     """Render the main application page"""
     return render_template('index.html')
 
+@app.route('/healthz')
+def healthz():
+    """Readiness probe: 200 once every heavy resource is loaded, 503 while loading
+    
+    A worker that was never preloaded starts loading on its first probe.
+    """
+    report = startup_report()
+    if not report['ready']:
+        _preload_in_background()
+    report['status'] = 'ready' if report['ready'] else 'loading'
+    return jsonify(report), 200 if report['ready'] else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Every metric in the Prometheus text format; 404 when METRICS_ENABLED=0"""
+    if metrics is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profile/<profile_id>')
+def debug_profile(profile_id):
+    """Collapsed stacks of a profiled request, for flamegraph.pl or speedscope"""
+    if not _profiler_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    collapsed = profiles.get(profile_id.encode())
+    if collapsed is None:
+        return jsonify({'error': 'Profile not found or expired'}), 404
+    return Response(collapsed, mimetype='text/plain')
+
+if orjson is not None:
+    def _dumps(data):
+        return orjson.dumps(data)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    
+    def _dumps(data):
+        return _encoder.encode(data).encode()
+
+def _json_response(data, status=200):
+    """Serialize `data` with orjson if it is installed, otherwise with the compact json encoder
+    
+    Unlike jsonify, this skips key sorting, which the hot endpoints don't need.
+    """
+    return Response(_dumps(data), status=status, mimetype='application/json')
+
+def _requested_fields(default=RESULT_FIELDS + GENAI_FIELDS):
+    """The response fields selected by ?fields= or ?mode=, or `default`
+    
+    Raises ValueError for an unknown field or mode.
+    """
+    return _select_fields(request.args, default)
+
+def _select_fields(args, default=RESULT_FIELDS + GENAI_FIELDS):
+    """_requested_fields for any mapping of query arguments"""
+    fields = args.get('fields')
+    if fields is not None:
+        selected = frozenset(name.strip() for name in fields.split(',') if name.strip())
+        unknown = selected.difference(RESULT_FIELDS, GENAI_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return selected
+    mode = args.get('mode', 'full')
+    if mode == 'lite':
+        return LITE_FIELDS
+    if mode != 'full':
+        raise ValueError('mode must be "full" or "lite"')
+    return frozenset(default)
+
+def _password_error(password):
+    """Why the API won't analyze `password`, or None if it will"""
+    if not isinstance(password, str):
+        return 'password must be a string'
+    if len(password) > MAX_PASSWORD_LENGTH:
+        return f'password may be at most {MAX_PASSWORD_LENGTH} characters'
+    return None
+
 @app.route('/analyze', methods=['POST'])
 def analyze_password():
-    """Analyze password strength and return results"""
-    data = request.get_json()
+    """Analyze password strength and return results
+    
+    ?mode=lite returns only the score, time to crack and attack vector;
+    ?fields=score,reasoning,... picks any set of fields.
+    """
+    try:
+        fields = _requested_fields()
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'The body must be a JSON object'}), 400
     password = data.get('password', '')
+    error = _password_error(password)
+    if error is not None:
+        return jsonify({'error': error}), 400
     
     if not password:
-        return jsonify({
-            'score': 0,
-            'time_to_crack': 'instant',
-            'vulnerability_factors': ['Empty password'],
-            'suggestions': ['Please enter a password'],
-            'reasoning': 'An empty password provides no security.'
-        })
+        return _json_response(_empty_password_response(fields))
         
-    # Analyze using core engine
-    result = analyzer.analyze_password(password)
-    
-    # Generate GenAI reasoning and improved suggestion
-    improved_password, improvement_explanation = genai.generate_suggestion(password)
-    weakness_reasoning = genai.generate_reason_for_weakness(
-        password, 
-        result.time_to_crack,
-        result.attack_vector
-    )
-    
-    # Prepare response
-    response = {
-        'score': result.score,
-        'time_to_crack': result.time_to_crack,
-        'vulnerability_factors': result.vulnerability_factors,
-        'patterns_detected': result.patterns_detected,
-        'is_compromised': result.is_compromised,
-        'attack_vector': result.attack_vector,
-        'suggestions': result.suggestions,
-        'improved_password': improved_password,
-        'reasoning': weakness_reasoning,
-        'improvement_explanation': improvement_explanation
+    # Analyze using core engine; the features are shared with the GenAI calls.
+    # Without GenAI, a cached result needs no feature extraction at all.
+    features = analyzer.extract_features(password) if not fields.isdisjoint(GENAI_FIELDS) else None
+    result = analyzer.analyze_password(password, features=features,
+                                       include_suggestions='suggestions' in fields,
+                                       include_ml_strength='ml_strength' in fields)
+    
+    if request.args.get('stream') == 'true' or request.accept_mimetypes.best == 'text/event-stream':
+        return _stream_analysis(password, result, features, fields)
+    
+    return _json_response(_build_response(password, result, fields, features))
+
+def _empty_password_response(fields):
+    return {name: value for name, value in {
+        'score': 0,
+        'time_to_crack': 'instant',
+        'vulnerability_factors': ['Empty password'],
+        'suggestions': ['Please enter a password'],
+        'reasoning': 'An empty password provides no security.'
+    }.items() if name in fields}
+
+def _completed(value):
+    future = concurrent.futures.Future()
+    future.set_result(value)
+    return future
+
+def _submit_genai(password, result, features=None, fields=GENAI_FIELDS):
+    """Start the GenAI suggestion and reasoning that `fields` needs
+    
+    With an LLM backend both calls run concurrently on the shared event loop.
+    Without one the text is local string work, so it is done right here
+    rather than queued behind other requests on the loop's single thread.
+    Returns the (suggestion, reasoning) futures, None for a call that isn't needed.
+    """
+    # Both calls share one feature extraction of the password
+    features = features or analyzer.extract_features(password)
+    suggestion = reasoning = None
+    if 'improved_password' in fields or 'improvement_explanation' in fields:
+        if genai.backend is None:
+            suggestion = _completed(genai.generate_suggestion(password, features))
+        else:
+            suggestion = genai_runner.submit(genai.agenerate_suggestion(password, features))
+    if 'reasoning' in fields:
+        if genai.backend is None:
+            reasoning = _completed(genai.generate_reason_for_weakness(
+                password, result.time_to_crack, result.attack_vector, features))
+        else:
+            reasoning = genai_runner.submit(genai.agenerate_reason_for_weakness(
+                password,
+                result.time_to_crack,
+                result.attack_vector,
+                features
+            ))
+    return suggestion, reasoning
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {_dumps(data).decode()}\n\n"
+
+def _stream_analysis(password, result, features, fields):
+    """Send the score as an SSE event right away, then one event per GenAI text as it completes"""
+    suggestion, reasoning = _submit_genai(password, result, features, fields)
+    
+    def generate():
+        yield _sse_event('analysis', _build_response(password, result, fields.difference(GENAI_FIELDS)))
+        pending = [future for future in (suggestion, reasoning) if future is not None]
+        for future in concurrent.futures.as_completed(pending):
+            if future is suggestion:
+                improved_password, improvement_explanation = future.result()
+                data = {'improved_password': improved_password,
+                        'improvement_explanation': improvement_explanation}
+            else:
+                data = {'reasoning': future.result()}
+            yield _sse_event('genai', data)
+        yield _sse_event('done', {})
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _build_response(password, result, fields=frozenset(RESULT_FIELDS), features=None):
+    """Convert an analysis result into the JSON payload returned by the API
+    
+    Only `fields` are included; GenAI text is generated only if one of its fields is.
+    """
+    response = {name: getattr(result, name) for name in RESULT_FIELDS if name in fields}
+    
+    if not fields.isdisjoint(GENAI_FIELDS):
+        # Generate GenAI reasoning and improved suggestion concurrently
+        suggestion, reasoning = _submit_genai(password, result, features, fields)
+        if suggestion is not None:
+            improved_password, improvement_explanation = suggestion.result()
+            if 'improved_password' in fields:
+                response['improved_password'] = improved_password
+            if 'improvement_explanation' in fields:
+                response['improvement_explanation'] = improvement_explanation
+        if reasoning is not None:
+            response['reasoning'] = reasoning.result()
+        
+    return response
+
+def _batch_error(passwords):
+    """Why a JSON batch can't be analyzed, or None if it can"""
+    if not isinstance(passwords, list) or not all(isinstance(password, str) for password in passwords):
+        return 'passwords must be a list of strings'
+    if len(passwords) > MAX_BATCH_SIZE:
+        return f'At most {MAX_BATCH_SIZE} passwords per request'
+    if any(len(password) > MAX_PASSWORD_LENGTH for password in passwords):
+        return f'Passwords may be at most {MAX_PASSWORD_LENGTH} characters'
+    return None
+
+def _ndjson_items(lines):
+    """Yield (password, error) for each NDJSON line, a JSON string or {"password": ...} object
+    
+    Lines are read as they arrive, so a bad line can't fail the whole
+    request: it gets an error (and no password) and the stream goes on.
+    After MAX_BATCH_SIZE passwords, one error item ends the batch.
+    """
+    count = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if count == MAX_BATCH_SIZE:
+            yield None, f'At most {MAX_BATCH_SIZE} passwords per request'
+            return
+        count += 1
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield None, 'Invalid JSON line'
+            continue
+        password = item.get('password', '') if isinstance(item, dict) else item
+        error = _password_error(password)
+        yield (password, None) if error is None else (None, error)
+
+def _batch_result_lines(items, fields, include_suggestions, offset=0):
+    """Yield one NDJSON line per (password, error) item, numbered from `offset`
+    
+    The valid passwords are analyzed together with analyze_many; each error
+    item becomes an {"error": ..., "index": n} line in its place.
+    """
+    pending = deque()
+    
+    def valid_passwords():
+        for item in items:
+            pending.append(item)
+            if item[1] is None:
+                yield item[0]
+    
+    def error_lines():
+        nonlocal index
+        while pending and pending[0][1] is not None:
+            yield _dumps({'error': pending.popleft()[1], 'index': index}) + b'\n'
+            index += 1
+    
+    index = offset
+    results = analyzer.analyze_many(valid_passwords(), include_suggestions=include_suggestions,
+                                    include_ml_strength='ml_strength' in fields)
+    for result in results:
+        yield from error_lines()
+        password, _ = pending.popleft()
+        response = _build_response(password, result, fields if password else fields.difference(GENAI_FIELDS))
+        response['index'] = index
+        index += 1
+        yield _dumps(response) + b'\n'
+    yield from error_lines()
+
+def _batch_options(args):
+    """The response fields and whether to generate suggestions for a batch, from query arguments
+    
+    Raises ValueError for an unknown field or mode.
+    """
+    include_genai = args.get('genai', 'false').lower() == 'true'
+    fields = _select_fields(args, RESULT_FIELDS + GENAI_FIELDS if include_genai else RESULT_FIELDS)
+    include_suggestions = 'suggestions' in fields and (
+        'fields' in args or args.get('suggestions', 'false').lower() == 'true')
+    return fields, include_suggestions
+
+@app.route('/analyze_batch', methods=['POST'])
+def analyze_batch():
+    """Analyze many passwords and stream one NDJSON result line per password
+    
+    GenAI text and suggestions are left out unless ?genai=true or
+    ?suggestions=true; ?fields= and ?mode= select fields as for /analyze.
+    A JSON body is validated up front; an NDJSON line that isn't a valid
+    password gets an {"error": ..., "index": n} line instead of a result.
+    """
+    try:
+        fields, include_suggestions = _batch_options(request.args)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    
+    if request.mimetype == 'application/x-ndjson':
+        # Read as it arrives
+        items = _ndjson_items(request.stream)
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'The body must be a JSON object with a passwords list'}), 400
+        passwords = data.get('passwords', [])
+        error = _batch_error(passwords)
+        if error is not None:
+            return jsonify({'error': error}), 400
+        items = ((password, None) for password in passwords)
+    
+    lines = _batch_result_lines(items, fields, include_suggestions)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+@functools.lru_cache(maxsize=256)
+def _compile_inline_policy(spec_json):
+    """Compile an inline policy once per distinct specification"""
+    return PasswordPolicy(json.loads(spec_json))
+
+def _policy_response(result):
+    return {
+        'compliant': result.compliant,
+        'violations': [{'rule': violation.rule, 'message': violation.message} for violation in result.violations]
     }
+
+@app.route('/policy/check', methods=['POST'])
+def policy_check():
+    """Check passwords against a named or inline password policy
+    
+    The body is {"policy": "<name>" or {...rules}, "password": "..."}, or
+    "passwords": [...] instead of "password" for a batch. Each password stops
+    at its first violation, before any costlier rule runs, unless ?all=true.
+    """
+    data = request.get_json(silent=True) or {}
+    fail_fast = request.args.get('all', 'false').lower() != 'true'
+    payload, status = _check_policy(data, fail_fast)
+    return _json_response(payload, status)
+
+def _check_policy(data, fail_fast):
+    """The /policy/check payload and status code for a request body"""
+    if not isinstance(data, dict):
+        return {'error': 'The body must be a JSON object'}, 400
+    policy = data.get('policy')
+    if isinstance(policy, str):
+        if policy not in policies:
+            return {'error': f'Unknown policy {policy!r}'}, 404
+        policy = policies[policy]
+    else:
+        try:
+            policy = _compile_inline_policy(json.dumps(policy, sort_keys=True))
+        except ValueError as error:
+            return {'error': str(error)}, 400
+    
+    if 'passwords' in data:
+        passwords = data['passwords']
+        if not isinstance(passwords, list) or not all(isinstance(password, str) for password in passwords):
+            return {'error': 'passwords must be a list of strings'}, 400
+        if len(passwords) > MAX_POLICY_BATCH:
+            return {'error': f'At most {MAX_POLICY_BATCH} passwords per request'}, 400
+        if any(len(password) > MAX_PASSWORD_LENGTH for password in passwords):
+            return {'error': f'Passwords may be at most {MAX_PASSWORD_LENGTH} characters'}, 400
+        results = policy.check_many(passwords, analyzer, fail_fast)
+        return {'results': [_policy_response(result) for result in results]}, 200
+    
+    error = _password_error(data.get('password'))
+    if error is not None:
+        return {'error': error}, 400
+    return _policy_response(policy.check(data['password'], analyzer, fail_fast)), 200
+
+@app.route('/range/<prefix>')
+def leak_range(prefix):
+    """Return every leaked digest suffix that shares a 5-hex-character prefix
+    
+    Modeled on the Pwned Passwords range API: the client hashes the password
+    with the algorithm named in the X-Hash-Algorithm header (sha256 unless
+    the index was built with sha1), sends the first five hex characters, and
+    checks for the rest of its digest among the returned lines. Neither the
+    password nor its full digest ever reaches the server. Passing ?hash=
+    makes a mismatched algorithm an error instead of a silent miss.
+    """
+    leak_index = analyzer.leak_index
+    hash_name = request.args.get('hash', leak_index.hash_name).lower()
+    if hash_name != leak_index.hash_name:
+        return jsonify({'error': f'the leak index uses {leak_index.hash_name}, not {hash_name}'}), 400
+    if len(prefix) != RANGE_PREFIX_LENGTH or any(c not in '0123456789abcdefABCDEF' for c in prefix):
+        return jsonify({'error': f'prefix must be {RANGE_PREFIX_LENGTH} hex characters'}), 400
+    
+    prefix = prefix.upper()
+    body = ''.join(digest.hex().upper()[RANGE_PREFIX_LENGTH:] + '\r\n'
+                   for digest in leak_index.digests_with_prefix(prefix))
+    response = Response(body, mimetype='text/plain')
+    response.set_etag(f'{leak_index.build_id}-{hash_name}-{prefix}')
+    response.headers['Cache-Control'] = f'public, max-age={RANGE_CACHE_MAX_AGE}'
+    response.headers['X-Hash-Algorithm'] = hash_name
+    # Answers 304 Not Modified when the client's If-None-Match matches
+    return response.make_conditional(request)
+
+@app.route('/leak_check', methods=['POST'])
+def leak_check():
+    """Return whether a password is leaked, or a simple variant of a leaked one
     
-    return jsonify(response)
+    For API clients that can't hash; the page checks leaks through /range,
+    so the password never leaves the browser for it.
+    """
+    data = request.get_json(silent=True)
+    password = data.get('password') if isinstance(data, dict) else None
+    error = _password_error(password)
+    if error is not None:
+        return jsonify({'error': error}), 400
+    is_compromised, is_leaked_variant = analyzer.leak_status(password) if password else (False, False)
+    if metrics is not None and password:
+        metrics.leak_checks.inc('leaked' if is_compromised else 'variant' if is_leaked_variant else 'clean')
+    return _json_response({'is_compromised': is_compromised, 'is_leaked_variant': is_leaked_variant})
+
+@app.route('/session', methods=['POST'])
+def create_session():
+    """Start an incremental analysis session for keystroke-by-keystroke scoring"""
+    session_id, _ = sessions.create()
+    return jsonify({'session_id': session_id})
+
+@app.route('/session/<session_id>', methods=['POST'])
+def update_session(session_id):
+    """Apply one edit to a session and return the updated score
+    
+    The body is {"password": ...}, the whole current value: the session
+    reuses the state of the unchanged prefix. Any worker can answer it, since
+    a worker that hasn't seen the session rebuilds it from the password.
+    {"delete": n, "append": "text"} (remove n characters from the end, then
+    type the text) is shorter but needs the worker holding the session, so
+    it gets a 404 elsewhere unless routing is sticky. ?fields= and ?mode=
+    select fields as for /analyze.
+    """
+    try:
+        fields = _requested_fields(RESULT_FIELDS)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'The body must be a JSON object'}), 400
+    
+    if 'password' in data:
+        error = _password_error(data['password'])
+        if error is not None:
+            return jsonify({'error': error}), 400
+        session = sessions.session_for(session_id)
+    else:
+        delete, append = data.get('delete', 0), data.get('append', '')
+        if not isinstance(delete, int) or isinstance(delete, bool) or delete < 0:
+            return jsonify({'error': 'delete must be a non-negative integer'}), 400
+        if not isinstance(append, str):
+            return jsonify({'error': 'append must be a string'}), 400
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({'error': 'Unknown or expired session'}), 404
+    
+    with session.lock:
+        if 'password' in data:
+            session.set_password(data['password'])
+        else:
+            if max(len(session) - delete, 0) + len(append) > MAX_PASSWORD_LENGTH:
+                return jsonify({'error': f'password may be at most {MAX_PASSWORD_LENGTH} characters'}), 400
+            session.delete(delete)
+            session.append(append)
+        password = session.password
+        result = session.result(include_ml_strength='ml_strength' in fields)
+    
+    response = _build_response(password, result, fields)
+    response['length'] = len(password)
+    return _json_response(response)
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
 
 @app.route('/generate', methods=['POST'])
 def generate_password():
-    """Generate a strong password based on time-to-crack threshold"""
-    data = request.get_json()
+    """Generate strong passwords that meet a minimum score and time-to-crack threshold
+    
+    The body may set min_score, time_threshold_days, count (passwords per call,
+    default 1) and mode ("random" or "passphrase"). With count, the response
+    is {"passwords": [...]}; without it, a single password object.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'The body must be a JSON object'}), 400
     min_score = data.get('min_score', 80)
     time_threshold_days = data.get('time_threshold_days', 365 * 100)  # Default: 100 years
+    count = data.get('count', 1)
+    mode = data.get('mode', 'random')
     
-    # Generate candidate passwords until we meet the criteria
-    max_attempts = 10
-    for _ in range(max_attempts):
-        # In a real app, we'd use a more sophisticated generation mechanism
-        # For demo, we'll use a simple approach
-        candidate = genai.generate_suggestion("")[0]  # Get just the password
-        result = analyzer.analyze_password(candidate)
-        
-        time_to_crack_days = result.time_to_crack_seconds / (60 * 60 * 24)
-        
-        if result.score >= min_score and time_to_crack_days >= time_threshold_days:
-            return jsonify({
-                'password': candidate,
-                'score': result.score,
-                'time_to_crack': result.time_to_crack
-            })
-    
-    # If we couldn't meet criteria, return the best candidate
-    candidate = "Tr0ub4dor&3"  # A reasonably strong fallback
-    result = analyzer.analyze_password(candidate)
-    
-    return jsonify({
-        'password': candidate,
+    if not _is_number(min_score) or not 0 <= min_score <= 100:
+        return jsonify({'error': 'min_score must be a number between 0 and 100'}), 400
+    if not _is_number(time_threshold_days) or not 0 <= time_threshold_days < math.inf:
+        return jsonify({'error': 'time_threshold_days must be a non-negative number'}), 400
+    if mode not in ('random', 'passphrase'):
+        return jsonify({'error': 'mode must be "random" or "passphrase"'}), 400
+    if not isinstance(count, int) or isinstance(count, bool) or not 1 <= count <= MAX_GENERATE_COUNT:
+        return jsonify({'error': f'count must be between 1 and {MAX_GENERATE_COUNT}'}), 400
+    
+    generate = generator.generate_passphrase if mode == 'passphrase' else generator.generate
+    try:
+        generated = generate(min_score=min_score, time_threshold_seconds=time_threshold_days * 86400, count=count)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    
+    passwords = [{
+        'password': password,
         'score': result.score,
-        'time_to_crack': result.time_to_crack,
-        'note': "Could not meet exact criteria, but this password is reasonably strong."
-    })
+        'time_to_crack': result.time_to_crack
+    } for password, result in generated]
+    
+    if 'count' in data:
+        return jsonify({'passwords': passwords})
+    return jsonify(passwords[0])
 
 if __name__ == '__main__':
+    report = preload()
+    print(f"Loaded resources in {report['total_load_seconds']:.3f}s: {report['load_seconds']}")
     app.run(debug=True)
\ No newline at end of file
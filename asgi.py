@@ -0,0 +1,449 @@
+# asgi.py - Production ASGI front end: analysis runs in a pre-warmed pool of worker processes
+# Run one front-end process with uvicorn asgi:app; ANALYSIS_WORKERS sets how many workers it forks
+
+import asyncio
+from collections import deque
+import concurrent.futures
+import gc
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from urllib.parse import parse_qsl
+
+import app as wsgi
+from models.worker_pool import DeadlineExceeded, PoolUnavailable, WorkerPool
+
+# The event loop only parses requests, awaits GenAI backends and writes
+# responses; /analyze, /analyze_batch and /policy/check run in the workers.
+# Every other route is served by the Flask app on a thread.
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', '0')) or None  # Default: one per CPU
+ANALYSIS_QUEUE_SIZE = int(os.environ['ANALYSIS_QUEUE_SIZE']) if 'ANALYSIS_QUEUE_SIZE' in os.environ else None
+FALLBACK_THREADS = int(os.environ.get('FALLBACK_THREADS', '8'))
+
+# Seconds a request may take before it is answered 504. Clients may ask for
+# less with an X-Request-Timeout header.
+REQUEST_TIMEOUT = float(os.environ.get('REQUEST_TIMEOUT', '5'))
+BATCH_REQUEST_TIMEOUT = float(os.environ.get('BATCH_REQUEST_TIMEOUT', '120'))
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', str(8 * 1024 * 1024)))
+RETRY_AFTER_SECONDS = 1
+
+# Batches are split into tasks of this many passwords, and each request keeps
+# at most BATCH_WINDOW of them queued, so one large batch can't crowd out the
+# single analyses
+BATCH_CHUNK_SIZE = 256
+BATCH_WINDOW = 2
+
+# Result fields the GenAI reasoning prompt needs
+PROMPT_FIELDS = frozenset({'time_to_crack', 'attack_vector'})
+RESPONSE_FIELDS = wsgi.RESULT_FIELDS + wsgi.GENAI_FIELDS
+
+
+class HTTPError(Exception):
+    """A request the front end answers with an error status and {"error": message}"""
+
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.headers = list(headers)
+
+
+# Runs in each worker, and the task functions below run in the workers. They
+# use the analyzer, GenAI and policies the parent loaded before forking.
+
+def _init_worker():
+    # Workers are forked from the running front end, on start and again when
+    # one dies, so its threads' locks and its GenAI connections come along
+    wsgi.after_fork()
+    # Stage timings recorded in a worker would never reach /metrics
+    wsgi.analyzer.metrics = None
+    wsgi.genai.metrics = None
+
+def _analyze_task(password, fields):
+    """The /analyze payload for `password`, as the Flask route computes it"""
+    if not password:
+        return wsgi._empty_password_response(fields)
+    features = wsgi.analyzer.extract_features(password) if not fields.isdisjoint(wsgi.GENAI_FIELDS) else None
+    result = wsgi.analyzer.analyze_password(password, features=features,
+                                            include_suggestions='suggestions' in fields,
+                                            include_ml_strength='ml_strength' in fields)
+    return wsgi._build_response(password, result, fields, features)
+
+def _analyze_batch_task(items, offset, fields, include_suggestions):
+    """NDJSON lines for a slice of (password, error) batch items starting at index `offset`"""
+    return b''.join(wsgi._batch_result_lines(items, fields, include_suggestions, offset))
+
+def _policy_task(data, fail_fast):
+    payload, status = wsgi._check_policy(data, fail_fast)
+    return wsgi._dumps(payload), status
+
+
+pool = WorkerPool(ANALYSIS_WORKERS, ANALYSIS_QUEUE_SIZE, initializer=_init_worker)
+_fallback_threads = concurrent.futures.ThreadPoolExecutor(FALLBACK_THREADS, thread_name_prefix='wsgi')
+
+if wsgi.metrics is not None:
+    wsgi.metrics.callback(
+        'analysis_pool_tasks_total', 'Worker pool tasks, by what happened to them', 'counter', ['event'],
+        lambda: [((event,), value) for event, value in pool.stats().items()
+                 if event in ('submitted', 'finished', 'rejected', 'expired', 'restarts')])
+    wsgi.metrics.callback(
+        'analysis_pool_pending_tasks', 'Tasks admitted to the worker pool and not yet finished',
+        'gauge', [], lambda: [((), pool.stats()['pending'])])
+
+def start():
+    """Load every heavy resource, then fork the workers so they share it"""
+    report = wsgi.preload()
+    # Keep collections in the workers from writing to (and so copying) the shared pages
+    gc.freeze()
+    pids = pool.start()
+    print(f"Loaded resources in {report['total_load_seconds']:.3f}s; "
+          f"started {len(pids)} analysis workers", file=sys.stderr)
+
+
+def _query_args(scope):
+    return dict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+def _json_body(body):
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        raise HTTPError(400, 'The body must be JSON') from None
+    if not isinstance(data, dict):
+        raise HTTPError(400, 'The body must be a JSON object')
+    return data
+
+def _deadline(scope, limit):
+    """The time.time() by which the request must be answered"""
+    requested = _header(scope, b'x-request-timeout')
+    if requested is not None:
+        try:
+            seconds = float(requested)
+        except ValueError:
+            seconds = 0
+        if not seconds > 0:
+            raise HTTPError(400, 'X-Request-Timeout must be a positive number of seconds')
+        limit = min(limit, seconds)
+    return time.time() + limit
+
+async def _read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionResetError('client disconnected')
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise HTTPError(413, f'The body may be at most {MAX_BODY_BYTES} bytes')
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+async def _send_response(send, status, body, content_type=b'application/json', headers=()):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', content_type), (b'content-length', str(len(body)).encode()), *headers]})
+    await send({'type': 'http.response.body', 'body': body})
+    return status
+
+async def _send_error(send, status, message, headers=()):
+    return await _send_response(send, status, wsgi._dumps({'error': message}), headers=headers)
+
+async def _start_stream(send, content_type, headers=()):
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', content_type), *headers]})
+
+async def _send_chunk(send, body, more=True):
+    await send({'type': 'http.response.body', 'body': body, 'more_body': more})
+
+
+async def _suggestion(password):
+    improved_password, improvement_explanation = await wsgi.genai.agenerate_suggestion(password)
+    return {'improved_password': improved_password, 'improvement_explanation': improvement_explanation}
+
+async def _reasoning(password, analysis):
+    return {'reasoning': await wsgi.genai.agenerate_reason_for_weakness(
+        password, analysis['time_to_crack'], analysis['attack_vector'])}
+
+async def _backend_genai(password, analysis, fields, deadline):
+    """Yield GenAI text from the configured backend as each call completes
+
+    Backend calls are I/O, so they run on the event loop rather than in a worker.
+    """
+    tasks = []
+    if 'improved_password' in fields or 'improvement_explanation' in fields:
+        tasks.append(asyncio.ensure_future(_suggestion(password)))
+    if 'reasoning' in fields:
+        tasks.append(asyncio.ensure_future(_reasoning(password, analysis)))
+    try:
+        for completed in asyncio.as_completed(tasks, timeout=max(deadline - time.time(), 0)):
+            yield await completed
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded('deadline passed waiting for the GenAI backend') from None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _wants_event_stream(scope, args):
+    if args.get('stream') == 'true':
+        return True
+    accept = _header(scope, b'accept') or ''
+    return accept.split(',', 1)[0].split(';', 1)[0].strip() == 'text/event-stream'
+
+async def analyze(scope, body, send):
+    """POST /analyze, as served by the Flask app"""
+    args = _query_args(scope)
+    try:
+        fields = wsgi._select_fields(args)
+    except ValueError as error:
+        raise HTTPError(400, str(error)) from None
+    password = _json_body(body).get('password', '')
+    error = wsgi._password_error(password)
+    if error is not None:
+        raise HTTPError(400, error)
+    deadline = _deadline(scope, REQUEST_TIMEOUT)
+
+    # With a GenAI backend the worker leaves the GenAI text to the event loop
+    backend_genai = bool(password) and wsgi.genai.backend is not None and not fields.isdisjoint(wsgi.GENAI_FIELDS)
+    worker_fields = fields.difference(wsgi.GENAI_FIELDS) | PROMPT_FIELDS if backend_genai else fields
+    payload = await pool.run(_analyze_task, password, worker_fields, deadline=deadline)
+
+    if password and _wants_event_stream(scope, args):
+        return await _stream_analysis(send, password, payload, fields, backend_genai, deadline)
+    if backend_genai:
+        async for texts in _backend_genai(password, payload, fields, deadline):
+            payload.update(texts)
+    return await _send_response(send, 200, wsgi._dumps({name: payload[name] for name in RESPONSE_FIELDS
+                                                        if name in fields and name in payload}))
+
+async def _stream_analysis(send, password, payload, fields, backend_genai, deadline):
+    """The score as an SSE event, then one event per GenAI text, as the Flask route streams them"""
+    await _start_stream(send, b'text/event-stream', [(b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')])
+    analysis = {name: payload[name] for name in wsgi.RESULT_FIELDS if name in fields and name in payload}
+    await _send_chunk(send, wsgi._sse_event('analysis', analysis).encode())
+    try:
+        if backend_genai:
+            async for texts in _backend_genai(password, payload, fields, deadline):
+                await _send_chunk(send, wsgi._sse_event('genai', texts).encode())
+        else:
+            # Generated in the worker along with the analysis
+            suggestion = {name: payload[name] for name in ('improved_password', 'improvement_explanation')
+                          if name in payload}
+            for texts in (suggestion, {'reasoning': payload['reasoning']} if 'reasoning' in payload else {}):
+                if texts:
+                    await _send_chunk(send, wsgi._sse_event('genai', texts).encode())
+    except DeadlineExceeded as error:
+        await _send_chunk(send, wsgi._sse_event('error', {'error': str(error)}).encode())
+    await _send_chunk(send, wsgi._sse_event('done', {}).encode(), more=False)
+    return 200
+
+async def analyze_batch(scope, body, send):
+    """POST /analyze_batch: NDJSON result lines, computed BATCH_CHUNK_SIZE passwords per task
+
+    Admission is decided by the first task, so a full pool is still a 503.
+    A deadline or failure after the response has started ends it with an
+    {"error": ..., "index": n} line for the first unanswered password.
+    """
+    try:
+        fields, include_suggestions = wsgi._batch_options(_query_args(scope))
+    except ValueError as error:
+        raise HTTPError(400, str(error)) from None
+    content_type = (_header(scope, b'content-type') or '').split(';', 1)[0].strip()
+    if content_type == 'application/x-ndjson':
+        # Bad lines become error lines in the response, as in the Flask route
+        items = list(wsgi._ndjson_items(body.splitlines()))
+    else:
+        passwords = _json_body(body).get('passwords', [])
+        error = wsgi._batch_error(passwords)
+        if error is not None:
+            raise HTTPError(400, error)
+        items = [(password, None) for password in passwords]
+    deadline = _deadline(scope, BATCH_REQUEST_TIMEOUT)
+
+    offsets = range(0, len(items), BATCH_CHUNK_SIZE)
+    def submit(offset, wait):
+        return offset, asyncio.ensure_future(pool.run(
+            _analyze_batch_task, items[offset:offset + BATCH_CHUNK_SIZE], offset, fields, include_suggestions,
+            deadline=deadline, wait=wait))
+
+    pending = deque(submit(offset, wait=index > 0) for index, offset in enumerate(offsets[:BATCH_WINDOW]))
+    lines = b''
+    if pending:
+        try:
+            lines = await pending.popleft()[1]
+        except BaseException:
+            for _, task in pending:
+                task.cancel()
+            raise
+    await _start_stream(send, b'application/x-ndjson')
+    remaining = iter(offsets[BATCH_WINDOW:])
+    while True:
+        offset = next(remaining, None)
+        if offset is not None:
+            pending.append(submit(offset, wait=True))
+        await _send_chunk(send, lines, more=bool(pending))
+        if not pending:
+            return 200
+        offset, task = pending.popleft()
+        try:
+            lines = await task
+        except Exception as error:
+            if not isinstance(error, (PoolUnavailable, DeadlineExceeded)):
+                traceback.print_exc()
+                error = 'Internal error'
+            for _, other in pending:
+                other.cancel()
+            await _send_chunk(send, wsgi._dumps({'error': str(error), 'index': offset}) + b'\n', more=False)
+            return 200
+
+async def policy_check(scope, body, send):
+    """POST /policy/check, as served by the Flask app"""
+    data = _json_body(body)
+    fail_fast = _query_args(scope).get('all', 'false').lower() != 'true'
+    deadline = _deadline(scope, BATCH_REQUEST_TIMEOUT if 'passwords' in data else REQUEST_TIMEOUT)
+    payload, status = await pool.run(_policy_task, data, fail_fast, deadline=deadline)
+    return await _send_response(send, status, payload)
+
+async def healthz(scope, body, send):
+    """Readiness probe: 200 once resources are loaded and the workers are running"""
+    report = wsgi.startup_report()
+    report['ready'] = report['ready'] and pool.started
+    report['status'] = 'ready' if report['ready'] else 'loading'
+    report['pool'] = pool.stats()
+    return await _send_response(send, 200 if report['ready'] else 503, wsgi._dumps(report))
+
+async def metrics_endpoint(scope, body, send):
+    """GET /metrics, including the worker pool's counters; stage timings cover this process only"""
+    if wsgi.metrics is None:
+        return await _send_error(send, 404, 'Metrics are disabled')
+    return await _send_response(send, 200, wsgi.metrics.render().encode(), b'text/plain; version=0.0.4')
+
+
+def _wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    # The body has been read in full, whatever the request's framing
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+def _run_wsgi(application, environ, send):
+    """Call a WSGI app on this thread, passing its response to `send` as ASGI messages chunk by chunk"""
+    response = {}
+    
+    def start_response(status, headers, exc_info=None):
+        if exc_info is not None and response.get('started'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    
+    def start():
+        if not response.get('started'):
+            response['started'] = True
+            send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+    
+    body = application(environ, start_response)
+    try:
+        # Streamed responses (NDJSON, server-sent events) go out as they are generated
+        for chunk in body:
+            if chunk:
+                start()
+                send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    start()
+    send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+async def _call_wsgi(scope, body, send):
+    loop = asyncio.get_running_loop()
+    
+    def send_from_thread(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+    
+    await loop.run_in_executor(_fallback_threads, _run_wsgi, wsgi.app, _wsgi_environ(scope, body), send_from_thread)
+
+
+ROUTES = {
+    ('POST', '/analyze'): analyze,
+    ('POST', '/analyze_batch'): analyze_batch,
+    ('POST', '/policy/check'): policy_check,
+    ('GET', '/healthz'): healthz,
+    ('GET', '/metrics'): metrics_endpoint,
+}
+
+async def app(scope, receive, send):
+    """The ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+    
+    started = time.perf_counter()
+    handler = ROUTES.get((scope['method'], scope['path']))
+    try:
+        body = await _read_body(receive)
+        if handler is None:
+            # The Flask app records its own request metrics
+            return await _call_wsgi(scope, body, send)
+        status = await handler(scope, body, send)
+    except ConnectionResetError:
+        return
+    except HTTPError as error:
+        status = await _send_error(send, error.status, str(error), error.headers)
+    except PoolUnavailable as error:
+        status = await _send_error(send, 503, str(error), [(b'retry-after', str(RETRY_AFTER_SECONDS).encode())])
+    except DeadlineExceeded as error:
+        status = await _send_error(send, 504, str(error))
+    if wsgi.metrics is not None and handler is not None:
+        wsgi.metrics.request_seconds.observe(time.perf_counter() - started, scope['path'], scope['method'], str(status))
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                start()
+            except Exception as error:
+                await send({'type': 'lifespan.startup.failed', 'message': str(error)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            pool.shutdown()
+            _fallback_threads.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host=os.environ.get('HOST', '127.0.0.1'), port=int(os.environ.get('PORT', '8000')))
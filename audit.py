@@ -0,0 +1,257 @@
+# audit.py - Parallel Password Audit CLI
+# Streams large password files through PasswordAnalyzer on every core and writes a report
+
+import argparse
+from collections import Counter
+import csv
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models.password_analyzer import PasswordAnalyzer
+
+REPORT_FIELDS = ["password", "count", "score", "entropy", "time_to_crack_seconds", "time_to_crack",
+                 "is_compromised", "attack_vector", "patterns"]
+
+# Set in the parent before the pool forks, so workers share the analyzer's
+# memory-mapped leak index and dictionary instead of loading their own
+_analyzer: Optional[PasswordAnalyzer] = None
+_include_passwords = False
+
+
+def _open_input(path: str) -> io.BufferedIOBase:
+    """Open a plain or gzip-compressed password file for binary reading"""
+    if path == "-":
+        return sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_passwords(paths: List[str], input_format: str, stats: Counter) -> Iterator[Tuple[str, int]]:
+    """Yield (password, count) pairs from the input files
+
+    `plain` files hold one password per line. `counts` files hold a count and
+    a password per line, as written by `sort | uniq -c`. Lines that are not
+    valid UTF-8 or lack a count are skipped and tallied in `stats`.
+    """
+    for path in paths:
+        with _open_input(path) as handle:
+            for line in handle:
+                line = line.rstrip(b"\r\n")
+                count = 1
+                if input_format == "counts":
+                    fields = line.lstrip().split(b" ", 1)
+                    if len(fields) != 2 or not fields[0].isdigit():
+                        stats["malformed_lines"] += 1
+                        continue
+                    count, line = int(fields[0]), fields[1]
+                if not line:
+                    continue
+                try:
+                    yield line.decode("utf-8"), count
+                except UnicodeDecodeError:
+                    stats["undecodable_lines"] += 1
+
+
+def iter_chunks(pairs: Iterator[Tuple[str, int]], chunk_size: int) -> Iterator[List[Tuple[str, int]]]:
+    """Group (password, count) pairs into lists of at most `chunk_size`"""
+    chunk = []
+    for pair in pairs:
+        chunk.append(pair)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker(leak_db: str, dictionary: Optional[str], include_passwords: bool):
+    """Pool initializer: build the analyzer unless it was inherited from the parent"""
+    global _analyzer, _include_passwords
+    _include_passwords = include_passwords
+    if _analyzer is None:
+        _analyzer = PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=leak_db,
+                                     common_words_path=dictionary)
+
+
+def _score_bucket(score: int) -> str:
+    low = min(score // 10, 9) * 10
+    return f"{low}-{low + 9 if low < 90 else 100}"
+
+
+def analyze_chunk(chunk: List[Tuple[str, int]]) -> Tuple[List[Dict], Dict[str, Counter]]:
+    """Analyze one chunk in a worker; return report rows and count-weighted histograms"""
+    passwords = [password for password, _ in chunk]
+    rows = []
+    histograms = {"score_buckets": Counter(), "attack_vectors": Counter(), "patterns": Counter(),
+                  "totals": Counter()}
+
+    for (password, count), result in zip(chunk, _analyzer.analyze_many(passwords)):
+        rows.append({
+            **({"password": password} if _include_passwords
+               else {"password_sha256": hashlib.sha256(password.encode()).hexdigest()}),
+            "count": count,
+            "score": result.score,
+            "entropy": round(result.entropy, 4),
+            "time_to_crack_seconds": result.time_to_crack_seconds,
+            "time_to_crack": result.time_to_crack,
+            "is_compromised": result.is_compromised,
+            "attack_vector": result.attack_vector,
+            "patterns": ";".join(result.patterns_detected),
+        })
+        histograms["score_buckets"][_score_bucket(result.score)] += count
+        histograms["attack_vectors"][result.attack_vector] += count
+        histograms["patterns"].update({pattern: count for pattern in result.patterns_detected})
+        histograms["totals"]["passwords"] += count
+        histograms["totals"]["distinct_passwords"] += 1
+        histograms["totals"]["compromised"] += count if result.is_compromised else 0
+
+    return rows, histograms
+
+
+class CsvReportWriter:
+    """Writes report rows as CSV"""
+
+    def __init__(self, path: str, fields: List[str]):
+        self._handle = open(path, "w", newline="", encoding="utf-8") if path != "-" else sys.stdout
+        self._writer = csv.DictWriter(self._handle, fieldnames=fields)
+        self._writer.writeheader()
+
+    def write(self, rows: List[Dict]):
+        self._writer.writerows(rows)
+
+    def close(self):
+        if self._handle is not sys.stdout:
+            self._handle.close()
+
+
+class JsonlReportWriter:
+    """Writes report rows as one JSON object per line"""
+
+    def __init__(self, path: str, fields: List[str]):
+        self._handle = open(path, "w", encoding="utf-8") if path != "-" else sys.stdout
+
+    def write(self, rows: List[Dict]):
+        self._handle.write("".join(json.dumps(row) + "\n" for row in rows))
+
+    def close(self):
+        if self._handle is not sys.stdout:
+            self._handle.close()
+
+
+class ParquetReportWriter:
+    """Writes report rows to a Parquet file, one row group per chunk (requires pyarrow)"""
+
+    def __init__(self, path: str, fields: List[str]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._pq = pq
+        self._path = path
+        self._writer = None
+
+    def write(self, rows: List[Dict]):
+        table = self._pa.Table.from_pylist(rows)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+REPORT_WRITERS = {"csv": CsvReportWriter, "jsonl": JsonlReportWriter, "parquet": ParquetReportWriter}
+
+
+def _report_format(path: str, requested: Optional[str]) -> str:
+    """Pick the report format from the flag or the output file extension"""
+    if requested:
+        return requested
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    return extension if extension in REPORT_WRITERS else "csv"
+
+
+def run_audit(args) -> Dict:
+    """Stream the inputs through a process pool and write the report; return the summary"""
+    global _analyzer
+    input_stats = Counter()
+    histograms = {"score_buckets": Counter(), "attack_vectors": Counter(), "patterns": Counter(),
+                  "totals": Counter()}
+    fields = list(REPORT_FIELDS)
+    if not args.include_passwords:
+        fields[0] = "password_sha256"
+    writer = REPORT_WRITERS[_report_format(args.output, args.output_format)](args.output, fields)
+
+    # Load once in the parent; with the fork start method every worker shares
+    # these pages instead of mapping and parsing its own copy
+    _analyzer = PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=args.leak_db,
+                                 common_words_path=args.dictionary)
+    _analyzer.preload()
+
+    started = time.perf_counter()
+    chunks = iter_chunks(iter_passwords(args.inputs, args.format, input_stats), args.chunk_size)
+    with multiprocessing.Pool(args.workers, initializer=_init_worker,
+                              initargs=(args.leak_db, args.dictionary, args.include_passwords)) as pool:
+        # imap keeps report order and only reads ahead as fast as workers consume
+        for rows, chunk_histograms in pool.imap(analyze_chunk, chunks):
+            writer.write(rows)
+            for name, counter in chunk_histograms.items():
+                histograms[name].update(counter)
+    writer.close()
+    elapsed = time.perf_counter() - started
+
+    distinct = histograms["totals"]["distinct_passwords"]
+    return {
+        "inputs": args.inputs,
+        "passwords": histograms["totals"]["passwords"],
+        "distinct_passwords": distinct,
+        "compromised": histograms["totals"]["compromised"],
+        "elapsed_seconds": round(elapsed, 3),
+        "passwords_per_second": round(distinct / elapsed, 1) if elapsed else None,
+        "skipped_lines": dict(input_stats),
+        "score_buckets": dict(sorted(histograms["score_buckets"].items(), key=lambda item: int(item[0].split("-")[0]))),
+        "attack_vectors": dict(histograms["attack_vectors"].most_common()),
+        "patterns": dict(histograms["patterns"].most_common()),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python audit.py passwords.txt.gz -o report.csv"""
+    parser = argparse.ArgumentParser(description="Audit a password list in parallel across all cores")
+    parser.add_argument("inputs", nargs="+", help="password files (.gz supported, '-' for stdin)")
+    parser.add_argument("-o", "--output", required=True, help="report file ('-' for stdout)")
+    parser.add_argument("--format", choices=["plain", "counts"], default="plain",
+                        help="plain: one password per line; counts: 'COUNT PASSWORD' lines as from uniq -c")
+    parser.add_argument("--output-format", choices=sorted(REPORT_WRITERS),
+                        help="report format (default: from the output extension, else csv)")
+    parser.add_argument("--summary", help="also write the aggregate histograms to this JSON file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="passwords per work unit (default: 5000)")
+    parser.add_argument("--leak-db", default="data/leaked_passwords.db", help="leaked password index")
+    parser.add_argument("--dictionary", default="data/common_words.txt", help="common word list or .dawg file")
+    parser.add_argument("--include-passwords", action="store_true",
+                        help="write plaintext passwords to the report instead of SHA-256 digests")
+    args = parser.parse_args(argv)
+
+    summary = run_audit(args)
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    print(text, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
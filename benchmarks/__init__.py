@@ -0,0 +1 @@
+# Benchmarks - Performance measurements for the analyzer and its components
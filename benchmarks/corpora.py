@@ -0,0 +1,129 @@
+# Benchmark Corpora - Reproducible password sets shaped like real inputs
+# Each generator takes a count and a seed; load_corpus() samples a real list
+
+import gzip
+import random
+import string
+from typing import Callable, Dict, List
+
+from models.leak_variants import LEET_SUBSTITUTIONS
+
+SAMPLE_WORDS = ["password", "dragon", "monkey", "summer", "letmein", "football", "shadow", "master"]
+
+# Most-used passwords in public breach corpora, used to shape "leak_like" sets
+COMMON_PASSWORDS = ["123456", "password", "123456789", "12345678", "qwerty", "abc123", "111111",
+                    "1234567", "iloveyou", "admin", "welcome", "monkey", "login", "princess",
+                    "sunshine", "football", "dragon", "baseball", "letmein", "shadow", "master",
+                    "superman", "michael", "jennifer", "trustno1", "hunter", "ashley", "charlie"]
+
+PRINTABLE = string.printable[:94]
+UNICODE_CHARACTERS = "éèêàçñöüßøåæœ" + "абвгдежзийклмн" + "αβγδεζηθ" + "日本語中文한국어" + "😀🔒🔑✨"
+KEYBOARD_WALKS = ["qwerty", "asdfgh", "zxcvbn", "qwertyuiop", "1qaz2wsx"]
+# The most common substitution for a, o and e, as in "p@ssw0rd"
+_LEET = str.maketrans({letter: LEET_SUBSTITUTIONS[letter][0] for letter in "aoe"})
+
+
+def sample_passwords(count: int, seed: int = 1) -> List[str]:
+    """Build a reproducible mix of word-based, patterned and random passwords"""
+    rng = random.Random(seed)
+    passwords = []
+    for _ in range(count):
+        kind = rng.randrange(3)
+        if kind == 0:
+            passwords.append(rng.choice(SAMPLE_WORDS) + str(rng.randint(1950, 2024)))
+        elif kind == 1:
+            passwords.append(rng.choice(SAMPLE_WORDS).capitalize() + rng.choice(["123", "abc", "!!!", "01/02"]))
+        else:
+            passwords.append("".join(rng.choice(PRINTABLE) for _ in range(rng.randint(6, 20))))
+    return passwords
+
+
+def short_passwords(count: int, seed: int = 1) -> List[str]:
+    """4-8 characters, mostly lowercase letters and digits"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase * 3 + string.digits * 2 + string.ascii_uppercase + "!@#$"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(4, 8))) for _ in range(count)]
+
+
+def long_passwords(count: int, seed: int = 1) -> List[str]:
+    """24-64 random printable characters, like password-manager output"""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(PRINTABLE) for _ in range(rng.randint(24, 64))) for _ in range(count)]
+
+
+def unicode_passwords(count: int, seed: int = 1) -> List[str]:
+    """ASCII mixed with accented, Cyrillic, Greek, CJK and emoji characters"""
+    rng = random.Random(seed)
+    alphabet = PRINTABLE + UNICODE_CHARACTERS * 2
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(6, 24))) for _ in range(count)]
+
+
+def patterned_passwords(count: int, seed: int = 1) -> List[str]:
+    """Words, years, dates, keyboard walks, sequences and repeats in common combinations"""
+    rng = random.Random(seed)
+    pieces = [
+        lambda: rng.choice(SAMPLE_WORDS + COMMON_PASSWORDS),
+        lambda: rng.choice(SAMPLE_WORDS).capitalize(),
+        lambda: str(rng.randint(1950, 2030)),
+        lambda: f"{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+        lambda: rng.choice(KEYBOARD_WALKS),
+        lambda: "".join(str((rng.randint(0, 7) + i) % 10) for i in range(rng.randint(3, 6))),
+        lambda: rng.choice("ax!1z") * rng.randint(3, 5),
+        lambda: rng.choice("!@#$%&*"),
+    ]
+    return ["".join(rng.choice(pieces)() for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def leak_like_passwords(count: int, seed: int = 1) -> List[str]:
+    """Common passwords and their usual mutations with a long-tailed, Zipf-like frequency
+
+    Breach dumps repeat their most popular entries many times, so this set
+    contains duplicates, which exercises result caching and batch dedup.
+    """
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(COMMON_PASSWORDS) + 1)]
+    mutations = [
+        lambda pwd: pwd,
+        lambda pwd: pwd.capitalize(),
+        lambda pwd: pwd + str(rng.randint(0, 99)),
+        lambda pwd: pwd + "!",
+        lambda pwd: pwd + str(rng.randint(1970, 2024)),
+        lambda pwd: pwd.translate(_LEET),
+    ]
+    mutation_weights = [8, 3, 4, 2, 2, 1]
+    passwords = []
+    for _ in range(count):
+        base = rng.choices(COMMON_PASSWORDS, weights)[0]
+        passwords.append(rng.choices(mutations, mutation_weights)[0](base))
+    return passwords
+
+
+CORPORA: Dict[str, Callable[[int, int], List[str]]] = {
+    "short": short_passwords,
+    "long": long_passwords,
+    "unicode": unicode_passwords,
+    "patterned": patterned_passwords,
+    "leak_like": leak_like_passwords,
+    "mixed": sample_passwords,
+}
+
+
+def load_corpus(path: str, count: int, seed: int = 1) -> List[str]:
+    """Reservoir-sample `count` non-empty lines from a real password list (.gz supported)"""
+    rng = random.Random(seed)
+    opener = gzip.open if path.endswith(".gz") else open
+    sample: List[str] = []
+    with opener(path, "rt", encoding="utf-8", errors="replace") as handle:
+        seen = 0
+        for line in handle:
+            password = line.rstrip("\r\n")
+            if not password:
+                continue
+            if len(sample) < count:
+                sample.append(password)
+            else:
+                slot = rng.randrange(seen + 1)
+                if slot < count:
+                    sample[slot] = password
+            seen += 1
+    return sample
@@ -0,0 +1,66 @@
+# GenAI Micro-benchmark - Per-request cost of PasswordGenAI's heuristic pipeline
+# Run from the repository root: python -m benchmarks.genai_bench [--baseline old_genai.py]
+
+import argparse
+import importlib.util
+import random
+import sys
+import time
+from typing import List, Optional
+
+from benchmarks.corpora import sample_passwords
+from models.genai import PasswordGenAI
+
+
+def time_requests(genai, passwords: List[str], rounds: int) -> float:
+    """Return the best per-request time, in microseconds, of suggestion plus reasoning
+    
+    For implementations that take PasswordFeatures, the features are computed
+    before timing starts: in app.py the analyzer has already computed them, so
+    this measures GenAI's added cost per request. Older implementations
+    analyze the password themselves inside the calls.
+    """
+    share = hasattr(genai, "extract_features")
+    features = [genai.extract_features(password) if share else None for password in passwords]
+    best = float("inf")
+    for _ in range(rounds):
+        random.seed(0)  # Same suggestion choices for every implementation and round
+        started = time.perf_counter()
+        for password, password_features in zip(passwords, features):
+            if share:
+                genai.generate_suggestion(password, password_features)
+                genai.generate_reason_for_weakness(password, "3 hours", "dictionary attack", password_features)
+            else:
+                genai.generate_suggestion(password)
+                genai.generate_reason_for_weakness(password, "3 hours", "dictionary attack")
+        best = min(best, time.perf_counter() - started)
+    return best / len(passwords) * 1e6
+
+
+def load_implementation(path: str):
+    """Instantiate PasswordGenAI from another copy of genai.py, e.g. from `git show REV:models/genai.py`"""
+    spec = importlib.util.spec_from_file_location("baseline_genai", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.PasswordGenAI()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time PasswordGenAI's suggestion and reasoning per request")
+    parser.add_argument("--passwords", type=int, default=5000, help="passwords per round (default: 5000)")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds; the fastest is reported (default: 5)")
+    parser.add_argument("--baseline", help="another genai.py to compare against")
+    args = parser.parse_args(argv)
+
+    passwords = sample_passwords(args.passwords)
+    current = time_requests(PasswordGenAI(), passwords, args.rounds)
+    print(f"current:  {current:8.2f} us/request")
+    if args.baseline:
+        baseline = time_requests(load_implementation(args.baseline), passwords, args.rounds)
+        print(f"baseline: {baseline:8.2f} us/request")
+        print(f"speedup:  {baseline / current:8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
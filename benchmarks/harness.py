@@ -0,0 +1,122 @@
+# Benchmark Harness - Latency percentiles, throughput, peak memory and baseline comparison
+# Measurements are plain dicts so results can be written to and compared as JSON
+
+import gc
+import math
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, Sequence
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """The q-th percentile of already sorted values, interpolating linearly between ranks"""
+    if not sorted_values:
+        return math.nan
+    rank = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+class _GCPaused:
+    """Disable the garbage collector for the duration of a measurement, as timeit does"""
+
+    def __enter__(self):
+        self._was_enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+
+    def __exit__(self, *exc_info):
+        if self._was_enabled:
+            gc.enable()
+
+
+def measure_latency(func: Callable, inputs: Sequence, rounds: int = 3, warmup: bool = True) -> Dict[str, float]:
+    """Time func(item) for every input, `rounds` times; return percentiles in microseconds
+
+    Every call is timed individually, so the percentiles describe the spread
+    across inputs as well as run-to-run noise.
+    """
+    if warmup:
+        for item in inputs[:100]:
+            func(item)
+    timings: List[int] = []
+    clock = time.perf_counter_ns
+    with _GCPaused():
+        for _ in range(rounds):
+            for item in inputs:
+                started = clock()
+                func(item)
+                timings.append(clock() - started)
+    return summarize(timings)
+
+
+def summarize(timings_ns: Iterable[int]) -> Dict[str, float]:
+    """Percentiles, mean, max and calls per second for nanosecond timings"""
+    ordered = sorted(timings_ns)
+    total = sum(ordered)
+    result = {f"p{q}_us": round(percentile(ordered, q) / 1000, 3) for q in PERCENTILES}
+    result.update({
+        "mean_us": round(total / len(ordered) / 1000, 3) if ordered else math.nan,
+        "max_us": round(ordered[-1] / 1000, 3) if ordered else math.nan,
+        "calls": len(ordered),
+        "ops_per_second": round(len(ordered) / (total / 1e9), 1) if total else math.nan,
+    })
+    return result
+
+
+def measure_throughput(func: Callable[[Sequence], object], inputs: Sequence, rounds: int = 3) -> Dict[str, float]:
+    """Run func(inputs) as one batch `rounds` times; return the best items per second"""
+    best = math.inf
+    with _GCPaused():
+        for _ in range(rounds):
+            started = time.perf_counter()
+            func(inputs)
+            best = min(best, time.perf_counter() - started)
+    return {"items": len(inputs), "best_seconds": round(best, 6),
+            "items_per_second": round(len(inputs) / best, 1) if best else math.inf}
+
+
+def measure_peak_memory(func: Callable[[], object]) -> Dict[str, float]:
+    """Peak Python heap allocated while func() runs, traced with tracemalloc
+
+    Run separately from timings: tracing slows every allocation.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_memory_kib": round((peak - baseline) / 1024, 1)}
+
+
+# Metrics compared against a baseline, and whether a larger value is better.
+# Tail percentiles are reported but too noisy to gate on.
+COMPARED_METRICS = {"p50_us": False, "items_per_second": True, "peak_memory_kib": False}
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[Dict]:
+    """Compare benchmark results that exist in both runs
+
+    Returns one row per compared metric with the ratio current / baseline and
+    whether it regressed by more than `tolerance` (0.1 = 10%).
+    """
+    rows = []
+    for name, metrics in current.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            new, old = metrics.get(metric), previous.get(metric)
+            if not new or not old:
+                continue
+            ratio = new / old
+            regressed = ratio < 1 / (1 + tolerance) if higher_is_better else ratio > 1 + tolerance
+            rows.append({"benchmark": name, "metric": metric, "baseline": old, "current": new,
+                         "ratio": round(ratio, 3), "regressed": regressed})
+    return rows
@@ -0,0 +1,224 @@
+# Benchmark Suite - Latency, throughput and memory of the analyzer, GenAI and Flask routes
+# Run from the repository root: python -m benchmarks.suite [-o results.json] [--baseline old.json] [--flask]
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.corpora import CORPORA, load_corpus
+from benchmarks.harness import compare, measure_latency, measure_peak_memory, measure_throughput
+from models.generator import PasswordGenerator
+from models.genai import PasswordGenAI
+from models.password_analyzer import PasswordAnalyzer
+
+FORMAT_VERSION = 1
+
+# Per-password benchmarks, run on every corpus
+PER_PASSWORD_BENCHMARKS = ["analyze_password", "extract_features", "detect_patterns",
+                           "estimate_crack_time", "genai_suggestion", "genai_reasoning"]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_corpora(args) -> Dict[str, List[str]]:
+    """Synthetic corpora selected with --corpus, plus any real lists given with --corpus-file"""
+    corpora = {name: CORPORA[name](args.size, args.seed) for name in args.corpus}
+    for path in args.corpus_file or []:
+        name = os.path.basename(path).split(".")[0]
+        corpora[name] = load_corpus(path, args.size, args.seed)
+    return corpora
+
+
+def per_password_functions(analyzer: PasswordAnalyzer, genai: PasswordGenAI) -> Dict[str, Callable]:
+    """Functions timed once per password; stages that follow feature extraction get precomputed features"""
+    return {
+        "analyze_password": lambda item: analyzer.analyze_password(item[0]),
+        "extract_features": lambda item: analyzer.extract_features(item[0]),
+        "detect_patterns": lambda item: analyzer._detect_patterns(item[0]),
+        "estimate_crack_time": lambda item: analyzer._estimate_crack_time(item[1]),
+        "genai_suggestion": lambda item: genai.generate_suggestion(item[0], item[1]),
+        "genai_reasoning": lambda item: genai.generate_reason_for_weakness(
+            item[0], "3 hours", "dictionary attack", item[1]),
+    }
+
+
+def run_component_benchmarks(args, analyzer: PasswordAnalyzer, corpora: Dict[str, List[str]]) -> Dict[str, Dict]:
+    """Per-function latency, batch throughput and peak memory for every corpus"""
+    genai = PasswordGenAI(pattern_detector=analyzer.pattern_detector)
+    functions = per_password_functions(analyzer, genai)
+    results = {}
+    for corpus_name, passwords in corpora.items():
+        passwords = [pwd for pwd in passwords if pwd]
+        items = [(pwd, analyzer.extract_features(pwd)) for pwd in passwords]
+        for name in PER_PASSWORD_BENCHMARKS:
+            if args.only and name not in args.only:
+                continue
+            results[f"{name}[{corpus_name}]"] = measure_latency(functions[name], items, args.rounds)
+            _report_progress(f"{name}[{corpus_name}]", results)
+
+        if args.memory and (not args.only or "analyze_password" in args.only):
+            key = f"analyze_password[{corpus_name}]"
+            if key in results:
+                results[key].update(measure_peak_memory(
+                    lambda: [analyzer.analyze_password(pwd) for pwd in passwords]))
+
+        if not args.only or "analyze_many" in args.only:
+            key = f"analyze_many[{corpus_name}]"
+            results[key] = measure_throughput(lambda batch: list(analyzer.analyze_many(batch)), passwords, args.rounds)
+            if args.memory:
+                results[key].update(measure_peak_memory(lambda: list(analyzer.analyze_many(passwords))))
+            _report_progress(key, results)
+
+    if not args.only or "generate" in args.only:
+        generator = PasswordGenerator(analyzer)
+        generator.preload()
+        count = max(args.size // 50, 10)
+        results["generate[random]"] = measure_latency(lambda _: generator.generate(), range(count), 1)
+        _report_progress("generate[random]", results)
+        try:
+            generator.generate_passphrase()
+        except ValueError:
+            pass  # The dictionary is too small for passphrases
+        else:
+            results["generate[passphrase]"] = measure_latency(lambda _: generator.generate_passphrase(),
+                                                              range(count), 1)
+            _report_progress("generate[passphrase]", results)
+    return results
+
+
+def run_flask_benchmarks(args, corpora: Dict[str, List[str]]) -> Dict[str, Dict]:
+    """Drive the app's routes through Flask's test client, in process
+
+    Uses app.py's own components, configured by the same environment
+    variables, including its result cache, as a deployed worker would.
+    """
+    import app as app_module
+
+    app_module.preload()
+    client = app_module.app.test_client()
+
+    def post(path, payload):
+        response = client.post(path, json=payload)
+        response.get_data()  # Drain streamed bodies
+        if response.status_code != 200:
+            raise RuntimeError(f"POST {path} returned {response.status_code}")
+
+    results = {}
+    for corpus_name, passwords in corpora.items():
+        passwords = [pwd for pwd in passwords if pwd]
+        key = f"flask_analyze[{corpus_name}]"
+        results[key] = measure_latency(lambda pwd: post("/analyze", {"password": pwd}), passwords, 1)
+        _report_progress(key, results)
+        key = f"flask_analyze_batch[{corpus_name}]"
+        results[key] = measure_throughput(lambda batch: post("/analyze_batch", {"passwords": batch}),
+                                          passwords, args.rounds)
+        _report_progress(key, results)
+
+    count = max(args.size // 50, 10)
+    results["flask_generate"] = measure_latency(lambda _: post("/generate", {"min_score": 80}), range(count), 1)
+    _report_progress("flask_generate", results)
+    return results
+
+
+def _report_progress(name: str, results: Dict[str, Dict]):
+    metrics = results[name]
+    if "p50_us" in metrics:
+        summary = f"p50 {metrics['p50_us']:>10.2f} us  p90 {metrics['p90_us']:>10.2f} us  p99 {metrics['p99_us']:>10.2f} us"
+    else:
+        summary = f"{metrics['items_per_second']:>12.1f} passwords/s"
+    print(f"{name:<40} {summary}", file=sys.stderr)
+
+
+def print_comparison(rows: List[Dict]):
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(f"{row['benchmark']:<40} {row['metric']:<18} {row['baseline']:>12} -> {row['current']:>12} "
+              f"({row['ratio']:.2f}x) {flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point; exits 1 if any benchmark regressed against --baseline"""
+    parser = argparse.ArgumentParser(description="Benchmark the analyzer, GenAI heuristics and Flask routes")
+    parser.add_argument("--corpus", nargs="+", choices=sorted(CORPORA), default=sorted(CORPORA),
+                        help="synthetic corpora to run (default: all)")
+    parser.add_argument("--corpus-file", action="append",
+                        help="also benchmark a sample of a real password list (.gz supported); repeatable")
+    parser.add_argument("--size", type=int, default=2000, help="passwords per corpus (default: 2000)")
+    parser.add_argument("--rounds", type=int, default=3, help="passes over each corpus (default: 3)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", nargs="+",
+                        choices=PER_PASSWORD_BENCHMARKS + ["analyze_many", "generate"],
+                        help="run only these component benchmarks")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip the tracemalloc peak-memory passes")
+    parser.add_argument("--dictionary", default=None, help="common word list or .dawg (default: built-in list)")
+    parser.add_argument("--leak-db", default=None, help="leak index (default: built-in list)")
+    parser.add_argument("--ml-model", default=None, help="ML strength model (default: none)")
+    parser.add_argument("--flask", action="store_true",
+                        help="also time app.py's routes through the Flask test client")
+    parser.add_argument("--flask-only", action="store_true", help="time only the Flask routes")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="relative change counted as a regression (default: 0.20, since "
+                             "timings on shared machines vary by 10%% or more between runs)")
+    args = parser.parse_args(argv)
+
+    corpora = build_corpora(args)
+    results: Dict[str, Dict] = {}
+    startup = {}
+    if not args.flask_only:
+        analyzer = PasswordAnalyzer(ml_model_path=args.ml_model, leaked_password_db_path=args.leak_db,
+                                    common_words_path=args.dictionary)
+        startup = {name: round(seconds, 6) for name, seconds in analyzer.preload().items()}
+        results.update(run_component_benchmarks(args, analyzer, corpora))
+    if args.flask or args.flask_only:
+        try:
+            results.update(run_flask_benchmarks(args, corpora))
+        except ImportError as error:
+            parser.error(f"the Flask benchmarks need app.py's dependencies installed ({error})")
+
+    report = {
+        "format_version": FORMAT_VERSION,
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpora": {name: len(passwords) for name, passwords in corpora.items()},
+            "rounds": args.rounds,
+            "seed": args.seed,
+        },
+        "startup_seconds": startup,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        rows = compare(results, baseline.get("results", {}), args.tolerance)
+        print_comparison(rows)
+        regressions = [row for row in rows if row["regressed"]]
+        if regressions:
+            print(f"{len(regressions)} of {len(rows)} metrics regressed by more than {args.tolerance:.0%}")
+            return 1
+        print(f"No regressions in {len(rows)} metrics")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# gunicorn.conf.py - Production server settings: gunicorn -c gunicorn.conf.py app:app
+# With preload_app the master loads the dictionary, leak index and ML model once
+# and forked workers share those pages copy-on-write instead of loading their own
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+preload_app = os.environ.get("PRELOAD_APP", "1") != "0"
+
+
+def _log_startup(log, report, where):
+    resources = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in report["load_seconds"].items())
+    log.info("Loaded resources in %s in %.3fs: %s", where, report["total_load_seconds"], resources)
+
+
+def when_ready(server):
+    """Load every resource in the master, after the app is imported and before workers fork"""
+    if not preload_app:
+        return
+    import app
+    _log_startup(server.log, app.preload(), "master")
+    # Move everything loaded so far out of the collector's reach, so garbage
+    # collections in workers don't write to (and so copy) the shared pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """Without preload_app, load every resource in each worker before it serves requests"""
+    if preload_app:
+        return
+    import app
+    _log_startup(worker.log, app.preload(), f"worker {worker.pid}")
@@ -0,0 +1,296 @@
+# Client Export - Rule tables for the browser's scorer, and a parity check against the server
+# `build` writes the dictionary, patterns and scoring constants as one static JSON file
+# for static/js/analyzer.js; `check` scores the benchmark corpora with both and diffs them
+
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import features, guesses, leak_variants
+from models.password_analyzer import IMPROVEMENT_SUBSTITUTIONS, PasswordAnalyzer
+from models.pattern_detector import KEYBOARD_PATTERNS, PATTERN_ORDER, SEQUENTIAL_NUMBERS
+
+# Bump with RULES_VERSION in static/js/analyzer.js when the format changes
+RULES_VERSION = 4
+
+STATIC_JS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "js")
+DEFAULT_RULES_PATH = os.path.join(STATIC_JS, "analyzer-rules.json")
+SCORER_PATH = os.path.join(STATIC_JS, "analyzer.js")
+
+# Result fields the browser must reproduce exactly; entropy and raw seconds may differ in the last bits
+EXACT_FIELDS = ("score", "time_to_crack", "attack_vector", "patterns_detected", "vulnerability_factors",
+                "suggestions", "is_compromised", "is_leaked_variant")
+CLOSE_FIELDS = ("entropy", "time_to_crack_seconds")
+
+# Python's str predicates the scorer reimplements with Unicode property regexes
+PREDICATES = {
+    "upper": str.isupper,
+    "lower": str.islower,
+    "digit": str.isdigit,
+    "decimal": str.isdecimal,
+    "alnum": str.isalnum,
+    "alpha": str.isalpha,
+}
+
+# Scores the cases read from stdin with analyzer.js; argv holds the scorer and rules paths
+_NODE_RUNNER = r"""
+const fs = require('fs');
+const { createScorer } = require(process.argv[1]);
+const request = JSON.parse(fs.readFileSync(0, 'utf8'));
+const rules = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+const scorer = createScorer(rules, { referenceYear: request.reference_year });
+const results = request.cases.map(c => scorer.analyze(c.password, c));
+const variants = request.cases.map(c => scorer.candidateVariants(c.password));
+const predicates = {};
+if (request.predicates) {
+    for (const [name, expected] of Object.entries(request.predicates.expected)) {
+        const differing = [];
+        let next = 0;
+        for (const [lo, hi] of request.predicates.assigned) {
+            for (let code = lo; code <= hi; code++) {
+                while (next < expected.length && expected[next][1] < code) next++;
+                const holds = next < expected.length && expected[next][0] <= code;
+                if (scorer.predicates[name](String.fromCodePoint(code)) !== holds) differing.push(code);
+            }
+        }
+        predicates[name] = differing;
+    }
+}
+process.stdout.write(JSON.stringify({ results, variants, predicates, unicode_version: process.versions.unicode }));
+"""
+
+
+def _ranges(code_points: Iterable[int]) -> List[List[int]]:
+    """Collapse ascending code points into inclusive [first, last] ranges"""
+    ranges: List[List[int]] = []
+    for code in code_points:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return ranges
+
+
+def _assigned_code_points() -> Iterable[int]:
+    """Code points assigned in this Python's Unicode database, without surrogates"""
+    return (code for code in range(sys.maxunicode + 1)
+            if unicodedata.category(chr(code)) not in ("Cn", "Cs"))
+
+
+def build_rules(analyzer: PasswordAnalyzer) -> Dict:
+    """Collect everything analyzer.js needs to score like `analyzer`, as JSON-ready data"""
+    words = list(analyzer.common_words)
+    estimator = analyzer.guess_estimator
+    return {
+        "version": RULES_VERSION,
+        "pattern_order": PATTERN_ORDER,
+        "keyboard_patterns": KEYBOARD_PATTERNS,
+        "sequential_numbers": SEQUENTIAL_NUMBERS,
+        "dictionary": {
+            "size": len(words),
+            "max_length": max(map(len, words), default=0),
+            "words": "\n".join(words),
+        },
+        "char_set_sizes": {
+            "lower": features.LOWERCASE_SIZE,
+            "upper": features.UPPERCASE_SIZE,
+            "digit": features.DIGIT_SIZE,
+            "special": features.SPECIAL_SIZE,
+        },
+        "score": {
+            "entropy_weight": analyzer.ENTROPY_SCORE_WEIGHT,
+            "compromised_factor": analyzer.COMPROMISED_SCORE_FACTOR,
+            "leaked_variant_factor": analyzer.LEAKED_VARIANT_SCORE_FACTOR,
+            "pattern_penalty": analyzer.PATTERN_PENALTY,
+        },
+        "crack_time_units": [list(unit) for unit in analyzer.CRACK_TIME_UNITS],
+        "improvement_substitutions": IMPROVEMENT_SUBSTITUTIONS,
+        # For candidate_variants, which the page hashes to look up leaked variants
+        "leak_variants": {
+            "enabled": analyzer.detect_leak_variants,
+            "substitutions": leak_variants.LEET_SUBSTITUTIONS,
+            "affix_characters": leak_variants.AFFIX_CHARACTERS,
+            "max_variants": leak_variants.MAX_VARIANTS,
+            "min_length": leak_variants.MIN_VARIANT_LENGTH,
+        },
+        # Logarithms are taken here so both sides start from the same floats
+        "guesses": {
+            "log10_attempts_per_second": guesses.LOG10_ATTEMPTS_PER_SECOND,
+            "log10_word_rank": estimator._log10_word_rank,
+            "log10_min_guesses_before_growing_sequence": math.log10(guesses.MIN_GUESSES_BEFORE_GROWING_SEQUENCE),
+            "log10_min_submatch_guesses_single_char": math.log10(guesses.MIN_SUBMATCH_GUESSES_SINGLE_CHAR),
+            "log10_min_submatch_guesses_multi_char": math.log10(guesses.MIN_SUBMATCH_GUESSES_MULTI_CHAR),
+            "log10_date_guesses": math.log10(guesses.DATE_GUESSES),
+            "min_year_space": guesses.MIN_YEAR_SPACE,
+            "keyboard_starting_positions": guesses.KEYBOARD_STARTING_POSITIONS,
+            "keyboard_average_degree": guesses.KEYBOARD_AVERAGE_DEGREE,
+            "max_cover_states": guesses.MAX_COVER_STATES,
+            "repeat_class_sizes": {
+                "digit": guesses._class_size("0"),
+                "letter": guesses._class_size("a"),
+                "other": guesses._class_size("!"),
+            },
+        },
+        # str.isdigit() also accepts superscripts, circled digits and the like,
+        # which have no Unicode property of their own in JavaScript regexes
+        "unicode": {
+            "version": unicodedata.unidata_version,
+            "digit_ranges": _ranges(code for code in _assigned_code_points()
+                                    if chr(code).isdigit() and not chr(code).isdecimal()),
+        },
+    }
+
+
+def serialize_rules(rules: Dict) -> str:
+    return json.dumps(rules, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def write_rules(analyzer: PasswordAnalyzer, path: str) -> int:
+    """Write the rules file for `analyzer`; returns its size in bytes"""
+    data = serialize_rules(build_rules(analyzer)).encode("utf-8")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(data)
+    os.replace(temporary, path)
+    return len(data)
+
+
+def _predicate_ranges() -> Dict:
+    """Assigned code points, and the ranges where each predicate holds, for the node runner"""
+    assigned = list(_assigned_code_points())
+    return {
+        "assigned": _ranges(assigned),
+        "expected": {name: _ranges(code for code in assigned if predicate(chr(code)))
+                     for name, predicate in PREDICATES.items()},
+    }
+
+
+def run_scorer(cases: List[Dict], rules_path: str, node: str = "node",
+               predicates: Optional[Dict] = None) -> Dict:
+    """Score `cases` ({password, is_compromised, is_leaked_variant}) with analyzer.js under node
+
+    Returns the results, each password's candidate leak variants, and the
+    character predicate differences when `predicates` is given.
+    """
+    request = {"reference_year": guesses.REFERENCE_YEAR, "cases": cases, "predicates": predicates}
+    completed = subprocess.run([node, "-e", _NODE_RUNNER, SCORER_PATH, os.path.abspath(rules_path)],
+                               input=json.dumps(request), capture_output=True, text=True, encoding="utf-8")
+    if completed.returncode != 0:
+        raise RuntimeError(f"analyzer.js failed: {completed.stderr.strip()}")
+    return json.loads(completed.stdout)
+
+
+def _as_float(value) -> float:
+    # JSON.stringify writes Infinity as null
+    return math.inf if value is None else value
+
+
+def compare_results(expected: Dict, actual: Dict) -> List[str]:
+    """Names of the fields where the browser's result differs from the server's"""
+    differing = [name for name in EXACT_FIELDS if expected[name] != actual[name]]
+    for name in CLOSE_FIELDS:
+        left, right = _as_float(expected[name]), _as_float(actual[name])
+        if left != right and not math.isclose(left, right, rel_tol=1e-9):
+            differing.append(name)
+    return differing
+
+
+def _corpus_cases(args) -> List[Tuple[str, List[str]]]:
+    from benchmarks.corpora import CORPORA, load_corpus
+
+    if args.corpus_file:
+        return [(os.path.basename(args.corpus_file), load_corpus(args.corpus_file, args.count, args.seed))]
+    return [(name, generate(args.count, args.seed)) for name, generate in CORPORA.items()]
+
+
+def check(args) -> int:
+    """Score the corpora on both sides and report every difference; returns the exit status"""
+    analyzer = PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=args.leak_db,
+                                common_words_path=args.common_words)
+    problems = 0
+    with open(args.rules, encoding="utf-8") as handle:
+        if handle.read() != serialize_rules(build_rules(analyzer)):
+            print(f"{args.rules} is out of date; rerun `python -m models.client_export build`", file=sys.stderr)
+            problems += 1
+
+    corpora = _corpus_cases(args)
+    cases = []
+    for _, passwords in corpora:
+        for password in passwords:
+            is_compromised, is_leaked_variant = analyzer.leak_status(password)
+            cases.append({"password": password, "is_compromised": is_compromised,
+                          "is_leaked_variant": is_leaked_variant})
+    output = run_scorer(cases, args.rules, args.node, _predicate_ranges() if args.unicode else None)
+
+    results = iter(zip(output["results"], output["variants"]))
+    for name, passwords in corpora:
+        mismatches = 0
+        for password in passwords:
+            actual, variants = next(results)
+            expected = analyzer.analyze_password(password, include_ml_strength=False).__dict__
+            differing = compare_results(expected, actual)
+            if variants != leak_variants.candidate_variants(password):
+                differing.append("candidate_variants")
+            if differing:
+                mismatches += 1
+                if mismatches <= args.show:
+                    print(f"  {password!r}: {', '.join(differing)}", file=sys.stderr)
+        print(f"{name}: {len(passwords)} passwords, {mismatches} mismatches")
+        problems += mismatches
+
+    # Newer Unicode versions change a few properties; that skew isn't the scorer's to fix
+    skewed = output["unicode_version"].split(".")[:2] != unicodedata.unidata_version.split(".")[:2]
+    for name, differing in output["predicates"].items():
+        print(f"str.is{name}: {len(differing)} code points differ"
+              + (f" (e.g. {', '.join(f'U+{code:04X}' for code in differing[:5])})" if differing else ""))
+        if not skewed:
+            problems += len(differing)
+    if skewed and any(output["predicates"].values()):
+        print(f"(Python has Unicode {unicodedata.unidata_version} and node {output['unicode_version']}, "
+              "so character class differences are not counted)")
+    return 1 if problems else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: build the browser rules file, or check the browser scorer against the server"""
+    parser = argparse.ArgumentParser(description="Export analyzer rules for the browser and check score parity")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    build = subcommands.add_parser("build", help="write the rules file for static/js/analyzer.js")
+    build.add_argument("-o", "--output", default=DEFAULT_RULES_PATH, help="rules file to write")
+    build.add_argument("--common-words", default=None, help="common word list or .dawg (default: built-in list)")
+
+    parity = subcommands.add_parser("check", help="score the benchmark corpora with both analyzers and diff them")
+    parity.add_argument("--rules", default=DEFAULT_RULES_PATH, help="rules file analyzer.js loads")
+    parity.add_argument("--common-words", default=None, help="common word list or .dawg the rules were built from")
+    parity.add_argument("--leak-db", default=None, help="leak index (default: built-in list)")
+    parity.add_argument("--count", type=int, default=500, help="passwords per corpus")
+    parity.add_argument("--seed", type=int, default=1)
+    parity.add_argument("--corpus-file", default=None, help="sample a real password list instead (.gz supported)")
+    parity.add_argument("--unicode", action="store_true",
+                        help="also compare the character class predicates over every assigned code point")
+    parity.add_argument("--show", type=int, default=10, help="mismatching passwords to print per corpus")
+    parity.add_argument("--node", default="node", help="node executable")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        analyzer = PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=None,
+                                    common_words_path=args.common_words)
+        size = write_rules(analyzer, args.output)
+        print(f"wrote {args.output} ({len(analyzer.common_words)} words, {size} bytes)")
+        return 0
+
+    if shutil.which(args.node) is None:
+        parser.error(f"{args.node} not found; the check runs analyzer.js under node")
+    return check(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# Password Features - Per-password facts shared by the analyzer, suggestions and GenAI
+# Computed once per request; the more expensive parts are only built when first used
+
+from collections import Counter
+import re
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Tuple
+
+from models.pattern_detector import PatternMatch
+
+# Maps ASCII letters and digits to class markers; every other character is
+# left unchanged, so one translate() plus a set classifies an ASCII password
+_CLASS_MARKERS = str.maketrans(
+    {**{c: "l" for c in "abcdefghijklmnopqrstuvwxyz"},
+     **{c: "u" for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"},
+     **{c: "d" for c in "0123456789"}}
+)
+_ALNUM_MARKERS = frozenset("lud")
+
+_LETTER_SEQUENCE = re.compile(r"abc|bcd|cde|def|efg|fgh|ghi|hij|ijk|jkl|klm|lmn|mno|nop|opq|pqr|qrs|rst|stu|tuv|uvw|vwx|wxy|xyz")
+_SEPARATED_DATE = re.compile(r"(0[1-9]|1[0-2])[/.-](0[1-9]|[12]\d|3[01])")
+
+# Brute-force alphabet size contributed by each character class present
+LOWERCASE_SIZE = 26
+UPPERCASE_SIZE = 26
+DIGIT_SIZE = 10
+SPECIAL_SIZE = 33
+
+# Runs of at least this many letters are treated as words
+MIN_WORD_LENGTH = 3
+_ASCII_WORD = re.compile(r"[A-Za-z]{%d,}" % MIN_WORD_LENGTH)
+
+
+def character_classes(text: str) -> Tuple[bool, bool, bool, bool]:
+    """Return whether `text` has uppercase, lowercase, digit and special characters
+
+    Uses the same str-method rules as the analyzer: special means not alphanumeric.
+    """
+    if text.isascii():
+        markers = set(text.translate(_CLASS_MARKERS))
+        return "u" in markers, "l" in markers, "d" in markers, not markers <= _ALNUM_MARKERS
+    chars = set(text)
+    return (any(c.isupper() for c in chars), any(c.islower() for c in chars),
+            any(c.isdigit() for c in chars), any(not c.isalnum() for c in chars))
+
+
+class PasswordFeatures:
+    """Immutable facts about one password, shared by every stage that analyzes it
+
+    Character classes, charset size, pattern labels and usually pattern spans
+    are computed up front. The histogram, word spans and the GenAI-specific
+    checks are computed on first access and then reused. Every public
+    attribute is a read-only property over a private slot.
+    """
+    __slots__ = ("_password", "_has_upper", "_has_lower", "_has_digit", "_has_special", "_patterns",
+                 "_detector", "_histogram", "_pattern_spans", "_word_spans", "_has_letter_sequence",
+                 "_has_separated_date")
+
+    def __init__(self, password: str, patterns: List[str], detector,
+                 classes: Optional[Tuple[bool, bool, bool, bool]] = None,
+                 histogram: Optional[Mapping[str, int]] = None,
+                 pattern_spans: Optional[List[Tuple[int, int, str]]] = None):
+        """Wrap precomputed facts; use from_password() unless pattern labels are already known
+
+        `detector` is the PatternDetector used to find pattern spans on demand
+        when `pattern_spans` isn't given.
+        """
+        self._password = password
+        self._has_upper, self._has_lower, self._has_digit, self._has_special = classes or character_classes(password)
+        self._patterns = tuple(patterns)
+        self._detector = detector
+        self._histogram = MappingProxyType(dict(histogram)) if histogram is not None else None
+        self._pattern_spans = tuple(pattern_spans) if pattern_spans is not None else None
+        # Computed on first use
+        self._word_spans = None
+        self._has_letter_sequence = None
+        self._has_separated_date = None
+
+    @classmethod
+    def from_password(cls, password: str, detector) -> "PasswordFeatures":
+        """Compute the features of `password`, detecting patterns with `detector`"""
+        spans = detector.find_spans(password)
+        return cls(password, detector.span_labels(spans), detector, pattern_spans=spans)
+
+    def __repr__(self) -> str:
+        # Never include the password itself
+        return f"<{type(self).__name__} length={self.length} patterns={list(self._patterns)}>"
+
+    @property
+    def password(self) -> str:
+        return self._password
+
+    @property
+    def length(self) -> int:
+        return len(self._password)
+
+    @property
+    def has_upper(self) -> bool:
+        return self._has_upper
+
+    @property
+    def has_lower(self) -> bool:
+        return self._has_lower
+
+    @property
+    def has_digit(self) -> bool:
+        return self._has_digit
+
+    @property
+    def has_special(self) -> bool:
+        return self._has_special
+
+    @property
+    def char_set_size(self) -> int:
+        """Size of the brute-force alphabet implied by the character classes present"""
+        return (LOWERCASE_SIZE * self._has_lower + UPPERCASE_SIZE * self._has_upper
+                + DIGIT_SIZE * self._has_digit + SPECIAL_SIZE * self._has_special)
+
+    @property
+    def patterns(self) -> Tuple[str, ...]:
+        """Distinct pattern labels, in reporting order"""
+        return self._patterns
+
+    @property
+    def histogram(self) -> Mapping[str, int]:
+        """Character counts, in order of first occurrence"""
+        if self._histogram is None:
+            counts = {}
+            for char in self._password:
+                if char in counts:
+                    counts[char] += 1
+                else:
+                    counts[char] = 1
+            self._histogram = MappingProxyType(counts)
+        return self._histogram
+
+    @property
+    def pattern_spans(self) -> Tuple[Tuple[int, int, str], ...]:
+        """Every pattern occurrence as (start, end, label), ordered by start position"""
+        if self._pattern_spans is None:
+            self._pattern_spans = tuple(self._detector.find_spans(self._password))
+        return self._pattern_spans
+
+    @property
+    def pattern_matches(self) -> List[PatternMatch]:
+        """Every pattern occurrence as a PatternMatch, ordered by start position"""
+        return [PatternMatch(label, start, end, self._password[start:end])
+                for start, end, label in self.pattern_spans]
+
+    @property
+    def word_spans(self) -> Tuple[Tuple[int, int], ...]:
+        """(start, end) spans of runs of MIN_WORD_LENGTH or more letters"""
+        if self._word_spans is None:
+            self._word_spans = self._find_word_spans()
+        return self._word_spans
+
+    @property
+    def words(self) -> List[str]:
+        """The letter runs covered by word_spans"""
+        return [self._password[start:end] for start, end in self.word_spans]
+
+    @property
+    def has_letter_sequence(self) -> bool:
+        """Whether the password contains three consecutive alphabet letters, such as 'abc'"""
+        if self._has_letter_sequence is None:
+            self._has_letter_sequence = _LETTER_SEQUENCE.search(self._password.lower()) is not None
+        return self._has_letter_sequence
+
+    @property
+    def has_separated_date(self) -> bool:
+        """Whether the password contains a month and day joined by '/', '.' or '-'"""
+        if self._has_separated_date is None:
+            self._has_separated_date = _SEPARATED_DATE.search(self._password) is not None
+        return self._has_separated_date
+
+    def _find_word_spans(self) -> Tuple[Tuple[int, int], ...]:
+        password = self._password
+        if password.isascii():
+            return tuple(match.span() for match in _ASCII_WORD.finditer(password))
+        spans = []
+        start = 0
+        for index, char in enumerate(password):
+            if not char.isalpha():
+                if index - start >= MIN_WORD_LENGTH:
+                    spans.append((start, index))
+                start = index + 1
+        if len(password) - start >= MIN_WORD_LENGTH:
+            spans.append((start, len(password)))
+        return tuple(spans)
@@ -1,9 +1,33 @@
 # GenAI Component for Password Suggestions
 # This module would interface with an LLM to generate better password suggestions
 
-import re
 import random
-from typing import List, Dict, Tuple
+import re
+from typing import Dict, Optional, Tuple
+
+from models.features import PasswordFeatures, character_classes
+from models.leak_variants import LEET_SUBSTITUTIONS
+from models.llm_backend import LLMBackend, LLMError
+from models.metrics import MetricsRegistry, stage_timer
+from models.pattern_detector import PatternDetector
+from models.wordlist import CompactDawg
+
+_SPECIAL_CHARS = "!@#$%^&*()-_=+[]{}|;:,.<>?/"
+
+# The GenAI text counts only ASCII letters and digits as letters and digits
+_ASCII_UPPER = re.compile(r"[A-Z]")
+_ASCII_LOWER = re.compile(r"[a-z]")
+_ASCII_DIGIT = re.compile(r"[0-9]")
+_NOT_ASCII_ALNUM = re.compile(r"[^a-zA-Z0-9]")
+_ASCII_WORD = re.compile(r"[a-zA-Z]{4,}")
+
+
+def _ascii_classes(text: str) -> Tuple[bool, bool, bool, bool]:
+    """Return whether `text` has ASCII uppercase, ASCII lowercase, ASCII digit and other characters"""
+    if text.isascii():
+        return character_classes(text)
+    return (_ASCII_UPPER.search(text) is not None, _ASCII_LOWER.search(text) is not None,
+            _ASCII_DIGIT.search(text) is not None, _NOT_ASCII_ALNUM.search(text) is not None)
 
 class PasswordGenAI:
     """
@@ -11,91 +35,91 @@ class PasswordGenAI:
     In a production environment, this would interface with an actual LLM model
     """
     
-    def __init__(self, model_name: str = "gpt-3.5-turbo"):
-        """Initialize the GenAI component"""
+    def __init__(self, model_name: str = "gpt-3.5-turbo", backend: Optional[LLMBackend] = None,
+                 pattern_detector: Optional[PatternDetector] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        """Initialize the GenAI component
+        
+        Without a backend, all text comes from the local heuristics below. With
+        one, the async methods ask the model for the prose and fall back to the
+        heuristics if it fails or times out. `pattern_detector` is used only
+        when callers don't pass in PasswordFeatures from the analyzer. With
+        `metrics`, heuristic and LLM calls are timed and LLM outcomes counted.
+        """
         self.model_name = model_name
+        self.backend = backend
+        self.metrics = metrics
+        self.pattern_detector = pattern_detector or PatternDetector(CompactDawg.from_words([]))
         # Dictionary of common substitutions for character replacements
-        self.substitutions = {
-            'a': ['@', '4'],
-            'b': ['8', '6'],
-            'e': ['3', '€'],
-            'i': ['1', '!', '|'],
-            'l': ['1', '|', '/'],
-            'o': ['0', 'ø', '()'],
-            's': ['5', '$'],
-            't': ['7', '+'],
-            'g': ['9', '&'],
-            'z': ['2', '%']
-        }
+        self.substitutions = {letter: list(substitutes) for letter, substitutes in LEET_SUBSTITUTIONS.items()}
         
-    def _identify_patterns(self, password: str) -> Dict[str, bool]:
+    def extract_features(self, password: str) -> PasswordFeatures:
+        """Compute the password's features when the analyzer hasn't already"""
+        return PasswordFeatures.from_password(password, self.pattern_detector)
+    
+    def _identify_patterns(self, features: PasswordFeatures) -> Dict[str, bool]:
         """Identify various patterns in the password"""
+        password = features.password
+        if password.isascii():
+            # The features' classes and letter runs already follow the ASCII rules
+            upper, lower = features.has_upper, features.has_lower
+            digit, special = features.has_digit, features.has_special
+            has_word = any(end - start >= 4 for start, end in features.word_spans)
+        else:
+            upper, lower, digit, special = _ascii_classes(password)
+            has_word = _ASCII_WORD.search(password) is not None
         patterns = {
-            'has_lowercase': bool(re.search(r'[a-z]', password)),
-            'has_uppercase': bool(re.search(r'[A-Z]', password)),
-            'has_digit': bool(re.search(r'[0-9]', password)),
-            'has_special': bool(re.search(r'[^a-zA-Z0-9]', password)),
-            'has_word': bool(re.search(r'[a-zA-Z]{4,}', password)),
-            'has_sequence': bool(re.search(r'(abc|bcd|cde|def|efg|fgh|ghi|hij|ijk|jkl|klm|lmn|mno|nop|opq|pqr|qrs|rst|stu|tuv|uvw|vwx|wxy|xyz|012|123|234|345|456|567|678|789)', password.lower())),
-            'has_repetition': bool(re.search(r'(.)\1{2,}', password)),
-            'has_year': bool(re.search(r'19\d{2}|20\d{2}', password)),
-            'has_date': bool(re.search(r'(0[1-9]|1[0-2])[/.-](0[1-9]|[12]\d|3[01])', password))
+            'has_lowercase': lower,
+            'has_uppercase': upper,
+            'has_digit': digit,
+            'has_special': special,
+            'has_word': has_word,
+            'has_sequence': 'sequential_numbers' in features.patterns or features.has_letter_sequence,
+            'has_repetition': 'repeated_characters' in features.patterns,
+            'has_year': 'year' in features.patterns,
+            'has_date': features.has_separated_date
         }
         return patterns
     
-    def _extract_recognizable_words(self, password: str) -> List[str]:
-        """Extract potential words from the password"""
-        # This is a simplified implementation
-        # In a real scenario, this would use more sophisticated word recognition
-        words = []
-        current_word = ""
-        
-        for char in password:
-            if char.isalpha():
-                current_word += char
-            else:
-                if len(current_word) >= 3:  # Consider sequences of 3+ letters as potential words
-                    words.append(current_word)
-                current_word = ""
-                
-        if len(current_word) >= 3:
-            words.append(current_word)
-            
-        return words
-    
     def _generate_replacement_for_word(self, word: str) -> str:
         """Generate a replacement for a recognized word"""
-        result = ""
+        parts = []
         for char in word:
-            if char.lower() in self.substitutions and random.random() > 0.5:
-                replacement = random.choice(self.substitutions[char.lower()])
-                result += replacement
+            options = self.substitutions.get(char.lower())
+            if options and random.random() > 0.5:
+                parts.append(random.choice(options))
             else:
                 # Randomly capitalize some letters
                 if random.random() > 0.7:
-                    result += char.upper()
+                    parts.append(char.upper())
                 else:
-                    result += char
-        return result
+                    parts.append(char)
+        return "".join(parts)
     
     def _insert_special_chars(self, password: str) -> str:
         """Insert special characters at random positions"""
-        special_chars = "!@#$%^&*()-_=+[]{}|;:,.<>?/"
-        positions = random.sample(range(len(password) + 1), min(3, len(password) + 1))
+        positions = sorted(random.sample(range(len(password) + 1), min(3, len(password) + 1)))
         
-        result = ""
-        for i in range(len(password) + 1):
-            if i in positions:
-                result += random.choice(special_chars)
-            if i < len(password):
-                result += password[i]
+        # Copy the slices between insertion points rather than every character
+        parts = []
+        previous = 0
+        for position in positions:
+            parts.append(password[previous:position])
+            parts.append(random.choice(_SPECIAL_CHARS))
+            previous = position
+        parts.append(password[previous:])
                 
-        return result
+        return "".join(parts)
     
-    def generate_suggestion(self, password: str) -> str:
-        """Generate an improved password suggestion based on the input"""
-        patterns = self._identify_patterns(password)
-        words = self._extract_recognizable_words(password)
+    def generate_suggestion(self, password: str, features: Optional[PasswordFeatures] = None) -> Tuple[str, str]:
+        """Generate an improved password suggestion based on the input
+        
+        Pass the password's `features` if they have already been computed.
+        """
+        features = features or self.extract_features(password)
+        timer = stage_timer(self.metrics, "genai")
+        patterns = self._identify_patterns(features)
+        words = features.words
         
         # Start with the original password
         improved = password
@@ -110,8 +134,11 @@ class PasswordGenAI:
         # Ensure improved password has required character types
         if not patterns['has_uppercase']:
             # Add uppercase if none exists
-            pos = random.randint(0, len(improved) - 1)
-            improved = improved[:pos] + improved[pos].upper() + improved[pos+1:]
+            if improved:
+                pos = random.randint(0, len(improved) - 1)
+                improved = improved[:pos] + improved[pos].upper() + improved[pos+1:]
+            else:
+                improved = chr(random.randint(65, 90))
             
         if not patterns['has_digit']:
             # Add digits if none exist
@@ -131,6 +158,8 @@ class PasswordGenAI:
             
         # Generate natural language explanation for improvements
         explanation = self._generate_improvement_explanation(password, improved, patterns)
+        if timer is not None:
+            timer.lap("suggestion")
             
         return improved, explanation
     
@@ -143,13 +172,14 @@ class PasswordGenAI:
             explanations.append(f"I increased the length from {len(original)} to {len(improved)} characters")
             
         # Check for character type improvements
-        if not patterns['has_uppercase'] and bool(re.search(r'[A-Z]', improved)):
+        improved_upper, _, improved_digit, improved_special = _ascii_classes(improved)
+        if not patterns['has_uppercase'] and improved_upper:
             explanations.append("I added uppercase letters")
             
-        if not patterns['has_digit'] and bool(re.search(r'[0-9]', improved)):
+        if not patterns['has_digit'] and improved_digit:
             explanations.append("I added numeric digits")
             
-        if not patterns['has_special'] and bool(re.search(r'[^a-zA-Z0-9]', improved)):
+        if not patterns['has_special'] and improved_special:
             explanations.append("I added special characters")
             
         if patterns['has_word']:
@@ -176,10 +206,16 @@ class PasswordGenAI:
             
         return explanation_text
     
-    def generate_reason_for_weakness(self, password: str, time_to_crack: str, attack_vector: str) -> str:
-        """Generate a natural language explanation of why the password is weak"""
-        patterns = self._identify_patterns(password)
-        words = self._extract_recognizable_words(password)
+    def generate_reason_for_weakness(self, password: str, time_to_crack: str, attack_vector: str,
+                                     features: Optional[PasswordFeatures] = None) -> str:
+        """Generate a natural language explanation of why the password is weak
+        
+        Pass the password's `features` if they have already been computed.
+        """
+        features = features or self.extract_features(password)
+        timer = stage_timer(self.metrics, "genai")
+        patterns = self._identify_patterns(features)
+        words = features.words
         
         reasons = []
         
@@ -228,8 +264,67 @@ class PasswordGenAI:
         # Combine all reasons
         if not reasons:
             # This should rarely happen but just in case
-            return f"Your password has some structural weaknesses. {time_context}"
-            
-        reason_text = " ".join(reasons) + " " + time_context
+            reason_text = f"Your password has some structural weaknesses. {time_context}"
+        else:
+            reason_text = " ".join(reasons) + " " + time_context
+        if timer is not None:
+            timer.lap("reasoning")
         
-        return reason_text
\ No newline at end of file
+        return reason_text
+    
+    def _describe_password(self, password: str, patterns: Dict[str, bool]) -> str:
+        """Describe the password's structure for a prompt without revealing it"""
+        traits = [f"{len(password)} characters long"]
+        traits += [name.replace('has_', 'contains ') for name, present in patterns.items() if present]
+        traits += [name.replace('has_', 'no ') for name in ('has_uppercase', 'has_lowercase', 'has_digit', 'has_special')
+                   if not patterns[name]]
+        return ", ".join(traits)
+    
+    async def agenerate_reason_for_weakness(self, password: str, time_to_crack: str, attack_vector: str,
+                                            features: Optional[PasswordFeatures] = None) -> str:
+        """Async version of generate_reason_for_weakness that asks the LLM backend for the prose"""
+        features = features or self.extract_features(password)
+        if self.backend is None:
+            return self.generate_reason_for_weakness(password, time_to_crack, attack_vector, features)
+            
+        # Only the password's structure is sent to the model, never the password itself
+        prompt = (
+            "In two or three sentences, explain to a user why their password is weak. "
+            f"The password is {self._describe_password(password, self._identify_patterns(features))}. "
+            f"It could be cracked in about {time_to_crack} using a {attack_vector}."
+        )
+        timer = stage_timer(self.metrics, "genai")
+        try:
+            text = await self.backend.complete(prompt)
+        except LLMError:
+            self._record_llm_outcome(timer, "llm_reasoning", "fallback")
+            return self.generate_reason_for_weakness(password, time_to_crack, attack_vector, features)
+        self._record_llm_outcome(timer, "llm_reasoning", "ok")
+        return text
+    
+    async def agenerate_suggestion(self, password: str,
+                                   features: Optional[PasswordFeatures] = None) -> Tuple[str, str]:
+        """Async version of generate_suggestion; the improved password is always generated locally"""
+        features = features or self.extract_features(password)
+        improved, explanation = self.generate_suggestion(password, features)
+        if self.backend is None:
+            return improved, explanation
+            
+        prompt = (
+            "In one or two sentences, explain to a user how a stronger password improves on theirs. "
+            f"Their password is {self._describe_password(password, self._identify_patterns(features))}. "
+            f"The stronger one is {self._describe_password(improved, self._identify_patterns(self.extract_features(improved)))}."
+        )
+        timer = stage_timer(self.metrics, "genai")
+        try:
+            text = await self.backend.complete(prompt)
+        except LLMError:
+            self._record_llm_outcome(timer, "llm_explanation", "fallback")
+            return improved, explanation
+        self._record_llm_outcome(timer, "llm_explanation", "ok")
+        return improved, text
+    
+    def _record_llm_outcome(self, timer, stage: str, outcome: str):
+        if timer is not None:
+            timer.lap(stage)
+            self.metrics.llm_requests.inc(outcome)
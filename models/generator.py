@@ -0,0 +1,185 @@
+# Password Generator - Constructs passwords that meet a target score and crack time
+# Lengths are solved from the analyzer's own model, so no candidate is ever rejected
+
+import dataclasses
+import math
+import os
+import secrets
+import string
+from typing import List, Tuple
+
+from models.guesses import brute_force_log10_guesses, seconds_from_log10_guesses
+from models.incremental import AnalysisSession
+from models.resources import LazyResource, LazyResources
+from models.scoring import ENTROPY_SCORE_WEIGHT, format_crack_time
+
+LOWERCASE = string.ascii_lowercase
+UPPERCASE = string.ascii_uppercase
+DIGITS = string.digits
+SPECIALS = string.punctuation
+ALL_CHARACTERS = LOWERCASE + UPPERCASE + DIGITS + SPECIALS
+
+# Charset size the analyzer assumes when all four classes are present
+FULL_CHAR_SET_SIZE = 26 + 26 + 10 + 33
+
+# Shorter passwords are always reported as "too short" by the analyzer
+MIN_LENGTH = 8
+# Random passwords use each character at most once, which bounds their length
+MAX_LENGTH = 64
+
+MAX_PASSPHRASE_WORDS = 16
+MIN_PASSPHRASE_VOCABULARY = 256
+PASSPHRASE_WORD_LENGTHS = range(4, 9)
+
+# Common English words, used for passphrases when the analyzer's dictionary
+# has fewer than MIN_PASSPHRASE_VOCABULARY suitable words (the built-in
+# default list has ten)
+PASSPHRASE_WORDLIST_PATH = os.path.join(os.path.dirname(__file__), "passphrase_words.txt")
+
+_system_random = secrets.SystemRandom()
+
+
+class PasswordGenerator(LazyResources):
+    """Generates passwords that satisfy a minimum score and time to crack
+
+    Random passwords are built so that every character is distinct, all four
+    character classes appear, no two digits are adjacent, and no character
+    completes a pattern the analyzer looks for. Their score and crack time then depend only on the
+    length, which is solved up front. Passphrases are grown word by word until
+    the running analysis meets the target. Every character is drawn with the
+    `secrets` module.
+    """
+
+    def __init__(self, analyzer):
+        """Generate against `analyzer`'s scoring model, dictionary and patterns"""
+        LazyResources.__init__(self)
+        self.analyzer = analyzer
+
+    def required_length(self, min_score: int, time_threshold_seconds: float) -> int:
+        """Return the shortest random password length that meets both criteria
+
+        Uses the analyzer's entropy formula and guess estimate for a password
+        of distinct characters drawn from all four classes with no patterns,
+        which an attacker can only brute force.
+        """
+        analyzer = self.analyzer
+        for length in range(MIN_LENGTH, MAX_LENGTH + 1):
+            entropy = analyzer._entropy_from_counts(dict.fromkeys(range(length), 1), length)
+            seconds = seconds_from_log10_guesses(brute_force_log10_guesses(length, FULL_CHAR_SET_SIZE))
+            if min(100, entropy * ENTROPY_SCORE_WEIGHT) >= min_score and seconds >= time_threshold_seconds:
+                return length
+        raise ValueError(f"No password of up to {MAX_LENGTH} characters meets these criteria")
+
+    def generate(self, min_score: int = 80, time_threshold_seconds: float = 0,
+                 count: int = 1) -> List[Tuple[str, object]]:
+        """Generate `count` random passwords; return (password, analysis result) pairs"""
+        length = self.required_length(min_score, time_threshold_seconds)
+        return [self._build_random(length, min_score, time_threshold_seconds) for _ in range(count)]
+
+    @staticmethod
+    def _slot_alphabets(length: int) -> List[str]:
+        """Pick the character class of each position of a `length`-character password
+
+        Every class appears, no class gets more positions than it has
+        characters, and no two digits are adjacent, so the password can never
+        hold a digit sequence, year or date.
+        """
+        classes = [LOWERCASE, UPPERCASE, DIGITS, SPECIALS]
+        max_digits = min(len(DIGITS), (length + 1) // 2)
+        # Classes of a random sample of distinct characters, one of each class guaranteed
+        pool = [alphabet for alphabet in classes for _ in range(len(alphabet) - 1)]
+        picks = list(classes)
+        while len(picks) < length:
+            alphabet = pool.pop(secrets.randbelow(len(pool)))
+            if alphabet is not DIGITS or picks.count(DIGITS) < max_digits:
+                picks.append(alphabet)
+
+        # Choosing digit positions from length - digits + 1 and spreading them
+        # out by their rank gives a uniform choice of non-adjacent positions
+        digits = picks.count(DIGITS)
+        offsets = sorted(_system_random.sample(range(length - digits + 1), digits))
+        digit_positions = {offset + rank for rank, offset in enumerate(offsets)}
+        others = [alphabet for alphabet in picks if alphabet is not DIGITS]
+        _system_random.shuffle(others)
+        return [DIGITS if position in digit_positions else others.pop() for position in range(length)]
+
+    def _build_random(self, length: int, min_score: int = 0,
+                      time_threshold_seconds: float = 0) -> Tuple[str, object]:
+        session = AnalysisSession(self.analyzer)
+        used = set()
+        for alphabet in self._slot_alphabets(length):
+            # Never empty: no class has more positions than characters
+            unused = [char for char in alphabet if char not in used]
+            # A uniform choice from the characters that don't complete a pattern; only
+            # a dictionary holding every one of them can leave none, and then any will do
+            allowed = [char for char in unused if not session.completes_pattern(char)]
+            char = secrets.choice(allowed or unused)
+            session.append(char)
+            used.add(char)
+
+        result = session.result()
+        if result.score < min_score or result.time_to_crack_seconds < time_threshold_seconds:
+            raise ValueError("The dictionary matches too many short strings to build a password that meets these criteria")
+        return session.password, result
+
+    @LazyResource
+    def dictionary_vocabulary(self) -> List[str]:
+        """Alphabetic dictionary words of moderate length, materialized once"""
+        return [word for word in self.analyzer.common_words
+                if word.isalpha() and len(word) in PASSPHRASE_WORD_LENGTHS]
+
+    @LazyResource
+    def passphrase_vocabulary(self) -> List[str]:
+        """Words passphrases are drawn from: the dictionary's, or the bundled wordlist if it has too few"""
+        if len(self.dictionary_vocabulary) >= MIN_PASSPHRASE_VOCABULARY:
+            return self.dictionary_vocabulary
+        with open(PASSPHRASE_WORDLIST_PATH, encoding="utf-8") as wordlist:
+            return [word for word in wordlist.read().split()
+                    if word.isalpha() and len(word) in PASSPHRASE_WORD_LENGTHS]
+
+    def generate_passphrase(self, min_score: int = 80, time_threshold_seconds: float = 0,
+                            count: int = 1) -> List[Tuple[str, object]]:
+        """Generate `count` passphrases; return (passphrase, analysis result) pairs
+
+        Words come from the analyzer's dictionary, capitalized, and are joined
+        by single random digits and symbols so that all four character classes
+        appear and no digits run together into years or dates. With fewer than
+        MIN_PASSPHRASE_VOCABULARY suitable dictionary words, they come from the
+        bundled wordlist instead.
+        """
+        vocabulary = self.passphrase_vocabulary
+        if len(vocabulary) < MIN_PASSPHRASE_VOCABULARY:
+            raise ValueError(f"Passphrases need a dictionary of at least {MIN_PASSPHRASE_VOCABULARY} words")
+        return [self._build_passphrase(vocabulary, min_score, time_threshold_seconds) for _ in range(count)]
+
+    def _wordlist_seconds(self, vocabulary: List[str], words: int) -> float:
+        """Seconds to crack a passphrase of `words` words for an attacker who knows the vocabulary"""
+        # A word per slot, then the separators: a digit and a symbol in either order, then any of either
+        log10_guesses = words * math.log10(len(vocabulary)) + math.log10(len(DIGITS) * len(SPECIALS) * 2)
+        log10_guesses += max(words - 3, 0) * math.log10(len(DIGITS) + len(SPECIALS))
+        return seconds_from_log10_guesses(log10_guesses)
+
+    def _build_passphrase(self, vocabulary: List[str], min_score: int,
+                          time_threshold_seconds: float) -> Tuple[str, object]:
+        session = AnalysisSession(self.analyzer)
+        # The first two separators are a digit and a symbol, in random order
+        separators = [secrets.choice(DIGITS), secrets.choice(SPECIALS)]
+        _system_random.shuffle(separators)
+
+        for index in range(MAX_PASSPHRASE_WORDS):
+            if index:
+                separator = separators[index - 1] if index <= 2 else secrets.choice(DIGITS + SPECIALS)
+                session.append(separator)
+            session.append(secrets.choice(vocabulary).capitalize())
+            if index >= 2:
+                result = session.result()
+                if vocabulary is not self.dictionary_vocabulary:
+                    # The analyzer doesn't know the bundled words and would brute force
+                    # them; an attacker would try the wordlist, so report that estimate
+                    seconds = self._wordlist_seconds(vocabulary, index + 1)
+                    if seconds < result.time_to_crack_seconds:
+                        result = dataclasses.replace(result, time_to_crack_seconds=seconds,
+                                                     time_to_crack=format_crack_time(seconds))
+                if result.score >= min_score and result.time_to_crack_seconds >= time_threshold_seconds:
+                    return session.password, result
+        raise ValueError(f"No passphrase of up to {MAX_PASSPHRASE_WORDS} words meets these criteria")
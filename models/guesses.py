@@ -0,0 +1,271 @@
+# Guess Estimator - Pattern-aware guess counts for PasswordAnalyzer
+# Scores each matched token like zxcvbn, then finds the cheapest way to cover the
+# password with tokens and brute-force gaps by dynamic programming over positions
+
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Attacker speed assumed throughout the analyzer: 10 billion guesses per second
+LOG10_ATTEMPTS_PER_SECOND = 10.0
+
+# zxcvbn's constants: each extra token multiplies the search by its position
+# count, and a sequence of l tokens costs at least 10000^(l-1) guesses
+MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10000
+MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
+MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
+MIN_YEAR_SPACE = 20
+REFERENCE_YEAR = time.localtime().tm_year
+
+# Average qwerty key neighbours and starting keys, used for keyboard walks
+KEYBOARD_STARTING_POSITIONS = 94
+KEYBOARD_AVERAGE_DEGREE = 4.6
+
+# Month and day combinations for dates without a year
+DATE_GUESSES = 366
+
+# Partial covers kept per position of the search; see GuessEstimator.log10_guesses
+MAX_COVER_STATES = 8
+
+_LOG10_GROWTH = math.log10(MIN_GUESSES_BEFORE_GROWING_SEQUENCE)
+_LOG10_SINGLE_FLOOR = math.log10(MIN_SUBMATCH_GUESSES_SINGLE_CHAR)
+_LOG10_MULTI_FLOOR = math.log10(MIN_SUBMATCH_GUESSES_MULTI_CHAR)
+
+# log10(k!) by k, extended as needed; factorials of long passwords' token
+# counts are big enough that recomputing them for every cover would dominate
+_log10_factorials = [0.0]
+_factorial = 1
+_factorials_lock = threading.Lock()
+
+
+def _reset_factorials_lock():
+    global _factorials_lock
+    _factorials_lock = threading.Lock()
+
+
+# A thread may be extending the table when a server forks
+os.register_at_fork(after_in_child=_reset_factorials_lock)
+
+
+def _log10_factorial(n: int) -> float:
+    global _factorial
+    if n >= len(_log10_factorials):
+        with _factorials_lock:
+            while len(_log10_factorials) <= n:
+                _factorial *= len(_log10_factorials)
+                _log10_factorials.append(math.log10(_factorial))
+    return _log10_factorials[n]
+
+
+def uppercase_variations(token: str) -> int:
+    """Number of capitalizations an attacker tries for a token (zxcvbn's rule)
+
+    All-lowercase tokens cost nothing extra; a capital first or last letter,
+    or all capitals, doubles the guesses; mixed case costs the number of ways
+    to place the capitals.
+    """
+    upper = sum(1 for char in token if char.isupper())
+    if not upper:
+        return 1
+    lower = sum(1 for char in token if char.islower())
+    if not lower or (upper == 1 and (token[0].isupper() or token[-1].isupper())):
+        return 2
+    return sum(math.comb(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def _class_size(char: str) -> int:
+    if char.isdigit():
+        return 10
+    if char.isalpha():
+        return 26
+    return 33
+
+
+def sequence_guesses(token: str) -> int:
+    """Guesses for an ascending run like '123': obvious starts are tried first"""
+    base = 4 if token[0] in "aAzZ019" else 10 if token[0].isdigit() else 26
+    return base * len(token)
+
+
+def keyboard_guesses(token: str) -> float:
+    """Guesses for a straight keyboard walk of len(token) keys"""
+    return (len(token) - 1) * KEYBOARD_STARTING_POSITIONS * KEYBOARD_AVERAGE_DEGREE * uppercase_variations(token)
+
+
+def combine_log10_guesses(token_count: int, log10_product: float) -> float:
+    """log10 of l! * product + 10000^(l-1), the cost of guessing l tokens in sequence"""
+    ordered = log10_product + _log10_factorial(token_count)
+    growth = (token_count - 1) * _LOG10_GROWTH
+    high, low = max(ordered, growth), min(ordered, growth)
+    return high + math.log10(1 + 10 ** (low - high))
+
+
+def log10_char_cost(char_set_size: int) -> float:
+    """log10 guesses for one brute-forced character from an alphabet of `char_set_size`"""
+    # Caseless letters (CJK, Thai, ...) are in none of the four classes, so a
+    # password made only of them has an empty alphabet; cost each character
+    # as a single guess rather than taking log10(0)
+    return math.log10(max(char_set_size, 1))
+
+
+def brute_force_log10_guesses(length: int, char_set_size: int) -> float:
+    """log10 guesses for a password with no patterns: one brute-force token"""
+    return combine_log10_guesses(1, length * log10_char_cost(char_set_size))
+
+
+def seconds_from_log10_guesses(log10_guesses: float) -> float:
+    """Seconds to try that many guesses at the analyzer's attack rate; inf if too large for a float"""
+    try:
+        return 10.0 ** (log10_guesses - LOG10_ATTEMPTS_PER_SECOND)
+    except OverflowError:
+        return math.inf
+
+
+# Partial covers of one prefix of the password: (token count, ends in brute
+# force) mapped to the cheapest (log10 product, token part, brute-force length)
+Covers = Dict[Tuple[int, bool], Tuple[float, float, int]]
+
+# The covers of the empty prefix
+START_COVERS: Covers = {(0, False): (0.0, 0.0, 0)}
+
+
+def prune_covers(states: Covers) -> Covers:
+    """Keep the partial covers of one position that can still lead to the cheapest cover
+
+    Of two covers that both end in brute force (or both in a token), the one
+    with more tokens and no smaller product can never finish cheaper, so it is
+    dropped. Of the rest, the MAX_COVER_STATES cheapest as they stand are kept:
+    this bounds the search for passwords full of short patterns, at the cost of
+    sometimes missing a cover with many more tokens.
+    """
+    kept = []
+    lowest = {False: math.inf, True: math.inf}
+    for key in sorted(states):
+        product = states[key][0]
+        if product < lowest[key[1]]:
+            lowest[key[1]] = product
+            kept.append(key)
+    if len(kept) > MAX_COVER_STATES:
+        kept.sort(key=lambda key: (combine_log10_guesses(key[0], states[key][0]), key))
+        del kept[MAX_COVER_STATES:]
+        kept.sort()
+    return {key: states[key] for key in kept}
+
+
+def extend_covers(covers: Sequence[Covers], tokens: Iterable[Tuple[int, float]], char_cost: float) -> Covers:
+    """Return the covers of the next position, password[:len(covers)]
+
+    `covers[j]` holds the pruned covers of password[:j], and `tokens` the
+    (start, log10 guesses) of every token ending at the new position, ordered
+    by start and label. The new position is reached by brute-forcing one
+    character after the last, or by a token after the cover of its start.
+    """
+    last = len(covers) - 1
+    token_costs: Dict[int, List[float]] = {}
+    for start, cost in tokens:
+        token_costs.setdefault(start, []).append(cost)
+
+    best: Covers = {}
+    for start in sorted(token_costs.keys() | {last}):
+        costs = token_costs.get(start, ())
+        for (count, in_gap), (product, token_part, gap_length) in covers[start].items():
+            if start == last:
+                # Extend the current brute-force gap, or start a new one, by one character
+                key = (count if in_gap else count + 1, True)
+                current = best.get(key)
+                if current is None or product + char_cost < current[0]:
+                    best[key] = (product + char_cost, token_part, gap_length + 1)
+            for cost in costs:
+                key = (count + 1, False)
+                current = best.get(key)
+                if current is None or product + cost < current[0]:
+                    best[key] = (product + cost, token_part + cost, gap_length)
+    return best
+
+
+def cheapest_cover(covers: Covers, char_cost: float) -> float:
+    """log10 guesses of the cheapest of a whole password's covers"""
+    # Recompute each product from its parts so equal decompositions give bit-identical results
+    return min(combine_log10_guesses(count, token_part + gap_length * char_cost)
+               for (count, _), (_, token_part, gap_length) in covers.items())
+
+
+class GuessEstimator:
+    """Estimates how many guesses a pattern-aware attacker needs for a password
+
+    The password is covered by a sequence of matched tokens (from
+    PatternDetector) and brute-force gaps. Dynamic programming over positions
+    finds the sequence with the fewest guesses, working in log10 so long
+    passwords never need big integers. Each position keeps at most
+    MAX_COVER_STATES partial covers, so the search grows linearly with the
+    length, and a position's covers depend only on the ones before it, so
+    AnalysisSession keeps them as the password is typed.
+    """
+
+    def __init__(self, dictionary_size: int):
+        """`dictionary_size` is the number of common words tokens are drawn from"""
+        # Without ranks, a dictionary word is assumed to sit mid-list
+        self._log10_word_rank = math.log10(max(dictionary_size / 2, 1))
+
+    def token_log10_guesses(self, pattern: str, token: str) -> float:
+        """log10 guesses for one matched token"""
+        if pattern == "common_word":
+            return self._log10_word_rank + math.log10(uppercase_variations(token))
+        if pattern == "keyboard_pattern":
+            return math.log10(keyboard_guesses(token))
+        if pattern == "sequential_numbers":
+            return math.log10(sequence_guesses(token))
+        if pattern == "repeated_characters":
+            return math.log10(_class_size(token[0]) * len(token))
+        if pattern == "year":
+            return math.log10(max(abs(int(token) - REFERENCE_YEAR), MIN_YEAR_SPACE))
+        if pattern == "date":
+            return math.log10(DATE_GUESSES)
+        raise ValueError(f"Unknown pattern: {pattern}")
+
+    def token_cost(self, pattern: str, token: str, whole_password: bool = False) -> float:
+        """log10 guesses for a token in a cover; tokens short of the whole password cost at least a floor"""
+        cost = self.token_log10_guesses(pattern, token)
+        if whole_password:
+            return cost
+        return max(cost, _LOG10_SINGLE_FLOOR if len(token) == 1 else _LOG10_MULTI_FLOOR)
+
+    def _candidates(self, password: str, spans: Iterable[Tuple[int, int, str]]) -> List[List[Tuple[int, float]]]:
+        """Group scored tokens by end position, ordered by start and label
+
+        Repeats are reduced to the longest run from each start, so callers
+        may report a growing run several times.
+        """
+        length = len(password)
+        longest_repeat: Dict[int, int] = {}
+        tokens = set()
+        for start, end, label in spans:
+            if label == "repeated_characters":
+                longest_repeat[start] = max(end, longest_repeat.get(start, end))
+            else:
+                tokens.add((start, end, label))
+        tokens.update((start, end, "repeated_characters") for start, end in longest_repeat.items())
+
+        by_end: List[List[Tuple[int, float]]] = [[] for _ in range(length + 1)]
+        for start, end, label in sorted(tokens):
+            by_end[end].append((start, self.token_cost(label, password[start:end], end - start == length)))
+        return by_end
+
+    def log10_guesses(self, password: str, char_set_size: int, spans: Iterable[Tuple[int, int, str]]) -> float:
+        """Return log10 of the guesses needed for `password`
+
+        `spans` are (start, end, label) pattern matches; brute-forced
+        characters cost log10(char_set_size) each.
+        """
+        length = len(password)
+        cost = log10_char_cost(char_set_size)
+        by_end = self._candidates(password, spans)
+
+        if not length:
+            return cheapest_cover(START_COVERS, cost)
+        covers = [START_COVERS]
+        for position in range(1, length):
+            covers.append(prune_covers(extend_covers(covers, by_end[position], cost)))
+        return cheapest_cover(extend_covers(covers, by_end[length], cost), cost)
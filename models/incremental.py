@@ -0,0 +1,267 @@
+# Incremental Analysis - Keystroke-by-keystroke password scoring
+# Keeps running analysis state so each edit costs O(1) amortized instead of a full re-analysis
+
+import re
+import secrets
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from models.features import PasswordFeatures
+from models.guesses import (START_COVERS, Covers, cheapest_cover, extend_covers, log10_char_cost, prune_covers,
+                            seconds_from_log10_guesses)
+from models.pattern_detector import PATTERN_ORDER
+from models.result_cache import LRUStore
+
+# Same expressions PatternDetector uses, applied to the four characters ending at each position
+_YEAR = re.compile(r"19\d{2}|20\d{2}")
+_DATE = re.compile(r"(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])")
+
+
+class _Frame:
+    """Analysis state after one character of the password"""
+    __slots__ = ("char", "automaton_state", "word_cursors", "run_length", "spans")
+
+    def __init__(self, char: str, automaton_state: int, word_cursors: Tuple[Tuple[int, int], ...],
+                 run_length: int, spans: Tuple[Tuple[int, int, str], ...]):
+        self.char = char
+        self.automaton_state = automaton_state  # Aho-Corasick state for walks and sequences
+        self.word_cursors = word_cursors        # (DAWG node, start) of dictionary words still being matched
+        self.run_length = run_length            # Length of the run of identical characters ending here
+        self.spans = spans                      # (start, end, label) of matches ending at this character
+
+
+_START = _Frame("", 0, (), 0, ())
+
+
+class AnalysisSession:
+    """Running analysis of a password that is edited one keystroke at a time
+
+    The password is kept as a stack of per-character frames. Appending pushes
+    a frame computed from the previous one, deleting pops frames, and the
+    character histogram, class counts and pattern counts are updated as frames
+    come and go. Edits in the middle of the password are applied as "delete
+    back to the edit, then append", so typing at the end stays O(1).
+
+    The guess estimate's partial covers of each prefix are kept too, one list
+    per alphabet size, so result() only extends them over the characters
+    typed since the last call.
+    """
+
+    def __init__(self, analyzer):
+        """Start an empty session backed by `analyzer`'s dictionary, patterns and leak index"""
+        self.analyzer = analyzer
+        self.lock = threading.Lock()
+        self._frames: List[_Frame] = []
+        self._chars: List[str] = []
+        self._origins: List[int] = []  # Character index of each lowercased character
+        self._histogram: Dict[str, int] = {}
+        self._class_counts = [0, 0, 0, 0]  # upper, lower, digit, special
+        self._label_counts: Dict[str, int] = {}
+        # Pruned guess-estimate covers of password[:k] for each k below the
+        # length, by alphabet size; a prefix's covers depend on whether the
+        # next character continues a run, so the last one is never kept
+        self._covers: Dict[int, List[Covers]] = {}
+        self._leak_status: Optional[Tuple[str, Tuple[bool, bool]]] = None
+
+    @property
+    def password(self) -> str:
+        return "".join(self._chars)
+
+    def __len__(self) -> int:
+        return len(self._chars)
+
+    @staticmethod
+    def _classes(char: str) -> Tuple[bool, bool, bool, bool]:
+        return char.isupper(), char.islower(), char.isdigit(), not char.isalnum()
+
+    def _push(self, char: str):
+        """Append one character, deriving its frame from the previous one"""
+        previous = self._frames[-1] if self._frames else _START
+        detector = self.analyzer.pattern_detector
+        automaton, dictionary = detector.automaton, detector.dictionary
+
+        index = len(self._chars)
+        end = index + 1
+        spans = []
+        state, cursors = previous.automaton_state, previous.word_cursors
+        for lowered in char.lower():
+            # Some characters lowercase to several; spans are reported in original positions
+            self._origins.append(index)
+            state, outputs = automaton.step(state, lowered)
+            spans.extend((self._origins[len(self._origins) - length], end, label) for length, label in outputs)
+
+            # Advance every in-progress dictionary match and start a new one here
+            advanced = []
+            for node, start in cursors + ((0, index),):
+                node = dictionary.step(node, lowered)
+                if node >= 0:
+                    advanced.append((node, start))
+                    if dictionary.is_final(node):
+                        spans.append((start, end, "common_word"))
+            cursors = tuple(advanced)
+
+        run_length = previous.run_length + 1 if char == previous.char and char != "\n" else 1
+        if run_length >= 3:
+            spans.append((end - run_length, end, "repeated_characters"))
+
+        if index >= 3:
+            window = "".join(self._chars[-3:]) + char
+            if _YEAR.fullmatch(window):
+                spans.append((index - 3, end, "year"))
+            if _DATE.fullmatch(window):
+                spans.append((index - 3, end, "date"))
+
+        frame = _Frame(char, state, cursors, run_length, tuple(spans))
+        self._frames.append(frame)
+        self._chars.append(char)
+        self._histogram[char] = self._histogram.get(char, 0) + 1
+        for index, present in enumerate(self._classes(char)):
+            self._class_counts[index] += present
+        for _, _, label in frame.spans:
+            self._label_counts[label] = self._label_counts.get(label, 0) + 1
+
+    def _pop(self):
+        """Remove the last character and undo its contribution to the running state"""
+        frame = self._frames.pop()
+        char = self._chars.pop()
+        del self._origins[len(self._origins) - len(char.lower()):]
+        count = self._histogram[char] - 1
+        if count:
+            self._histogram[char] = count
+        else:
+            # Popping from the end keeps the histogram in first-occurrence order
+            del self._histogram[char]
+        for index, present in enumerate(self._classes(char)):
+            self._class_counts[index] -= present
+        for _, _, label in frame.spans:
+            self._label_counts[label] -= 1
+        for covers in self._covers.values():
+            del covers[len(self._frames):]
+
+    def append(self, text: str):
+        """Type `text` at the end of the password"""
+        for char in text:
+            self._push(char)
+
+    def delete(self, count: int = 1):
+        """Delete `count` characters from the end of the password"""
+        for _ in range(min(count, len(self._frames))):
+            self._pop()
+
+    def set_password(self, password: str):
+        """Replace the password, reusing the state of the unchanged prefix"""
+        common = 0
+        for old, new in zip(self._chars, password):
+            if old != new:
+                break
+            common += 1
+        self.delete(len(self._chars) - common)
+        self.append(password[common:])
+
+    def completes_pattern(self, char: str) -> bool:
+        """Return whether appending `char` would complete a pattern match ending at it"""
+        self._push(char)
+        completes = bool(self._frames[-1].spans)
+        self._pop()
+        return completes
+
+    def patterns(self) -> List[str]:
+        """Return the distinct pattern labels currently present, in reporting order"""
+        return [label for label in PATTERN_ORDER if self._label_counts.get(label)]
+
+    def _tokens_ending_at(self, position: int) -> List[Tuple[int, float]]:
+        """(start, log10 guesses) of the tokens ending at `position`, ordered by start and label
+
+        A repeat only counts once its run has ended, as the full analysis only
+        scores whole runs.
+        """
+        estimator = self.analyzer.guess_estimator
+        length = len(self._frames)
+        run_ended = position == length or self._frames[position].run_length == 1
+        spans = sorted({span for span in self._frames[position - 1].spans
+                        if span[2] != "repeated_characters" or run_ended})
+        return [(start, estimator.token_cost(label, "".join(self._chars[start:end]), end - start == length))
+                for start, end, label in spans]
+
+    def _log10_guesses(self, char_set_size: int) -> float:
+        """The guess estimate, extending the kept covers over the characters typed since they were computed"""
+        cost = log10_char_cost(char_set_size)
+        covers = self._covers.setdefault(char_set_size, [START_COVERS])
+        length = len(self._frames)
+        for position in range(len(covers), length):
+            covers.append(prune_covers(extend_covers(covers, self._tokens_ending_at(position), cost)))
+        return cheapest_cover(extend_covers(covers, self._tokens_ending_at(length), cost), cost)
+
+    def leak_status(self) -> Tuple[bool, bool]:
+        """Leak status of the current password, looked up once per distinct password"""
+        password = self.password
+        if self._leak_status is None or self._leak_status[0] != password:
+            self._leak_status = password, self.analyzer.leak_status(password)
+        return self._leak_status[1]
+
+    def result(self, include_suggestions: bool = False, include_ml_strength: bool = True):
+        """Return the analysis of the current password from the running state
+
+        Scores match PasswordAnalyzer.analyze_password for the same password.
+        Entropy is computed from the histogram, so its cost grows with the
+        number of distinct characters. Only the leak check, which needs a
+        digest of the whole password, grows with the length.
+        """
+        analyzer = self.analyzer
+        if not self._frames:
+            return analyzer._empty_result()
+
+        features = self.features()
+        seconds = seconds_from_log10_guesses(self._log10_guesses(features.char_set_size))
+        is_compromised, is_leaked_variant = self.leak_status()
+        return analyzer._build_result(features, is_compromised, include_suggestions,
+                                      crack_time=analyzer._crack_time_from_seconds(seconds),
+                                      include_ml_strength=include_ml_strength, is_leaked_variant=is_leaked_variant)
+
+    def features(self) -> PasswordFeatures:
+        """Return the features of the current password, taken from the running state
+
+        Pattern spans are only found, by a full scan, if a caller asks for them.
+        """
+        return PasswordFeatures(
+            self.password,
+            self.patterns(),
+            self.analyzer.pattern_detector,
+            classes=tuple(count > 0 for count in self._class_counts),
+            histogram=self._histogram
+        )
+
+
+class SessionStore:
+    """Bounded set of live analysis sessions that expire after a period of inactivity
+
+    Sessions live in one process. Clients that send the whole password with
+    each update can be served by any worker: a worker without the session
+    starts one with session_for() and rebuilds it from the password.
+    """
+
+    def __init__(self, analyzer, max_sessions: int = 10000, ttl_seconds: float = 300):
+        self.analyzer = analyzer
+        self._sessions = LRUStore(max_sessions, ttl_seconds)
+
+    def create(self) -> Tuple[str, AnalysisSession]:
+        """Start a new session and return its id and the session"""
+        session_id = secrets.token_urlsafe(16)
+        session = AnalysisSession(self.analyzer)
+        self._sessions.set(session_id, session)
+        return session_id, session
+
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        """Return a live session and extend its lifetime, or None if it has expired"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.set(session_id, session)
+        return session
+
+    def session_for(self, session_id: str) -> AnalysisSession:
+        """Return the live session with this id, starting an empty one if this process has none"""
+        session = self.get(session_id)
+        if session is None:
+            session = AnalysisSession(self.analyzer)
+            self._sessions.set(session_id, session)
+        return session
@@ -0,0 +1,207 @@
+# Leaked Password Prefilter - Blocked Bloom filter in front of the leak index
+# Answers "definitely not leaked" for most passwords without touching the index
+
+import math
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Set
+
+from models.leak_index import LeakIndex
+
+# File layout:
+#   header (64 bytes): magic, version, hashes per key, block count, entry count,
+#                      build id of the index the filter was built from
+#   blocks: `block_count` 64-byte blocks of filter bits
+MAGIC = b"PWBLOOM1"
+VERSION = 1
+HEADER_FORMAT = "<8sHHQQ16s"
+HEADER_SIZE = 64
+
+# One block is one 64-byte cache line, so a lookup reads exactly one line
+BLOCK_BYTES = 64
+BLOCK_BITS = BLOCK_BYTES * 8
+MAX_HASHES = 16
+
+# Blocking concentrates keys unevenly, so size blocked filters a little larger
+# than the classic formula suggests to stay near the requested rate
+BLOCKING_OVERHEAD = 1.2
+
+
+def filter_path_for(index_path: str) -> str:
+    """Return where the prefilter for a given leak index is stored"""
+    return index_path + ".bloom"
+
+
+def open_index(index_path: str):
+    """Open a leak index file, behind its Bloom prefilter if one was built for this build of it"""
+    index = LeakIndex(index_path)
+    bloom_path = filter_path_for(index_path)
+    if os.path.exists(bloom_path):
+        bloom = BloomFilter(bloom_path)
+        if bloom.build_id == index.build_id:
+            return FilteredLeakIndex(index, bloom)
+        # Stale filter from a previous build of the index; ignore it
+        bloom.close()
+    return index
+
+
+def _block_and_probe(digest: bytes, block_count: int):
+    """Map a digest to its block number and the double-hashing probe sequence
+
+    Digests are already uniformly distributed, so their bytes are used
+    directly instead of re-hashing: bytes 4-11 pick the block and bytes
+    12-15 seed the first bit position and step inside it.
+    """
+    block = int.from_bytes(digest[4:12], "little") % block_count
+    seed = int.from_bytes(digest[12:16], "little")
+    return block, seed & (BLOCK_BITS - 1), (seed >> 9) | 1
+
+
+def check_false_positive_rate(false_positive_rate: float) -> float:
+    """Return the rate if a filter can target it, else raise ValueError
+
+    Zero or less has no finite size, and one or more would admit everything.
+    """
+    if not 0 < false_positive_rate < 1:
+        raise ValueError(f"The false-positive rate must be between 0 and 1, not {false_positive_rate:g}")
+    return false_positive_rate
+
+
+def parameters_for(count: int, false_positive_rate: float):
+    """Return (block_count, num_hashes) for `count` keys at the target rate"""
+    check_false_positive_rate(false_positive_rate)
+    count = max(count, 1)
+    bits = -count * math.log(false_positive_rate) / (math.log(2) ** 2) * BLOCKING_OVERHEAD
+    block_count = max(1, math.ceil(bits / BLOCK_BITS))
+    num_hashes = round(block_count * BLOCK_BITS / count * math.log(2))
+    return block_count, min(MAX_HASHES, max(1, num_hashes))
+
+
+def build_filter(digests: Iterable[bytes], count: int, output_path: str,
+                 false_positive_rate: float = 0.01, build_id: bytes = b"") -> str:
+    """Write a prefilter for `count` digests targeting the given false-positive rate
+
+    `build_id` should be the id of the leak index the digests came from; the
+    filter is ignored at load time if it does not match.
+    """
+    block_count, num_hashes = parameters_for(count, false_positive_rate)
+    blocks = bytearray(block_count * BLOCK_BYTES)
+
+    for digest in digests:
+        block, bit, step = _block_and_probe(digest, block_count)
+        start = block * BLOCK_BYTES
+        for _ in range(num_hashes):
+            blocks[start + (bit >> 3)] |= 1 << (bit & 7)
+            bit = (bit + step) & (BLOCK_BITS - 1)
+
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "wb") as out:
+        out.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, num_hashes, block_count, count,
+                              build_id.ljust(16, b"\0")).ljust(HEADER_SIZE, b"\0"))
+        out.write(blocks)
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+class BloomFilter:
+    """Memory-mapped blocked Bloom filter over leaked password digests"""
+
+    def __init__(self, path: str):
+        """Open and validate the filter at `path`"""
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, num_hashes, block_count, count, build_id = struct.unpack_from(HEADER_FORMAT, self._mm, 0)
+        if magic != MAGIC or version != VERSION or len(self._mm) != HEADER_SIZE + block_count * BLOCK_BYTES:
+            self.close()
+            raise ValueError(f"{path} is not a valid version {VERSION} leak prefilter")
+
+        self.num_hashes = num_hashes
+        self.block_count = block_count
+        self.count = count
+        self.build_id = build_id.hex()
+
+    def might_contain(self, digest: bytes) -> bool:
+        """Return False if the digest is definitely absent, True if it may be present"""
+        block, bit, step = _block_and_probe(digest, self.block_count)
+        start = HEADER_SIZE + block * BLOCK_BYTES
+        mm = self._mm
+        # Most absent digests fail on the first or second probe
+        for _ in range(self.num_hashes):
+            if not mm[start + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+            bit = (bit + step) & (BLOCK_BITS - 1)
+        return True
+
+    def estimated_false_positive_rate(self) -> float:
+        """Expected false-positive rate given the filter's size and key count"""
+        bits = self.block_count * BLOCK_BITS
+        return (1 - math.exp(-self.num_hashes * self.count / bits)) ** self.num_hashes
+
+    def close(self):
+        """Release the mapping and the underlying file"""
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+
+class FilteredLeakIndex:
+    """Leak index wrapper that consults a Bloom filter before the exact lookup
+
+    Exposes the same interface as LeakIndex and counts how often the filter
+    short-circuits a lookup.
+    """
+
+    def __init__(self, index, bloom: BloomFilter):
+        """Wrap `index` with the prefilter `bloom`"""
+        self.index = index
+        self.bloom = bloom
+        self.filter_hits = 0         # Filter said "maybe", exact lookup performed
+        self.filter_misses = 0       # Filter said "no", exact lookup skipped
+        self.false_positives = 0     # Filter said "maybe" but the index disagreed
+
+    def __getattr__(self, name):
+        # Delegate path, hash_name, digest_size, build_id, digest() etc.
+        return getattr(self.index, name)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return self.contains(digest)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def contains(self, digest: bytes) -> bool:
+        """Check whether a raw digest is present, skipping the index on a filter miss"""
+        if not self.bloom.might_contain(digest):
+            self.filter_misses += 1
+            return False
+        self.filter_hits += 1
+        found = self.index.contains(digest)
+        if not found:
+            self.false_positives += 1
+        return found
+
+    def contains_many(self, digests: Iterable[bytes]) -> Set[bytes]:
+        """Return the subset of `digests` present in the index"""
+        return {digest for digest in sorted(set(digests)) if self.contains(digest)}
+
+    def stats(self) -> Dict[str, float]:
+        """Return filter hit/miss counters and the observed false-positive rate"""
+        negatives = self.filter_misses + self.false_positives
+        return {
+            "filter_hits": self.filter_hits,
+            "filter_misses": self.filter_misses,
+            "false_positives": self.false_positives,
+            "observed_false_positive_rate": self.false_positives / negatives if negatives else 0.0,
+            "expected_false_positive_rate": self.bloom.estimated_false_positive_rate(),
+        }
+
+    def close(self):
+        """Close both the filter and the wrapped index"""
+        self.bloom.close()
+        self.index.close()
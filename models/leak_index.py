@@ -0,0 +1,401 @@
+# Leaked Password Index - Memory-mapped sorted digest store
+# Builds and queries the on-disk index behind PasswordAnalyzer's compromised check
+
+import argparse
+import gzip
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import uuid
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Set, TypeVar
+
+# File layout:
+#   header (64 bytes): magic, version, digest size, hash name, entry count, build id
+#   fan-out table: FANOUT_SIZE + 1 little-endian uint64 entry offsets, indexed by
+#                  the first two digest bytes
+#   data: `count` raw digests, sorted and de-duplicated
+MAGIC = b"PWLEAKIX"
+VERSION = 1
+HEADER_FORMAT = "<8sHH8sQ16s"
+HEADER_SIZE = 64
+FANOUT_BITS = 16
+FANOUT_SIZE = 1 << FANOUT_BITS
+FANOUT_FORMAT = "<%dQ" % (FANOUT_SIZE + 1)
+DATA_OFFSET = HEADER_SIZE + struct.calcsize(FANOUT_FORMAT)
+
+SUPPORTED_HASHES = {"sha1": 20, "sha256": 32}
+
+T = TypeVar("T")
+
+
+def prefix_bounds(prefix: str, digest_size: int):
+    """Return the [low, high) digests sharing a hex prefix; high is None past the last digest"""
+    if not 0 < len(prefix) <= 2 * digest_size or any(c not in "0123456789abcdefABCDEF" for c in prefix):
+        raise ValueError(f"prefix must be 1 to {2 * digest_size} hex characters")
+    width = 2 * digest_size
+    low = bytes.fromhex(prefix.ljust(width, "0"))
+    following = int(prefix, 16) + 1
+    if following >> (4 * len(prefix)):
+        return low, None
+    return low, bytes.fromhex(format(following, "0%dx" % len(prefix)).ljust(width, "0"))
+
+
+class LeakIndex:
+    """Read-only, memory-mapped view of a sorted leaked-password digest file
+
+    The file is mapped with MAP_SHARED semantics, so every worker process that
+    opens the same index shares one copy in the OS page cache. Lookups read the
+    fan-out table to find the digest range for a two-byte prefix and binary
+    search inside it.
+    """
+
+    def __init__(self, path: str):
+        """Open and validate the index at `path`"""
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, digest_size, hash_name, count, build_id = struct.unpack_from(HEADER_FORMAT, self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} leaked password index")
+
+        self.digest_size = digest_size
+        self.hash_name = hash_name.rstrip(b"\0").decode("ascii")
+        self.count = count
+        self.build_id = build_id.hex()
+        self._hasher = getattr(hashlib, self.hash_name)
+        self._fanout = memoryview(self._mm)[HEADER_SIZE:DATA_OFFSET].cast("Q")
+
+        if len(self._mm) != DATA_OFFSET + count * digest_size:
+            self.close()
+            raise ValueError(f"{path} is truncated or corrupt")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, digest: bytes) -> bool:
+        return self.contains(digest)
+
+    def digest(self, password: str) -> bytes:
+        """Hash a password with the algorithm this index was built with"""
+        return self._hasher(password.encode()).digest()
+
+    def _digest_at(self, position: int) -> bytes:
+        """Return the digest stored at the given entry position"""
+        start = DATA_OFFSET + position * self.digest_size
+        return self._mm[start:start + self.digest_size]
+
+    def _bucket(self, digest: bytes):
+        """Return the [lo, hi) entry range for the digest's fan-out prefix"""
+        prefix = (digest[0] << 8) | digest[1]
+        return self._fanout[prefix], self._fanout[prefix + 1]
+
+    def _search(self, digest: bytes, lo: int, hi: int) -> int:
+        """Return the first position in [lo, hi) whose digest is >= `digest`"""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._digest_at(mid) < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def contains(self, digest: bytes) -> bool:
+        """Check whether a raw digest is present in the index"""
+        lo, hi = self._bucket(digest)
+        position = self._search(digest, lo, hi)
+        return position < hi and self._digest_at(position) == digest
+
+    def contains_many(self, digests: Iterable[bytes]) -> Set[bytes]:
+        """Return the subset of `digests` present in the index
+
+        Digests are probed in sorted order so consecutive lookups walk the
+        file front to back and reuse recently touched pages.
+        """
+        return {digest for digest in sorted(set(digests)) if self.contains(digest)}
+
+    def digests_with_prefix(self, prefix: str) -> List[bytes]:
+        """Return every digest whose hex form starts with `prefix`, in sorted order
+
+        Both ends of the range are found by binary search within their
+        fan-out buckets, and the digests between are read as one slice.
+        """
+        low, high = prefix_bounds(prefix, self.digest_size)
+        start = self._search(low, *self._bucket(low))
+        end = self.count if high is None else self._search(high, *self._bucket(high))
+        size = self.digest_size
+        data = self._mm[DATA_OFFSET + start * size:DATA_OFFSET + end * size]
+        return [data[offset:offset + size] for offset in range(0, len(data), size)]
+
+    def __iter__(self) -> Iterator[bytes]:
+        for position in range(self.count):
+            yield self._digest_at(position)
+
+    def close(self):
+        """Release the mapping and the underlying file"""
+        fanout = getattr(self, "_fanout", None)
+        if fanout is not None:
+            fanout.release()
+            self._fanout = None
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+
+class MemoryLeakIndex:
+    """In-memory index with the same interface as LeakIndex
+
+    Used when no index file has been built, e.g. in development.
+    """
+
+    def __init__(self, passwords: Iterable[str], hash_name: str = "sha256"):
+        """Build the index by hashing each of the given passwords"""
+        self.path = None
+        self.hash_name = hash_name
+        self.digest_size = SUPPORTED_HASHES[hash_name]
+        self._hasher = getattr(hashlib, hash_name)
+        self._digests = {self.digest(pwd) for pwd in passwords}
+        self.count = len(self._digests)
+        # Derived from the contents, so it identifies the same entries as a built index's id does
+        self.build_id = hashlib.sha256(b"".join(sorted(self._digests))).hexdigest()[:32]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, digest: bytes) -> bool:
+        return digest in self._digests
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(sorted(self._digests))
+
+    def digest(self, password: str) -> bytes:
+        """Hash a password with this index's algorithm"""
+        return self._hasher(password.encode()).digest()
+
+    def contains(self, digest: bytes) -> bool:
+        """Check whether a raw digest is present in the index"""
+        return digest in self._digests
+
+    def contains_many(self, digests: Iterable[bytes]) -> Set[bytes]:
+        """Return the subset of `digests` present in the index"""
+        return self._digests.intersection(digests)
+
+    def digests_with_prefix(self, prefix: str) -> List[bytes]:
+        """Return every digest whose hex form starts with `prefix`, in sorted order"""
+        low, high = prefix_bounds(prefix, self.digest_size)
+        return sorted(digest for digest in self._digests if low <= digest and (high is None or digest < high))
+
+    def close(self):
+        """Nothing to release for an in-memory index"""
+
+
+def _open_text(path: str) -> BinaryIO:
+    """Open a plain or gzip-compressed input file for binary line reading"""
+    if path == "-":
+        return sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_input_digests(paths: Iterable[str], input_format: str, hash_name: str) -> Iterator[bytes]:
+    """Yield raw digests from plaintext password lists or hex hash lists
+
+    Hash lists may use the HIBP `HEX:count` line format; the count is ignored.
+    """
+    hasher = getattr(hashlib, hash_name)
+    digest_size = SUPPORTED_HASHES[hash_name]
+    for path in paths:
+        with _open_text(path) as handle:
+            for line in handle:
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    continue
+                if input_format == "plain":
+                    yield hasher(line).digest()
+                else:
+                    digest = bytes.fromhex(line.split(b":", 1)[0].strip().decode("ascii"))
+                    if len(digest) != digest_size:
+                        raise ValueError(f"{path}: expected {hash_name} digests, got {len(digest)} bytes")
+                    yield digest
+
+
+def _write_run(digests: List[bytes], directory: Optional[str]) -> str:
+    """Spill one sorted chunk of digests to a temporary run file"""
+    handle = tempfile.NamedTemporaryFile(dir=directory, suffix=".run", delete=False)
+    with handle:
+        handle.write(b"".join(digests))
+    return handle.name
+
+
+def _read_run(path: str, digest_size: int) -> Iterator[bytes]:
+    """Stream digests back from a run file"""
+    with open(path, "rb") as handle:
+        while True:
+            digest = handle.read(digest_size)
+            if not digest:
+                return
+            yield digest
+
+
+def write_index(sorted_digests: Iterable[bytes], output_path: str, hash_name: str,
+                build_id: Optional[bytes] = None) -> int:
+    """Write already sorted digests to `output_path`, dropping duplicates
+
+    The file is written to a temporary name and renamed into place, so readers
+    never observe a partially written index. Returns the number of entries.
+    """
+    digest_size = SUPPORTED_HASHES[hash_name]
+    fanout = [0] * (FANOUT_SIZE + 1)
+    count = 0
+    previous = None
+    temp_path = output_path + ".tmp"
+
+    with open(temp_path, "wb") as out:
+        out.seek(DATA_OFFSET)
+        for digest in sorted_digests:
+            if digest == previous:
+                continue
+            out.write(digest)
+            fanout[((digest[0] << 8) | digest[1]) + 1] += 1
+            previous = digest
+            count += 1
+
+        # Turn per-prefix counts into cumulative start offsets
+        for prefix in range(1, FANOUT_SIZE + 1):
+            fanout[prefix] += fanout[prefix - 1]
+
+        out.seek(0)
+        out.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, digest_size, hash_name.encode("ascii"),
+                              count, build_id or uuid.uuid4().bytes).ljust(HEADER_SIZE, b"\0"))
+        out.write(struct.pack(FANOUT_FORMAT, *fanout))
+
+    os.replace(temp_path, output_path)
+    return count
+
+
+def external_sort(items: Iterable[T], chunk_size: int, write_run: Callable[[List[T], Optional[str]], str],
+                  read_run: Callable[[str], Iterator[T]], directory: Optional[str] = None) -> Iterator[T]:
+    """Yield `items` in sorted order, holding at most `chunk_size` of them in memory
+
+    Larger inputs are sorted a chunk at a time, each chunk spilled by
+    `write_run(chunk, directory)` to a run file, and the runs merged as they
+    are read back by `read_run(path)`. Run files are removed when the
+    generator finishes or is closed.
+    """
+    runs = []
+    chunk = []
+    try:
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                chunk.sort()
+                runs.append(write_run(chunk, directory))
+                chunk = []
+
+        chunk.sort()
+        if not runs:
+            yield from chunk
+            return
+
+        if chunk:
+            runs.append(write_run(chunk, directory))
+            chunk = []
+        yield from heapq.merge(*(read_run(run) for run in runs))
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+def build_index(digests: Iterable[bytes], output_path: str, hash_name: str = "sha256",
+                chunk_size: int = 10_000_000) -> int:
+    """Build an index from unsorted digests using an external merge sort
+
+    At most `chunk_size` digests are held in memory at once; larger inputs are
+    spilled to sorted run files next to the output and merged. Returns the
+    number of distinct entries written.
+    """
+    digest_size = SUPPORTED_HASHES[hash_name]
+    directory = os.path.dirname(os.path.abspath(output_path))
+    merged = external_sort(digests, chunk_size, _write_run, lambda run: _read_run(run, digest_size), directory)
+    try:
+        return write_index(merged, output_path, hash_name)
+    finally:
+        merged.close()
+
+
+def _build_filter_for(index_path: str, false_positive_rate: float):
+    """Build the Bloom prefilter stored next to an index file"""
+    from models.leak_filter import build_filter, filter_path_for
+
+    index = LeakIndex(index_path)
+    try:
+        path = build_filter(index, len(index), filter_path_for(index_path), false_positive_rate,
+                            bytes.fromhex(index.build_id))
+    finally:
+        index.close()
+    print(f"Wrote Bloom prefilter ({false_positive_rate:g} target false-positive rate) to {path}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m models.leak_index build ..."""
+    parser = argparse.ArgumentParser(description="Build or query a leaked password index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build an index from password or hash lists")
+    build.add_argument("inputs", nargs="+", help="input files (.gz supported, '-' for stdin)")
+    build.add_argument("-o", "--output", required=True, help="index file to write")
+    build.add_argument("--hash", choices=sorted(SUPPORTED_HASHES), default="sha256",
+                       help="digest algorithm (default: sha256)")
+    build.add_argument("--format", choices=["plain", "hash"], default="plain",
+                       help="plain: one password per line; hash: hex digests, optionally HIBP HEX:count")
+    build.add_argument("--chunk-size", type=int, default=10_000_000,
+                       help="digests sorted in memory per run (default: 10,000,000)")
+    build.add_argument("--bloom-fpr", type=float, default=None,
+                       help="also build a Bloom prefilter with this false-positive rate, e.g. 0.01")
+
+    build_filter = commands.add_parser("build-filter", help="build a Bloom prefilter for an existing index")
+    build_filter.add_argument("index", help="index file to read")
+    build_filter.add_argument("--bloom-fpr", type=float, default=0.01,
+                              help="target false-positive rate (default: 0.01)")
+
+    query = commands.add_parser("query", help="check whether passwords are in an index")
+    query.add_argument("index", help="index file to open")
+    query.add_argument("passwords", nargs="+")
+
+    args = parser.parse_args(argv)
+    if getattr(args, "bloom_fpr", None) is not None:
+        from models.leak_filter import check_false_positive_rate
+        try:
+            check_false_positive_rate(args.bloom_fpr)
+        except ValueError as error:
+            parser.error(str(error))
+
+    if args.command == "build":
+        digests = iter_input_digests(args.inputs, args.format, args.hash)
+        count = build_index(digests, args.output, args.hash, args.chunk_size)
+        print(f"Wrote {count} {args.hash} digests to {args.output}")
+        if args.bloom_fpr is not None:
+            _build_filter_for(args.output, args.bloom_fpr)
+        return 0
+
+    if args.command == "build-filter":
+        _build_filter_for(args.index, args.bloom_fpr)
+        return 0
+
+    index = LeakIndex(args.index)
+    try:
+        for password in args.passwords:
+            print(f"{password}\t{'leaked' if index.contains(index.digest(password)) else 'not found'}")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,491 @@
+# Leak Segments - Append-only, LSM-style leaked password store
+# New dumps become immutable index segments; a manifest swap publishes them and compaction merges them
+
+import argparse
+import fcntl
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from models.leak_filter import (FilteredLeakIndex, build_filter, check_false_positive_rate, filter_path_for,
+                                open_index)
+from models.leak_index import SUPPORTED_HASHES, build_index, iter_input_digests, prefix_bounds, write_index
+
+logger = logging.getLogger(__name__)
+
+# Directory layout:
+#   MANIFEST          JSON: version, hash name, Bloom filter rate, generation and
+#                     the live segment files, newest first
+#   LOCK              flock()ed by writers while they update the manifest
+#   LOCK.compaction   flock()ed for the whole of a compaction, so only one runs
+#   seg-*.idx         immutable leak index files (models/leak_index.py format)
+#   seg-*.idx.bloom   their optional Bloom prefilters
+# Readers only ever see a complete manifest: writers replace it atomically.
+MANIFEST_NAME = "MANIFEST"
+LOCK_NAME = "LOCK"
+MANIFEST_VERSION = 1
+
+# Size-tiered compaction: segments whose entry counts are within a factor of
+# COMPACTION_FANOUT share a tier, and a tier is merged once it holds that many
+DEFAULT_COMPACTION_FANOUT = 4
+DEFAULT_CHECK_INTERVAL = 5.0
+
+
+def _manifest_path(directory: str) -> str:
+    return os.path.join(directory, MANIFEST_NAME)
+
+
+def read_manifest(directory: str) -> Dict:
+    """Load and validate a store's manifest"""
+    with open(_manifest_path(directory)) as handle:
+        manifest = json.load(handle)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{directory} is not a version {MANIFEST_VERSION} segmented leak store")
+    return manifest
+
+
+def _write_manifest(directory: str, manifest: Dict):
+    """Replace the manifest atomically; call with the writer lock held"""
+    path = _manifest_path(directory)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as handle:
+        json.dump(manifest, handle, indent=2)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def _writer_lock(directory: str):
+    """Hold the store's writer lock, which serializes manifest updates between processes"""
+    with open(os.path.join(directory, LOCK_NAME), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def is_store(path: str) -> bool:
+    """Whether `path` is a segmented leak store directory"""
+    return os.path.isfile(_manifest_path(path))
+
+
+def create_store(directory: str, hash_name: str = "sha256", bloom_fpr: Optional[float] = 0.01,
+                 initial_index: Optional[str] = None) -> Dict:
+    """Create an empty store, optionally adopting an existing index file as its first segment"""
+    if hash_name not in SUPPORTED_HASHES:
+        raise ValueError(f"Unsupported hash {hash_name!r}")
+    if bloom_fpr is not None:
+        check_false_positive_rate(bloom_fpr)
+    os.makedirs(directory, exist_ok=True)
+    if is_store(directory):
+        raise ValueError(f"{directory} already contains a leak store")
+    manifest = {"version": MANIFEST_VERSION, "hash": hash_name, "bloom_fpr": bloom_fpr,
+                "generation": 0, "segments": []}
+    with _writer_lock(directory):
+        if initial_index is not None:
+            manifest["segments"].append(_adopt_index(directory, initial_index, hash_name, bloom_fpr))
+            manifest["generation"] = 1
+        _write_manifest(directory, manifest)
+    return manifest
+
+
+def _new_segment_name() -> str:
+    # Time-ordered, so a listing of the directory sorts oldest first
+    return f"seg-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.idx"
+
+
+def _finish_segment(directory: str, name: str, bloom_fpr: Optional[float]) -> Dict:
+    """Build the segment's prefilter and describe it for the manifest"""
+    path = os.path.join(directory, name)
+    index = open_index(path)
+    try:
+        if bloom_fpr is not None and not isinstance(index, FilteredLeakIndex):
+            build_filter(index, len(index), filter_path_for(path), bloom_fpr, bytes.fromhex(index.build_id))
+        return {"file": name, "count": len(index), "build_id": index.build_id}
+    finally:
+        index.close()
+
+
+def _adopt_index(directory: str, index_path: str, hash_name: str, bloom_fpr: Optional[float]) -> Dict:
+    """Copy an existing index file into the store as a segment"""
+    name = _new_segment_name()
+    index = open_index(index_path)
+    try:
+        if index.hash_name != hash_name:
+            raise ValueError(f"{index_path} uses {index.hash_name}, but the store uses {hash_name}")
+    finally:
+        index.close()
+    shutil.copyfile(index_path, os.path.join(directory, name))
+    return _finish_segment(directory, name, bloom_fpr)
+
+
+def ingest(directory: str, inputs: Iterable[str], input_format: str = "plain",
+           chunk_size: int = 10_000_000) -> Dict:
+    """Stream password or hash lists into a new segment and publish it
+
+    Existing segments are never modified; readers pick the new segment up at
+    their next manifest check. Returns the new segment's manifest entry.
+    """
+    manifest = read_manifest(directory)
+    name = _new_segment_name()
+    path = os.path.join(directory, name)
+    digests = iter_input_digests(inputs, input_format, manifest["hash"])
+    try:
+        build_index(digests, path, manifest["hash"], chunk_size)
+        segment = _finish_segment(directory, name, manifest["bloom_fpr"])
+    except BaseException:
+        _remove_segment_files(directory, name)
+        raise
+    with _writer_lock(directory):
+        # Re-read: a compaction may have swapped the manifest while we were building
+        manifest = read_manifest(directory)
+        manifest["segments"].insert(0, segment)
+        manifest["generation"] += 1
+        _write_manifest(directory, manifest)
+    return segment
+
+
+def _remove_segment_files(directory: str, name: str):
+    for path in (os.path.join(directory, name), filter_path_for(os.path.join(directory, name))):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _tier(count: int, fanout: int) -> int:
+    return int(math.log(max(count, 1), fanout))
+
+
+def plan_compaction(segments: List[Dict], fanout: int = DEFAULT_COMPACTION_FANOUT, full: bool = False) -> List[Dict]:
+    """Pick the segments to merge next: every segment if `full`, else a full tier, smallest first"""
+    if full:
+        return list(segments) if len(segments) > 1 else []
+    tiers: Dict[int, List[Dict]] = {}
+    for segment in segments:
+        tiers.setdefault(_tier(segment["count"], fanout), []).append(segment)
+    for tier in sorted(tiers):
+        if len(tiers[tier]) >= fanout:
+            return tiers[tier]
+    return []
+
+
+def compact(directory: str, fanout: int = DEFAULT_COMPACTION_FANOUT, full: bool = False,
+            blocking: bool = True) -> Optional[Dict]:
+    """Merge one set of segments into a single new segment
+
+    Ingestion may publish new segments during the merge; they are kept. Only
+    one compaction runs at a time: with `blocking` off, returns None at once
+    if another process is compacting. Returns the merged segment's entry, or
+    None if there was nothing to merge.
+    """
+    compaction_lock = os.path.join(directory, LOCK_NAME + ".compaction")
+    with open(compaction_lock, "a") as lock_handle:
+        try:
+            fcntl.flock(lock_handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return None
+        try:
+            return _compact_locked(directory, fanout, full)
+        finally:
+            fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+
+def _compact_locked(directory: str, fanout: int, full: bool) -> Optional[Dict]:
+    manifest = read_manifest(directory)
+    chosen = plan_compaction(manifest["segments"], fanout, full)
+    if not chosen:
+        return None
+
+    name = _new_segment_name()
+    indexes = [open_index(os.path.join(directory, segment["file"])) for segment in chosen]
+    try:
+        # write_index drops the digests that several segments share
+        write_index(heapq.merge(*indexes), os.path.join(directory, name), manifest["hash"])
+        merged = _finish_segment(directory, name, manifest["bloom_fpr"])
+    except BaseException:
+        _remove_segment_files(directory, name)
+        raise
+    finally:
+        for index in indexes:
+            index.close()
+
+    chosen_files = {segment["file"] for segment in chosen}
+    with _writer_lock(directory):
+        manifest = read_manifest(directory)
+        segments = manifest["segments"]
+        # The merged segment takes the place of the newest segment it replaces
+        position = min(i for i, segment in enumerate(segments) if segment["file"] in chosen_files)
+        segments = [segment for segment in segments if segment["file"] not in chosen_files]
+        segments.insert(position, merged)
+        manifest["segments"] = segments
+        manifest["generation"] += 1
+        _write_manifest(directory, manifest)
+
+    # Readers that still map the old files keep working: the mappings outlive the unlink
+    for file_name in chosen_files:
+        _remove_segment_files(directory, file_name)
+    return merged
+
+
+class SegmentedLeakIndex:
+    """Leak index over every live segment of a store, with the same interface as LeakIndex
+
+    The manifest is re-checked at most every `check_interval` seconds during
+    lookups; when it has been replaced, new segments are opened and dropped
+    ones released, and the swap is a single attribute assignment, so
+    concurrent lookups see either the old or the new set, never a mix.
+    Until compaction merges them, segments may repeat digests, so `count`
+    is an upper bound on the distinct entries.
+    """
+
+    def __init__(self, directory: str, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        """Open every segment listed in the store's manifest"""
+        self.path = directory
+        self.check_interval = check_interval
+        manifest = read_manifest(directory)
+        self.hash_name = manifest["hash"]
+        self.digest_size = SUPPORTED_HASHES[self.hash_name]
+        self._hasher = getattr(hashlib, self.hash_name)
+        self._refresh_lock = threading.Lock()
+        self._open: Dict[str, object] = {}
+        self._segments: Tuple = ()
+        self._manifest_key = None
+        self._next_check = 0.0
+        self.generation = 0
+        self._build_id = ""
+        self.refresh()
+
+    def after_fork(self):
+        """Replace the refresh lock in a forked child, where another thread of the parent may have held it"""
+        self._refresh_lock = threading.Lock()
+
+    def _manifest_stat_key(self):
+        stat = os.stat(_manifest_path(self.path))
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> bool:
+        """Re-read the manifest if it has changed; returns whether the segments changed"""
+        with self._refresh_lock:
+            key = self._manifest_stat_key()
+            if key == self._manifest_key:
+                return False
+            for _ in range(3):
+                manifest = read_manifest(self.path)
+                try:
+                    opened = {segment["file"]: self._open.get(segment["file"]) or
+                              open_index(os.path.join(self.path, segment["file"]))
+                              for segment in manifest["segments"]}
+                    break
+                except FileNotFoundError:
+                    # A compaction replaced the manifest and removed a segment after we read it
+                    key = self._manifest_stat_key()
+            else:
+                raise RuntimeError(f"{self.path} kept changing while its segments were being opened")
+            # Dropped segments aren't closed: lookups in flight may still use them.
+            # Their mappings are released once the last reference goes.
+            self._open = opened
+            self._segments = tuple(opened[segment["file"]] for segment in manifest["segments"])
+            self.generation = manifest["generation"]
+            self._build_id = hashlib.sha256(
+                "".join(segment["build_id"] for segment in manifest["segments"]).encode()).hexdigest()[:32]
+            self._manifest_key = key
+            return True
+
+    def _current_segments(self) -> Tuple:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                self.refresh()
+            except (OSError, ValueError, RuntimeError):
+                pass  # Keep serving the current segments; the next check retries
+        return self._segments
+
+    @property
+    def build_id(self) -> str:
+        """Identifies the set of live segments, like a single index's build id
+
+        Checks the manifest like a lookup does, so callers keying results on
+        it see an ingest as soon as lookups would.
+        """
+        self._current_segments()
+        return self._build_id
+
+    @property
+    def count(self) -> int:
+        return sum(len(segment) for segment in self._segments)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, digest: bytes) -> bool:
+        return self.contains(digest)
+
+    def digest(self, password: str) -> bytes:
+        """Hash a password with the store's algorithm"""
+        return self._hasher(password.encode()).digest()
+
+    def contains(self, digest: bytes) -> bool:
+        """Check whether a raw digest is present in any segment"""
+        return any(segment.contains(digest) for segment in self._current_segments())
+
+    def contains_many(self, digests: Iterable[bytes]) -> Set[bytes]:
+        """Return the subset of `digests` present in any segment"""
+        remaining = set(digests)
+        found = set()
+        for segment in self._current_segments():
+            if not remaining:
+                break
+            hits = segment.contains_many(remaining)
+            found |= hits
+            remaining -= hits
+        return found
+
+    def digests_with_prefix(self, prefix: str) -> List[bytes]:
+        """Return every digest whose hex form starts with `prefix`, in sorted order"""
+        prefix_bounds(prefix, self.digest_size)  # Validate once, even with no segments
+        merged = set()
+        for segment in self._current_segments():
+            merged.update(segment.digests_with_prefix(prefix))
+        return sorted(merged)
+
+    def __iter__(self) -> Iterator[bytes]:
+        previous = None
+        for digest in heapq.merge(*(iter(segment) for segment in self._current_segments())):
+            if digest != previous:
+                yield digest
+                previous = digest
+
+    def stats(self) -> Dict[str, float]:
+        """Bloom filter counters summed over the segments that have a filter"""
+        filtered = [segment for segment in self._segments if isinstance(segment, FilteredLeakIndex)]
+        totals = {"segments": len(self._segments), "generation": self.generation,
+                  "filter_hits": 0, "filter_misses": 0, "false_positives": 0}
+        for segment in filtered:
+            for name in ("filter_hits", "filter_misses", "false_positives"):
+                totals[name] += getattr(segment, name)
+        return totals
+
+    def close(self):
+        """Close every open segment"""
+        with self._refresh_lock:
+            for segment in self._open.values():
+                segment.close()
+            self._open = {}
+            self._segments = ()
+
+
+class BackgroundCompactor:
+    """Daemon thread that runs a non-blocking compaction of a store every `interval` seconds
+
+    Safe to start in several processes: only one compaction runs at a time
+    and the others skip their turn.
+    """
+
+    def __init__(self, directory: str, interval: float = 600.0, fanout: int = DEFAULT_COMPACTION_FANOUT):
+        self.directory = directory
+        self.interval = interval
+        self.fanout = fanout
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="leak-compactor", daemon=True)
+
+    def start(self) -> "BackgroundCompactor":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                # Merge tiers until none is full
+                while compact(self.directory, self.fanout, blocking=False) is not None:
+                    pass
+            except (OSError, ValueError) as error:
+                logger.warning("Leak store compaction failed: %s", error)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m models.leak_segments init|ingest|compact|status ..."""
+    parser = argparse.ArgumentParser(description="Manage a segmented leaked password store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="create an empty store")
+    init.add_argument("store", help="store directory")
+    init.add_argument("--hash", choices=sorted(SUPPORTED_HASHES), default="sha256",
+                      help="digest algorithm (default: sha256)")
+    init.add_argument("--bloom-fpr", type=float, default=0.01,
+                      help="Bloom prefilter false-positive rate per segment; 0 for none (default: 0.01)")
+    init.add_argument("--from", dest="initial_index", help="adopt an existing index file as the first segment")
+
+    ingest_parser = commands.add_parser("ingest", help="add password or hash lists as a new segment")
+    ingest_parser.add_argument("store", help="store directory")
+    ingest_parser.add_argument("inputs", nargs="+", help="input files (.gz supported, '-' for stdin)")
+    ingest_parser.add_argument("--format", choices=["plain", "hash"], default="plain",
+                               help="plain: one password per line; hash: hex digests, optionally HIBP HEX:count")
+    ingest_parser.add_argument("--chunk-size", type=int, default=10_000_000,
+                               help="digests sorted in memory per run (default: 10,000,000)")
+
+    compact_parser = commands.add_parser("compact", help="merge segments")
+    compact_parser.add_argument("store", help="store directory")
+    compact_parser.add_argument("--full", action="store_true", help="merge every segment into one")
+    compact_parser.add_argument("--fanout", type=int, default=DEFAULT_COMPACTION_FANOUT,
+                                help=f"segments per tier that trigger a merge (default: {DEFAULT_COMPACTION_FANOUT})")
+    compact_parser.add_argument("--watch", type=float, metavar="SECONDS",
+                                help="keep running, compacting every SECONDS")
+
+    status = commands.add_parser("status", help="list the live segments")
+    status.add_argument("store", help="store directory")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        manifest = create_store(args.store, args.hash, args.bloom_fpr or None, args.initial_index)
+        print(f"Created {args.hash} store {args.store} with {len(manifest['segments'])} segment(s)")
+        return 0
+
+    if args.command == "ingest":
+        segment = ingest(args.store, args.inputs, args.format, args.chunk_size)
+        print(f"Added segment {segment['file']} with {segment['count']} digests")
+        return 0
+
+    if args.command == "compact":
+        while True:
+            # Without --full, keep merging until no tier is full
+            merged = compact(args.store, args.fanout, args.full)
+            while merged is not None:
+                print(f"Merged into {merged['file']} ({merged['count']} digests)")
+                merged = None if args.full else compact(args.store, args.fanout)
+            if args.watch is None:
+                return 0
+            time.sleep(args.watch)
+
+    manifest = read_manifest(args.store)
+    print(f"{args.store}: {manifest['hash']}, generation {manifest['generation']}, "
+          f"{len(manifest['segments'])} segment(s)")
+    for segment in manifest["segments"]:
+        print(f"  {segment['file']}\t{segment['count']} digests\ttier {_tier(segment['count'], DEFAULT_COMPACTION_FANOUT)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# Leak Variants - Canonical forms of a password for near-duplicate leak lookups
+# Reverses leet substitutions and strips case and affixes with precomputed tables,
+# so a password costs at most MAX_VARIANTS extra lookups however large the index
+
+import string
+from typing import Dict, List
+
+# Common character substitutions, letter -> substitutes. PasswordGenAI applies
+# them to strengthen passwords; here they are reversed to undo them.
+LEET_SUBSTITUTIONS: Dict[str, List[str]] = {
+    'a': ['@', '4'],
+    'b': ['8', '6'],
+    'e': ['3', '€'],
+    'i': ['1', '!', '|'],
+    'l': ['1', '|', '/'],
+    'o': ['0', 'ø', '()'],
+    's': ['5', '$'],
+    't': ['7', '+'],
+    'g': ['9', '&'],
+    'z': ['2', '%']
+}
+
+MAX_VARIANTS = 8
+# Shorter canonical forms match too many unrelated leaked strings
+MIN_VARIANT_LENGTH = 4
+
+
+def _reverse_tables():
+    """Translate tables mapping each substitute back to a letter
+
+    Where a substitute stands for several letters ('1' for i or l), the
+    primary table picks the first and the alternate table the last, so the
+    two together cover the usual readings without enumerating combinations.
+    Multi-character substitutes are returned separately, for str.replace.
+    """
+    readings: Dict[str, List[str]] = {}
+    for letter, substitutes in LEET_SUBSTITUTIONS.items():
+        for substitute in substitutes:
+            readings.setdefault(substitute, []).append(letter)
+    single = {sub: letters for sub, letters in readings.items() if len(sub) == 1}
+    multi = [(sub, letters[0]) for sub, letters in readings.items() if len(sub) > 1]
+    primary = str.maketrans({sub: letters[0] for sub, letters in single.items()})
+    alternate = str.maketrans({sub: letters[-1] for sub, letters in single.items()})
+    ambiguous = frozenset(sub for sub, letters in single.items() if len(letters) > 1)
+    return primary, alternate, ambiguous, multi
+
+
+_PRIMARY, _ALTERNATE, _AMBIGUOUS, _MULTI_CHAR = _reverse_tables()
+
+# Years, digits and punctuation appended or prepended to a base password
+AFFIX_CHARACTERS = string.digits + "!@#$%^&*?.,_+=~-"
+
+
+def _unleet(text: str, table) -> str:
+    for substitute, letter in _MULTI_CHAR:
+        if substitute in text:
+            text = text.replace(substitute, letter)
+    return text.translate(table)
+
+
+def candidate_variants(password: str) -> List[str]:
+    """Canonical forms of `password` to look up in the leak index, most likely first
+
+    Lowercased, without affixes, with leet substitutions reversed, and the
+    combinations of those; never the password itself and never more than
+    MAX_VARIANTS.
+    """
+    lowered = password.lower()
+    stripped = lowered.rstrip(AFFIX_CHARACTERS)
+    core = stripped.lstrip(AFFIX_CHARACTERS)
+    candidates = [
+        lowered,
+        stripped,
+        _unleet(stripped, _PRIMARY),
+        _unleet(lowered, _PRIMARY),
+        password.rstrip(AFFIX_CHARACTERS),  # Original case, e.g. "Password" from "Password1!"
+        core,
+        _unleet(core, _PRIMARY),
+    ]
+    if not _AMBIGUOUS.isdisjoint(stripped):
+        candidates.append(_unleet(stripped, _ALTERNATE))
+
+    variants = []
+    for candidate in candidates:
+        if len(candidate) >= MIN_VARIANT_LENGTH and candidate != password and candidate not in variants:
+            variants.append(candidate)
+            if len(variants) == MAX_VARIANTS:
+                break
+    return variants
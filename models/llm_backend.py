@@ -0,0 +1,242 @@
+# LLM Backends - Async text generation for PasswordGenAI
+# Pluggable backends with connection pooling, timeouts, concurrency limits and
+# request coalescing, plus a helper to drive them from synchronous Flask code
+
+import abc
+import asyncio
+import concurrent.futures
+import json
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class LLMError(Exception):
+    """Raised when a backend cannot produce a completion"""
+
+
+class LLMBackend(abc.ABC):
+    """Interface for asynchronous text generation backends"""
+
+    @abc.abstractmethod
+    async def complete(self, prompt: str) -> str:
+        """Return the model's completion for `prompt`, or raise LLMError"""
+
+    async def close(self):
+        """Release any pooled connections"""
+
+    def after_fork(self):
+        """Drop state inherited from the parent's event loop in a forked child"""
+
+
+class _HTTPConnectionPool:
+    """Keep-alive HTTP/1.1 connections to a single host, reused across requests"""
+
+    def __init__(self, host: str, port: int, use_tls: bool, max_idle: int):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self._idle = []
+        self._max_idle = max_idle
+
+    async def acquire(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return await asyncio.open_connection(self.host, self.port, ssl=self.use_tls or None)
+
+    def release(self, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter], reusable: bool):
+        reader, writer = connection
+        if reusable and len(self._idle) < self._max_idle and not writer.is_closing():
+            self._idle.append(connection)
+        else:
+            writer.close()
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    def after_fork(self):
+        """Stop reusing the parent's connections in a forked child, without closing them
+
+        Closing would unregister them from the parent's event loop, whose
+        epoll set the child shares, so they are kept referenced and unused.
+        """
+        self._inherited = self._idle
+        self._idle = []
+
+
+async def _read_http_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+    """Read one HTTP/1.1 response with a Content-Length or chunked body"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise LLMError("connection closed before response")
+    status = int(status_line.split(b" ", 2)[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", "0")))
+    return status, headers, body
+
+
+class HTTPLLMBackend(LLMBackend):
+    """Backend for an OpenAI-style chat completions endpoint over HTTP(S)
+
+    Requests share a pool of keep-alive connections, at most `max_concurrency`
+    are in flight at once, each is bounded by `timeout` seconds, and
+    concurrent requests for an identical prompt share one upstream call.
+    """
+
+    def __init__(self, url: str, model: str = "gpt-3.5-turbo", api_key: Optional[str] = None,
+                 timeout: float = 10.0, max_concurrency: int = 8, max_tokens: int = 200):
+        parts = urlsplit(url)
+        use_tls = parts.scheme == "https"
+        self.model = model
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self._api_key = api_key
+        self._host = parts.netloc
+        self._path = parts.path or "/"
+        self._pool = _HTTPConnectionPool(parts.hostname, parts.port or (443 if use_tls else 80),
+                                         use_tls, max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    async def complete(self, prompt: str) -> str:
+        """Return the completion, joining an identical in-flight request if there is one"""
+        pending = self._inflight.get(prompt)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[prompt] = future
+        try:
+            text = await asyncio.wait_for(self._request(prompt), self.timeout)
+            future.set_result(text)
+            return text
+        except asyncio.CancelledError:
+            # Callers that joined this request expect an LLMError, not the leader's cancellation
+            future.set_exception(LLMError("completion cancelled"))
+            future.exception()
+            raise
+        except Exception as error:
+            failure = error if isinstance(error, LLMError) else LLMError(f"completion failed: {error!r}")
+            future.set_exception(failure)
+            future.exception()  # Mark retrieved so unawaited failures don't log warnings
+            raise failure from error
+        finally:
+            del self._inflight[prompt]
+
+    async def _request(self, prompt: str) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        body = json.dumps({
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+        }).encode()
+        headers = [
+            f"POST {self._path} HTTP/1.1",
+            f"Host: {self._host}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive",
+        ]
+        if self._api_key:
+            headers.append(f"Authorization: Bearer {self._api_key}")
+        request = ("\r\n".join(headers) + "\r\n\r\n").encode() + body
+
+        async with self._semaphore:
+            self.requests += 1
+            connection = await self._pool.acquire()
+            reusable = False
+            try:
+                reader, writer = connection
+                writer.write(request)
+                await writer.drain()
+                status, response_headers, payload = await _read_http_response(reader)
+                reusable = response_headers.get("connection", "").lower() != "close"
+            finally:
+                self._pool.release(connection, reusable)
+
+        if status != 200:
+            raise LLMError(f"backend returned HTTP {status}")
+        try:
+            return json.loads(payload)["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            raise LLMError("unexpected response format")
+
+    async def close(self):
+        await self._pool.close()
+
+    def after_fork(self):
+        """Start over in a forked child: new connections, and no requests in flight"""
+        self._pool.after_fork()
+        # Both belong to the parent's event loop
+        self._semaphore = None
+        self._inflight = {}
+
+
+class AsyncRunner:
+    """Runs an asyncio event loop on a background thread for synchronous callers
+
+    Flask handlers submit coroutines and wait on the returned futures, so one
+    loop (and one connection pool) is shared by every request thread. The
+    thread starts on first use, so a runner created before a server forks
+    its workers runs in each worker rather than only in the parent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The runner's event loop, started on first access"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="genai-loop", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def after_fork(self):
+        """Start a new loop on first use in a forked child, which has no copy of the loop's thread"""
+        # The parent's loop is kept referenced: closing it would touch the epoll set the child shares
+        self._inherited = self._loop
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    def submit(self, coroutine) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop and return a thread-safe future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout: Optional[float] = None):
+        """Run a coroutine on the loop and block until it finishes"""
+        return self.submit(coroutine).result(timeout)
@@ -0,0 +1,192 @@
+# Metrics - Counters, histograms and stage timers in the Prometheus text format
+# Components take an optional MetricsRegistry; without one, instrumentation is
+# a single `is not None` check per stage
+
+from bisect import bisect_left
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from 10us (one analyzer stage) to 10s (an LLM call)
+DEFAULT_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        """Add `amount` to the series for `labelvalues`"""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: a count per bucket (plus one for +Inf), then the sum
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        """Record one observation in the series for `labelvalues`"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labelvalues, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Series read from a function at scrape time, for counters a component already keeps"""
+
+    def __init__(self, name: str, documentation: str, metric_type: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for labelvalues, value in self.callback():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class StageTimer:
+    """Times consecutive stages of one call into a histogram labelled by stage
+
+    Each lap() records the time since the previous lap (or since the timer
+    was created) under the given stage name.
+    """
+    __slots__ = ("_histogram", "_component", "_last")
+
+    def __init__(self, histogram: Histogram, component: str):
+        self._histogram = histogram
+        self._component = component
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Record the time since the previous lap as `stage`"""
+        now = time.perf_counter()
+        self._histogram.observe(now - self._last, self._component, stage)
+        self._last = now
+
+    def skip(self):
+        """Restart the clock without recording, to leave out work that isn't a stage"""
+        self._last = time.perf_counter()
+
+
+class MetricsRegistry:
+    """The set of metrics exposed on one /metrics endpoint
+
+    Holds the shared stage-timing histogram and the leak-check and LLM
+    counters that the analyzer and GenAI components record into.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+        self._names = set()
+        self.stage_seconds = self.histogram(
+            "password_stage_seconds", "Time spent in each stage of an analysis or GenAI call",
+            ["component", "stage"])
+        self.leak_checks = self.counter(
+            "password_leak_checks_total", "Passwords checked against the leak index, by outcome", ["result"])
+        self.llm_requests = self.counter(
+            "genai_llm_requests_total", "GenAI backend completions, by whether they succeeded or fell back "
+            "to local heuristics", ["outcome"])
+
+    def _register(self, metric):
+        if metric.name in self._names:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._names.add(metric.name)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, metric_type: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Sequence[str], float]]]) -> CallbackMetric:
+        """Register series computed at scrape time; `metric_type` is "counter" or "gauge" """
+        return self._register(CallbackMetric(name, documentation, metric_type, labelnames, callback))
+
+    def stage_timer(self, component: str) -> StageTimer:
+        """Start timing the stages of one call"""
+        return StageTimer(self.stage_seconds, component)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def stage_timer(metrics: Optional[MetricsRegistry], component: str) -> Optional[StageTimer]:
+    """A stage timer when metrics are enabled, otherwise None"""
+    return metrics.stage_timer(component) if metrics is not None else None
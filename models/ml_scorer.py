@@ -0,0 +1,386 @@
+# ML Strength Scorer - Tree-ensemble model over the analyzer's password features
+# Trained offline with scikit-learn, exported to flat node arrays and evaluated
+# without sklearn, so loading is one file read and scoring takes microseconds
+
+import argparse
+from array import array
+import gzip
+import json
+import math
+import os
+import random
+import struct
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from models.pattern_detector import PATTERN_ORDER
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; batches fall back to the scalar path
+    np = None
+
+# File layout:
+#   header (64 bytes): magic, version, tree count, node count, feature count,
+#                      class count, metadata length
+#   metadata: JSON with the model version, feature names, class names and
+#             training details
+#   roots: tree count uint32 node ids
+#   feature: node count int32 feature indexes, -1 at leaves
+#   threshold: node count float64 split values; rows go left when value <= threshold
+#   left, right: node count uint32 child ids; leaves point at themselves
+#   value: node count * class count float64 class probabilities at each leaf
+MAGIC = b"PWTREES1"
+VERSION = 1
+HEADER_FORMAT = "<8sHIIIII"
+HEADER_SIZE = 64
+
+# Inputs to the model, in column order. Changing these requires retraining.
+FEATURE_NAMES = (
+    "length", "has_upper", "has_lower", "has_digit", "has_special", "char_set_size",
+    "distinct_characters", "entropy", "log10_crack_seconds",
+) + tuple(f"pattern_{label}" for label in PATTERN_ORDER)
+
+# Crack times are fed to the model as log10 seconds, capped so "centuries"
+# values of wildly different sizes look alike
+MAX_LOG10_CRACK_SECONDS = 30.0
+
+DEFAULT_MAX_PER_CLASS = 200_000
+
+
+def feature_vector(features, entropy: float, crack_seconds: float) -> List[float]:
+    """Model inputs for one password, in FEATURE_NAMES order
+
+    `features` is the password's PasswordFeatures; entropy and crack time are
+    the analyzer's own values for it.
+    """
+    if crack_seconds > 0:
+        log10_seconds = min(math.log10(crack_seconds), MAX_LOG10_CRACK_SECONDS)
+    else:
+        log10_seconds = -MAX_LOG10_CRACK_SECONDS
+    patterns = features.patterns
+    return [features.length, features.has_upper, features.has_lower, features.has_digit,
+            features.has_special, features.char_set_size, len(features.histogram), entropy,
+            log10_seconds] + [label in patterns for label in PATTERN_ORDER]
+
+
+class TreeEnsemble:
+    """A forest of binary decision trees stored as flat arrays
+
+    Every tree's nodes live in the same arrays, so evaluating a row is a loop
+    of list lookups per tree, and a NumPy batch walks all rows and trees one
+    level at a time. Class probabilities are averaged over the trees, as
+    sklearn's forests do, with features rounded to float32 as sklearn
+    rounds them, so both agree on every split.
+    """
+
+    def __init__(self, roots: Sequence[int], feature: Sequence[int], threshold: Sequence[float],
+                 left: Sequence[int], right: Sequence[int], value: Sequence[float],
+                 metadata: Dict):
+        """Wrap node arrays; `metadata` must name the features and classes
+
+        `classes` in the metadata run from weakest to strongest.
+        """
+        self.metadata = metadata
+        self.feature_names = tuple(metadata["feature_names"])
+        self.classes = tuple(metadata["classes"])
+        self.model_version = metadata.get("model_version", "")
+        # Plain lists index fastest from Python
+        self._roots = list(roots)
+        self._feature = list(feature)
+        self._threshold = list(threshold)
+        self._left = list(left)
+        self._right = list(right)
+        class_count = len(self.classes)
+        self._value = [tuple(value[i:i + class_count]) for i in range(0, len(value), class_count)]
+        self.max_depth = self._max_depth()
+        self._arrays = None
+
+    def _max_depth(self) -> int:
+        depth = 0
+        stack = [(root, 0) for root in self._roots]
+        while stack:
+            node, level = stack.pop()
+            if self._feature[node] < 0:
+                depth = max(depth, level)
+            else:
+                stack.append((self._left[node], level + 1))
+                stack.append((self._right[node], level + 1))
+        return depth
+
+    @classmethod
+    def from_sklearn(cls, model, feature_names: Sequence[str], classes: Sequence[str],
+                     metadata: Optional[Dict] = None) -> "TreeEnsemble":
+        """Export a fitted sklearn forest (or single tree) classifier
+
+        The model must have been fitted on labels 0..len(classes)-1, with
+        `classes` naming them from weakest to strongest.
+        """
+        estimators = getattr(model, "estimators_", [model])
+        if list(model.classes_) != list(range(len(classes))):
+            raise ValueError("model must be fitted on labels 0..len(classes)-1")
+
+        roots, feature, threshold, left, right, value = [], [], [], [], [], []
+        for estimator in estimators:
+            tree = estimator.tree_
+            offset = len(feature)
+            roots.append(offset)
+            for node in range(tree.node_count):
+                if tree.children_left[node] < 0:
+                    feature.append(-1)
+                    threshold.append(0.0)
+                    left.append(offset + node)
+                    right.append(offset + node)
+                else:
+                    feature.append(int(tree.feature[node]))
+                    threshold.append(float(tree.threshold[node]))
+                    left.append(offset + int(tree.children_left[node]))
+                    right.append(offset + int(tree.children_right[node]))
+                # Older sklearn stores class counts at each node, newer stores fractions
+                counts = [float(count) for count in tree.value[node][0]]
+                total = sum(counts)
+                value.extend(count / total for count in counts)
+
+        metadata = dict(metadata or {})
+        metadata["feature_names"] = list(feature_names)
+        metadata["classes"] = list(classes)
+        return cls(roots, feature, threshold, left, right, value, metadata)
+
+    @classmethod
+    def load(cls, path: str) -> "TreeEnsemble":
+        """Read a model previously written with save()"""
+        with open(path, "rb") as handle:
+            data = handle.read()
+        if len(data) < HEADER_SIZE:
+            raise ValueError(f"{path} is not a version {VERSION} strength model")
+        magic, version, tree_count, node_count, feature_count, class_count, metadata_length = \
+            struct.unpack_from(HEADER_FORMAT, data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} strength model")
+
+        offset = HEADER_SIZE
+        metadata = json.loads(data[offset:offset + metadata_length].decode("utf-8"))
+        offset += metadata_length
+        arrays = []
+        for typecode, count in (("I", tree_count), ("i", node_count), ("d", node_count),
+                                ("I", node_count), ("I", node_count), ("d", node_count * class_count)):
+            values = array(typecode)
+            size = values.itemsize * count
+            values.frombytes(data[offset:offset + size])
+            if sys.byteorder != "little":
+                values.byteswap()
+            arrays.append(values)
+            offset += size
+        if offset != len(data) or len(metadata["feature_names"]) != feature_count \
+                or len(metadata["classes"]) != class_count:
+            raise ValueError(f"{path} is not a valid version {VERSION} strength model")
+        return cls(*arrays, metadata)
+
+    def save(self, path: str):
+        """Write the model to `path` in the binary format read by load()"""
+        metadata = json.dumps(self.metadata, sort_keys=True).encode("utf-8")
+        class_count = len(self.classes)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as out:
+            out.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(self._roots), len(self._feature),
+                                  len(self.feature_names), class_count, len(metadata)).ljust(HEADER_SIZE, b"\0"))
+            out.write(metadata)
+            for typecode, values in (("I", self._roots), ("i", self._feature), ("d", self._threshold),
+                                     ("I", self._left), ("I", self._right),
+                                     ("d", [p for leaf in self._value for p in leaf])):
+                packed = array(typecode, values)
+                if sys.byteorder != "little":
+                    packed.byteswap()
+                out.write(packed.tobytes())
+        os.replace(temp_path, path)
+
+    def predict_proba_one(self, row: Sequence[float]) -> List[float]:
+        """Class probabilities for one feature row"""
+        row = array("f", row)  # Round as sklearn does before comparing
+        feature, threshold, left, right, value = self._feature, self._threshold, self._left, self._right, self._value
+        totals = [0.0] * len(self.classes)
+        for node in self._roots:
+            index = feature[node]
+            while index >= 0:
+                node = left[node] if row[index] <= threshold[node] else right[node]
+                index = feature[node]
+            for i, probability in enumerate(value[node]):
+                totals[i] += probability
+        tree_count = len(self._roots)
+        return [total / tree_count for total in totals]
+
+    def predict_proba(self, rows: Sequence[Sequence[float]]) -> List[List[float]]:
+        """Class probabilities for many rows, equal to predict_proba_one for each"""
+        if np is None or not len(rows):
+            return [self.predict_proba_one(row) for row in rows]
+
+        roots, feature, threshold, left, right, value = self._numpy_arrays()
+        features = np.asarray(rows, dtype=np.float32)
+        row_index = np.arange(len(features))[:, None]
+        nodes = np.repeat(roots[None, :], len(features), axis=0)
+        for _ in range(self.max_depth):
+            go_left = features[row_index, np.maximum(feature[nodes], 0)] <= threshold[nodes]
+            nodes = np.where(go_left, left[nodes], right[nodes])
+
+        # Sum trees in order, as predict_proba_one does, so results are bit-identical
+        totals = np.zeros((len(features), len(self.classes)))
+        for tree in range(len(roots)):
+            totals += value[nodes[:, tree]]
+        return (totals / len(roots)).tolist()
+
+    def _numpy_arrays(self):
+        if self._arrays is None:
+            self._arrays = (np.array(self._roots, dtype=np.int64), np.array(self._feature, dtype=np.int64),
+                            np.array(self._threshold), np.array(self._left, dtype=np.int64),
+                            np.array(self._right, dtype=np.int64), np.array(self._value))
+        return self._arrays
+
+    def strength(self, probabilities: Sequence[float]) -> float:
+        """Expected class rank scaled to 0 (weakest class) .. 1 (strongest class)"""
+        last = len(probabilities) - 1
+        return sum(i * p for i, p in enumerate(probabilities)) / last if last else 0.0
+
+
+def load_model(path: str) -> TreeEnsemble:
+    """Load a strength model, checking it was trained on this version's features"""
+    model = TreeEnsemble.load(path)
+    if model.feature_names != FEATURE_NAMES:
+        raise ValueError(f"{path} was trained on different features; retrain it with "
+                         f"python -m models.ml_scorer train")
+    return model
+
+
+def _iter_passwords(path: str) -> Iterator[str]:
+    """Yield passwords from a plain or gzip file, one per line"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="ignore") as handle:
+        for line in handle:
+            password = line.rstrip("\r\n")
+            if password:
+                yield password
+
+
+def _sample(passwords: Iterable[str], limit: int, rng: random.Random) -> List[str]:
+    """Reservoir-sample at most `limit` distinct passwords"""
+    sample: List[str] = []
+    for seen, password in enumerate(dict.fromkeys(passwords)):
+        if len(sample) < limit:
+            sample.append(password)
+        else:
+            slot = rng.randrange(seen + 1)
+            if slot < limit:
+                sample[slot] = password
+    return sample
+
+
+def training_rows(analyzer, passwords: Iterable[str]) -> List[List[float]]:
+    """Feature rows for training, computed exactly as the analyzer computes them at inference"""
+    rows = []
+    for password in passwords:
+        features = analyzer.extract_features(password)
+        crack_seconds, _ = analyzer._estimate_crack_time(features)
+        rows.append(feature_vector(features, analyzer._calculate_entropy(features), crack_seconds))
+    return rows
+
+
+def _parse_class(spec: str) -> Tuple[str, List[str]]:
+    name, separator, paths = spec.partition("=")
+    if not separator or not name or not paths:
+        raise argparse.ArgumentTypeError(f"expected NAME=FILE[,FILE...], got {spec!r}")
+    return name, paths.split(",")
+
+
+def train(args) -> int:
+    """Train a random forest on labelled password lists and export it"""
+    # Only training needs scikit-learn; the app evaluates the exported arrays
+    from sklearn import __version__ as sklearn_version
+    from sklearn.ensemble import RandomForestClassifier
+    from models.password_analyzer import PasswordAnalyzer
+
+    analyzer = PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=None,
+                                common_words_path=args.dictionary)
+    rng = random.Random(args.seed)
+    rows, labels = [], []
+    for label, (name, paths) in enumerate(args.classes):
+        passwords = _sample((pwd for path in paths for pwd in _iter_passwords(path)), args.max_per_class, rng)
+        rows.extend(training_rows(analyzer, passwords))
+        labels.extend([label] * len(passwords))
+        print(f"{name}: {len(passwords)} passwords")
+
+    order = list(range(len(rows)))
+    rng.shuffle(order)
+    test_count = int(len(order) * args.test_fraction)
+    test, fit = order[:test_count], order[test_count:]
+
+    started = time.perf_counter()
+    forest = RandomForestClassifier(n_estimators=args.trees, max_depth=args.max_depth,
+                                    min_samples_leaf=args.min_samples_leaf, n_jobs=-1,
+                                    random_state=args.seed)
+    forest.fit([rows[i] for i in fit], [labels[i] for i in fit])
+    elapsed = time.perf_counter() - started
+
+    metadata = {
+        "model_version": args.model_version or time.strftime("%Y%m%d-%H%M%S", time.gmtime()),
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "trainer": f"sklearn {sklearn_version} RandomForestClassifier",
+        "params": {"trees": args.trees, "max_depth": args.max_depth,
+                   "min_samples_leaf": args.min_samples_leaf, "seed": args.seed},
+        "dictionary_words": len(analyzer.common_words),
+        "training_rows": len(fit),
+    }
+    model = TreeEnsemble.from_sklearn(forest, FEATURE_NAMES, [name for name, _ in args.classes], metadata)
+    if test:
+        test_rows = [rows[i] for i in test]
+        predictions = model.predict_proba(test_rows)
+        correct = sum(max(range(len(p)), key=p.__getitem__) == labels[i] for p, i in zip(predictions, test))
+        model.metadata["test_accuracy"] = round(correct / len(test), 4)
+    model.save(args.output)
+    print(f"Trained {args.trees} trees in {elapsed:.1f}s; wrote model {model.metadata['model_version']} "
+          f"({len(model._feature)} nodes) to {args.output}")
+    if test:
+        print(f"Held-out accuracy: {model.metadata['test_accuracy']:.2%} on {len(test)} passwords")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m models.ml_scorer {train,info} ..."""
+    parser = argparse.ArgumentParser(description="Train or inspect the ML strength model")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="train a model from labelled password lists")
+    train_parser.add_argument("--class", dest="classes", type=_parse_class, action="append", required=True,
+                              metavar="NAME=FILE[,FILE...]",
+                              help="a class and its password lists (.gz supported); repeat from weakest to strongest")
+    train_parser.add_argument("-o", "--output", required=True, help="model file to write")
+    train_parser.add_argument("--dictionary", default=None,
+                              help="common word list or .dawg the app uses (default: built-in list)")
+    train_parser.add_argument("--model-version", default=None,
+                              help="version string stored in the model (default: UTC timestamp)")
+    train_parser.add_argument("--max-per-class", type=int, default=DEFAULT_MAX_PER_CLASS,
+                              help=f"sample at most this many passwords per class (default: {DEFAULT_MAX_PER_CLASS})")
+    train_parser.add_argument("--trees", type=int, default=50, help="number of trees (default: 50)")
+    train_parser.add_argument("--max-depth", type=int, default=12, help="maximum tree depth (default: 12)")
+    train_parser.add_argument("--min-samples-leaf", type=int, default=5,
+                              help="minimum passwords per leaf (default: 5)")
+    train_parser.add_argument("--test-fraction", type=float, default=0.1,
+                              help="fraction held out to report accuracy (default: 0.1)")
+    train_parser.add_argument("--seed", type=int, default=0)
+
+    info = commands.add_parser("info", help="print a model's metadata")
+    info.add_argument("model", help="model file to read")
+
+    args = parser.parse_args(argv)
+    if args.command == "train":
+        if len(args.classes) < 2:
+            parser.error("at least two --class options are required")
+        return train(args)
+
+    model = TreeEnsemble.load(args.model)
+    print(json.dumps(dict(model.metadata, trees=len(model._roots), nodes=len(model._feature),
+                          max_depth=model.max_depth), indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
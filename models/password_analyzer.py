@@ -1,13 +1,30 @@
 # Password Strength Analyzer - Core Architecture
 
-from dataclasses import dataclass
-import hashlib
+from dataclasses import dataclass, replace
 import re
 import time
 import random
 import math
-from typing import List, Dict, Tuple, Optional
-# import numpy as np
+import os
+from typing import List, Dict, Set, Tuple, Optional, Iterable, Iterator
+from models.leak_index import MemoryLeakIndex
+from models.leak_filter import open_index
+from models.leak_segments import SegmentedLeakIndex, is_store
+from models.leak_variants import LEET_SUBSTITUTIONS, candidate_variants
+from models.pattern_detector import PatternDetector, PatternMatch
+from models.wordlist import CompactDawg, load_dictionary
+from models.result_cache import AnalysisCache
+from models import scoring
+from models.features import PasswordFeatures
+from models.guesses import GuessEstimator, seconds_from_log10_guesses
+from models.ml_scorer import feature_vector, load_model
+from models.resources import LazyResource, LazyResources
+from models.metrics import MetricsRegistry, stage_timer
+
+try:
+    from models import vectorized
+except ImportError:  # numpy is optional; batches fall back to the scalar path
+    vectorized = None
 
 @dataclass
 class PasswordStrengthResult:
@@ -21,52 +38,161 @@ class PasswordStrengthResult:
     entropy: float  # Shannon entropy
     is_compromised: bool  # If found in leaked datasets
     attack_vector: str  # Most likely successful attack vector
+    ml_strength: Optional[float] = None  # 0-1 strength from the ML model, if one is loaded
+    is_leaked_variant: bool = False  # Not leaked itself, but a leet/case/affix variant of a leaked password
+    
+# The improved example swaps a and i for symbols and e and o for digits, taken
+# from the shared leet table, so it gains both classes wherever those letters appear
+IMPROVEMENT_SUBSTITUTIONS = {
+    letter: next(sub for sub in LEET_SUBSTITUTIONS[letter] if len(sub) == 1 and sub.isdigit() == (letter in "eo"))
+    for letter in "aeio"
+}
+_IMPROVEMENT_TABLE = str.maketrans(IMPROVEMENT_SUBSTITUTIONS)
+
+class PasswordAnalyzer(LazyResources):
+    """Core password analysis engine
+    
+    The dictionary, pattern detector, ML model and leak index are loaded on
+    first use (see models/resources.py). Servers that fork workers should
+    call preload() first so every worker shares one loaded copy.
+    """
     
-class PasswordAnalyzer:
-    """Core password analysis engine"""
+    # Used when no wordlist has been provided
+    DEFAULT_COMMON_WORDS = ["password", "123456", "qwerty", "admin", "welcome", 
+                            "summer", "winter", "spring", "fall", "letmein"]
     
-    def __init__(self, ml_model_path: str, leaked_password_db_path: str):
-        """Initialize the password analyzer with ML model and leaked password database"""
+    # The scoring rules of models/scoring.py, which the batch path and the
+    # browser's scorer (see models/client_export.py) use as well
+    ENTROPY_SCORE_WEIGHT = scoring.ENTROPY_SCORE_WEIGHT
+    COMPROMISED_SCORE_FACTOR = scoring.COMPROMISED_SCORE_FACTOR
+    LEAKED_VARIANT_SCORE_FACTOR = scoring.LEAKED_VARIANT_SCORE_FACTOR
+    PATTERN_PENALTY = scoring.PATTERN_PENALTY
+    CRACK_TIME_UNITS = scoring.CRACK_TIME_UNITS
+    
+    def __init__(self, ml_model_path: str, leaked_password_db_path: str,
+                 common_words_path: Optional[str] = None,
+                 result_cache: Optional[AnalysisCache] = None,
+                 metrics: Optional[MetricsRegistry] = None,
+                 detect_leak_variants: bool = True):
+        """Initialize the password analyzer with ML model and leaked password database
+        
+        Nothing is read from disk until a resource is first needed. With
+        `metrics`, each analysis stage is timed into its histograms. With
+        `detect_leak_variants`, passwords that aren't leaked themselves are
+        also checked for leaked canonical forms (see models/leak_variants.py).
+        """
+        LazyResources.__init__(self)
         self.ml_model_path = ml_model_path
         self.leaked_db_path = leaked_password_db_path
-        self.common_words = self._load_common_words()
-        self.ml_model = self._load_ml_model()
-        self.leaked_passwords_hash_set = self._load_leaked_password_hashes()
-        
-    def _load_common_words(self) -> List[str]:
-        """Load dictionary of common words"""
-        # In a real implementation, load from file
-        return ["password", "123456", "qwerty", "admin", "welcome", 
-                "summer", "winter", "spring", "fall", "letmein"]
+        self.common_words_path = common_words_path
+        self.result_cache = result_cache
+        self.metrics = metrics
+        self.detect_leak_variants = detect_leak_variants
+        
+    @LazyResource
+    def common_words(self) -> CompactDawg:
+        """Load dictionary of common words
+        
+        `common_words_path` may be a plain or gzip wordlist (compiled once and
+        cached next to it) or a prebuilt .dawg file (see models/wordlist.py).
+        """
+        if self.common_words_path and os.path.exists(self.common_words_path):
+            return load_dictionary(self.common_words_path)
+        return CompactDawg.from_words(self.DEFAULT_COMMON_WORDS)
+    
+    @LazyResource
+    def pattern_detector(self) -> PatternDetector:
+        """Compile the pattern scanner over the common words"""
+        return PatternDetector(self.common_words)
     
-    def _load_ml_model(self):
-        """Load the ML model for pattern recognition"""
-        # In a real implementation, load pretrained model
-        return "ML_MODEL_PLACEHOLDER"
+    @LazyResource
+    def guess_estimator(self) -> GuessEstimator:
+        """Create the crack-time estimator, sized to the dictionary"""
+        return GuessEstimator(len(self.common_words))
     
-    def _load_leaked_password_hashes(self) -> set:
-        """Load hashed versions of leaked passwords"""
-        # In a real implementation, load from database
-        return {self._hash_password(pwd) for pwd in self.common_words}
+    @LazyResource
+    def ml_model(self):
+        """Load the ML strength model, or None if none has been trained
+        
+        The model is a tree ensemble exported by `python -m models.ml_scorer
+        train` (see models/ml_scorer.py); it is read once and needs no sklearn.
+        """
+        if self.ml_model_path and os.path.exists(self.ml_model_path):
+            return load_model(self.ml_model_path)
+        return None
     
-    def _hash_password(self, password: str) -> str:
-        """Create a hash of the password for comparison"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    @LazyResource
+    def leak_index(self):
+        """Open the memory-mapped leaked password index
+        
+        `leaked_password_db_path` is either an index file (see
+        models/leak_index.py) or a segmented store directory (see
+        models/leak_segments.py), whose newly ingested segments are picked
+        up while running. Falls back to an in-memory index of the common
+        words when neither exists. Bloom prefilters are consulted first.
+        """
+        if self.leaked_db_path and is_store(self.leaked_db_path):
+            return SegmentedLeakIndex(self.leaked_db_path)
+        if not (self.leaked_db_path and os.path.exists(self.leaked_db_path)):
+            return MemoryLeakIndex(self.common_words)
+        return open_index(self.leaked_db_path)
     
-    def _calculate_entropy(self, password: str) -> float:
+    def after_fork(self):
+        """Reset the locks a forked child inherits, which other threads of the parent may have held"""
+        LazyResources.after_fork(self)
+        if self.result_cache is not None:
+            self.result_cache.after_fork()
+        if self.is_ready('leak_index') and hasattr(self.leak_index, 'after_fork'):
+            self.leak_index.after_fork()
+    
+    def _hash_password(self, password: str) -> bytes:
+        """Create a raw digest of the password for comparison against the leak index"""
+        return self.leak_index.digest(password)
+    
+    def _find_leaked_variants(self, passwords: Iterable[str]) -> Set[str]:
+        """Return the passwords with a leaked canonical form: de-leeted, lowercased or without affixes
+        
+        Each password has at most MAX_VARIANTS candidate forms, and all of
+        them are looked up in a single contains_many call.
+        """
+        if not self.detect_leak_variants:
+            return set()
+        owners: Dict[bytes, List[str]] = {}
+        for password in passwords:
+            for variant in candidate_variants(password):
+                owners.setdefault(self._hash_password(variant), []).append(password)
+        if not owners:
+            return set()
+        return {password for digest in self.leak_index.contains_many(owners) for password in owners[digest]}
+    
+    def leak_status(self, password: str) -> Tuple[bool, bool]:
+        """Return whether the password is leaked, and whether it is a simple variant of a leaked one
+        
+        At most one of the two is true.
+        """
+        is_compromised = self.leak_index.contains(self._hash_password(password))
+        is_leaked_variant = not is_compromised and bool(self._find_leaked_variants([password]))
+        return is_compromised, is_leaked_variant
+    
+    def extract_features(self, password: str) -> PasswordFeatures:
+        """Compute the password's features once, for analyze_password and PasswordGenAI to share"""
+        if self.metrics is None:
+            return PasswordFeatures.from_password(password, self.pattern_detector)
+        timer = self.metrics.stage_timer("analyzer")
+        features = PasswordFeatures.from_password(password, self.pattern_detector)
+        timer.lap("pattern_detection")
+        return features
+    
+    def _calculate_entropy(self, features: PasswordFeatures) -> float:
         """Calculate Shannon entropy of password"""
-        if not password:
+        if not features.length:
             return 0.0
-        
-        char_count = {}
-        for char in password:
-            if char in char_count:
-                char_count[char] += 1
-            else:
-                char_count[char] = 1
                 
+        return self._entropy_from_counts(features.histogram, features.length)
+    
+    def _entropy_from_counts(self, char_count: Dict[str, int], length: int) -> float:
+        """Calculate total Shannon entropy from a character histogram"""
         entropy = 0.0
-        length = len(password)
         for count in char_count.values():
             probability = count / length
             entropy -= probability * math.log2(probability)
@@ -75,82 +201,36 @@ class PasswordAnalyzer:
     
     def _detect_patterns(self, password: str) -> List[str]:
         """Detect common patterns in the password"""
-        patterns = []
+        return self.pattern_detector.detect(password)
+    
+    def _find_pattern_matches(self, password: str) -> List[PatternMatch]:
+        """Find every pattern occurrence in the password, with its span"""
+        return self.pattern_detector.find_matches(password)
+    
+    def _estimate_crack_time(self, features: PasswordFeatures) -> Tuple[float, str]:
+        """Estimate time to crack based on complexity and detected patterns
         
-        # Check for sequential characters
-        if any(str(i) + str(i+1) + str(i+2) in password for i in range(8)):
-            patterns.append("sequential_numbers")
-            
-        # Check for repeated characters
-        if re.search(r'(.)\1{2,}', password):
-            patterns.append("repeated_characters")
-            
-        # Check for keyboard patterns (simplified)
-        keyboard_patterns = ["qwerty", "asdfgh", "zxcvbn"]
-        if any(pattern in password.lower() for pattern in keyboard_patterns):
-            patterns.append("keyboard_pattern")
-            
-        # Check for common words
-        if any(word in password.lower() for word in self.common_words):
-            patterns.append("common_word")
-            
-        # Check for date patterns
-        if re.search(r'19\d{2}|20\d{2}', password):
-            patterns.append("year")
-        if re.search(r'(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])', password):
-            patterns.append("date")
-            
-        return patterns
+        The pattern-aware guess estimate (see models/guesses.py) covers the
+        password with its cheapest mix of patterns and brute-forced characters.
+        """
+        log10_guesses = self.guess_estimator.log10_guesses(
+            features.password,
+            features.char_set_size,
+            features.pattern_spans
+        )
+        return self._crack_time_from_seconds(seconds_from_log10_guesses(log10_guesses))
     
-    def _estimate_crack_time(self, password: str, patterns: List[str]) -> Tuple[float, str]:
-        """Estimate time to crack based on complexity and detected patterns"""
-        length = len(password)
-        has_upper = any(c.isupper() for c in password)
-        has_lower = any(c.islower() for c in password)
-        has_digit = any(c.isdigit() for c in password)
-        has_special = any(not c.isalnum() for c in password)
-        
-        # Calculate character set size
-        char_set_size = 0
-        if has_lower: char_set_size += 26
-        if has_upper: char_set_size += 26
-        if has_digit: char_set_size += 10
-        if has_special: char_set_size += 33  # Common special characters
-        
-        # Base calculation (brute force approach)
-        combinations = char_set_size ** length
-        
-        # Adjust for patterns (each pattern reduces security)
-        pattern_penalty = 1.0
-        for pattern in patterns:
-            pattern_penalty *= 0.7  # Reduce by 30% for each pattern
-            
-        # Adjust combinations based on patterns
-        adjusted_combinations = combinations * pattern_penalty
-        
-        # Assuming 10 billion attempts per second for a powerful attacker
-        seconds_to_crack = adjusted_combinations / (10 * 10**9)
-        
-        # Format the time in human readable format
-        if seconds_to_crack < 60:
-            time_str = f"{seconds_to_crack:.2f} seconds"
-        elif seconds_to_crack < 3600:
-            time_str = f"{seconds_to_crack/60:.2f} minutes"
-        elif seconds_to_crack < 86400:
-            time_str = f"{seconds_to_crack/3600:.2f} hours"
-        elif seconds_to_crack < 31536000:
-            time_str = f"{seconds_to_crack/86400:.2f} days"
-        elif seconds_to_crack < 31536000*100:
-            time_str = f"{seconds_to_crack/31536000:.2f} years"
-        else:
-            time_str = "centuries"
-            
-        return seconds_to_crack, time_str
+    def _crack_time_from_seconds(self, seconds_to_crack: float) -> Tuple[float, str]:
+        """Pair a time to crack with its human readable form"""
+        return seconds_to_crack, scoring.format_crack_time(seconds_to_crack)
     
-    def _determine_attack_vector(self, patterns: List[str], is_leaked: bool) -> str:
+    def _determine_attack_vector(self, patterns: List[str], is_leaked: bool,
+                                 is_leaked_variant: bool = False) -> str:
         """Determine the most likely successful attack vector"""
         if is_leaked:
             return "credential stuffing (using leaked passwords)"
+        elif is_leaked_variant:
+            return "rule-based attack (mangled leaked passwords)"
         elif "common_word" in patterns:
             return "dictionary attack"
         elif any(p in patterns for p in ["sequential_numbers", "keyboard_pattern", "year", "date"]):
@@ -160,22 +240,23 @@ class PasswordAnalyzer:
         else:
             return "brute force attack"
     
-    def _generate_suggestions(self, password: str, patterns: List[str]) -> List[str]:
+    def _generate_suggestions(self, features: PasswordFeatures) -> List[str]:
         """Generate improvement suggestions based on detected issues"""
         suggestions = []
+        patterns = features.patterns
         
         # Add length suggestion if too short
-        if len(password) < 12:
+        if features.length < 12:
             suggestions.append("Increase password length to at least 12 characters")
             
         # Suggest character diversity
-        if not any(c.isupper() for c in password):
+        if not features.has_upper:
             suggestions.append("Add uppercase letters")
-        if not any(c.islower() for c in password):
+        if not features.has_lower:
             suggestions.append("Add lowercase letters")
-        if not any(c.isdigit() for c in password):
+        if not features.has_digit:
             suggestions.append("Add numeric digits")
-        if not any(not c.isalnum() for c in password):
+        if not features.has_special:
             suggestions.append("Add special characters (!@#$%^&*)")
             
         # Suggest mitigations for detected patterns
@@ -191,18 +272,19 @@ class PasswordAnalyzer:
             suggestions.append("Avoid using dates, especially birth years")
             
         # Add a concrete example of improved password
-        improved = self._generate_improved_version(password, patterns)
+        improved = self._generate_improved_version(features)
         if improved:
             suggestions.append(f"Consider something like: {improved}")
             
         return suggestions
     
-    def _generate_improved_version(self, password: str, patterns: List[str]) -> str:
+    def _generate_improved_version(self, features: PasswordFeatures) -> str:
         """Generate an improved version of the password"""
         # This would be handled by the GenAI component in a real implementation
         # For now, implement a simple transformation
+        password = features.password
         
-        if len(password) < 8:
+        if features.length < 8:
             # Too short to work with
             return "P@$$w0rd!" + password
             
@@ -210,18 +292,21 @@ class PasswordAnalyzer:
         improved = password
         
         # Add complexity
-        improved = improved.replace('a', '@').replace('e', '3').replace('i', '!').replace('o', '0')
+        improved = improved.translate(_IMPROVEMENT_TABLE)
+        
+        # The substitutions only add symbols for a and i and digits for e and o,
+        # so the classes of the improved version follow from the password's own
         
         # Add special characters if none
-        if not any(not c.isalnum() for c in improved):
+        if not (features.has_special or 'a' in password or 'i' in password):
             improved += '#$*'
             
         # Add uppercase if none
-        if not any(c.isupper() for c in improved):
+        if not features.has_upper:
             improved = improved[0].upper() + improved[1:]
             
         # Add digit if none
-        if not any(c.isdigit() for c in improved):
+        if not (features.has_digit or 'e' in password or 'o' in password):
             improved += '2024'
             
         # Ensure it's different from original
@@ -230,59 +315,228 @@ class PasswordAnalyzer:
             
         return improved
         
-    def analyze_password(self, password: str) -> PasswordStrengthResult:
-        """Analyze password strength and return comprehensive results"""
+    def _empty_result(self) -> PasswordStrengthResult:
+        """Result returned for an empty password"""
+        return PasswordStrengthResult(
+            score=0,
+            time_to_crack="instant",
+            time_to_crack_seconds=0,
+            vulnerability_factors=["Empty password"],
+            suggestions=["Create a password"],
+            patterns_detected=[],
+            entropy=0,
+            is_compromised=False,
+            attack_vector="instant guess"
+        )
+        
+    def analyze_password(self, password: str, include_suggestions: bool = True,
+                         features: Optional[PasswordFeatures] = None,
+                         include_ml_strength: bool = True) -> PasswordStrengthResult:
+        """Analyze password strength and return comprehensive results
+        
+        With a result cache configured, repeated calls for the same password
+        return the same (shared) result object, so callers must not mutate it.
+        Pass `features` from extract_features() when other components need them too.
+        Callers that don't show suggestions or ml_strength can skip computing them.
+        """
         # Check for empty password
         if not password:
-            return PasswordStrengthResult(
-                score=0,
-                time_to_crack="instant",
-                time_to_crack_seconds=0,
-                vulnerability_factors=["Empty password"],
-                suggestions=["Create a password"],
-                patterns_detected=[],
-                entropy=0,
-                is_compromised=False,
-                attack_vector="instant guess"
-            )
+            return self._empty_result()
             
-        # Calculate entropy
-        entropy = self._calculate_entropy(password)
+        timer = stage_timer(self.metrics, "analyzer")
+        cache_key = None
+        if self.result_cache is not None:
+            variant = "full" if include_suggestions else "lite"
+            if not include_ml_strength:
+                variant += ":no-ml"
+            # Results from before an ingest or rebuild of the leak index are not reused
+            variant += ":" + self.leak_index.build_id
+            cache_key = self.result_cache.key_for(password, variant)
+            cached = self.result_cache.get(cache_key, complete=lambda shared: self._complete_shared_result(
+                shared, password, include_suggestions, features))
+            if timer is not None:
+                timer.lap("cache_lookup")
+            if cached is not None:
+                return cached
+            
+        # Detect patterns (extract_features times itself)
+        if features is None:
+            features = self.extract_features(password)
+            if timer is not None:
+                timer.skip()
         
-        # Detect patterns
-        patterns = self._detect_patterns(password)
+        is_compromised, is_leaked_variant = self.leak_status(password)
+        if timer is not None:
+            timer.lap("leak_check")
+            self.metrics.leak_checks.inc("leaked" if is_compromised else "variant" if is_leaked_variant else "clean")
         
-        # Check if password is compromised
-        is_compromised = self._hash_password(password) in self.leaked_passwords_hash_set
+        result = self._build_result(features, is_compromised, include_suggestions, timer=timer,
+                                    include_ml_strength=include_ml_strength, is_leaked_variant=is_leaked_variant)
+        if cache_key is not None:
+            self.result_cache.set(cache_key, result)
+        return result
+    
+    def _complete_shared_result(self, result: PasswordStrengthResult, password: str, include_suggestions: bool,
+                                features: Optional[PasswordFeatures] = None) -> PasswordStrengthResult:
+        """Fill in the suggestions of a result fetched from a shared cache, which never holds them"""
+        if include_suggestions:
+            suggestions = self._generate_suggestions(features or self.extract_features(password))
+        else:
+            suggestions = []
+        return replace(result, suggestions=suggestions)
+    
+    def analyze_many(self, passwords: Iterable[str], include_suggestions: bool = False,
+                     batch_size: int = 1024, include_ml_strength: bool = True) -> Iterator[PasswordStrengthResult]:
+        """Analyze an iterable of passwords, yielding results in input order
+        
+        Passwords are consumed in batches so that hashing, the leak lookup and
+        pattern detection each run as one pass over the distinct passwords of a
+        batch. Suggestions are skipped by default since bulk audits rarely need them.
+        """
+        batch = []
+        for password in passwords:
+            batch.append(password)
+            if len(batch) >= batch_size:
+                yield from self._analyze_batch(batch, include_suggestions, include_ml_strength)
+                batch = []
+        if batch:
+            yield from self._analyze_batch(batch, include_suggestions, include_ml_strength)
+    
+    def _analyze_batch(self, batch: List[str], include_suggestions: bool,
+                       include_ml_strength: bool = True) -> List[PasswordStrengthResult]:
+        """Analyze one batch of passwords, sharing work between duplicates"""
+        timer = stage_timer(self.metrics, "analyzer_batch")
+        # Credential dumps are full of repeats, so only analyze each value once
+        distinct = [pwd for pwd in dict.fromkeys(batch) if pwd]
+        
+        # One hashing pass and a single set intersection for the leak check
+        hashes = {pwd: self._hash_password(pwd) for pwd in distinct}
+        leaked_hashes = self.leak_index.contains_many(hashes.values())
+        leaked_variants = self._find_leaked_variants(pwd for pwd in distinct if hashes[pwd] not in leaked_hashes)
+        if timer is not None:
+            timer.lap("leak_check")
+            leaked_count = sum(hashes[pwd] in leaked_hashes for pwd in distinct)
+            self.metrics.leak_checks.inc("leaked", amount=leaked_count)
+            self.metrics.leak_checks.inc("variant", amount=len(leaked_variants))
+            self.metrics.leak_checks.inc("clean", amount=len(distinct) - leaked_count - len(leaked_variants))
+        
+        # One pattern-scan pass
+        features = {pwd: PasswordFeatures.from_password(pwd, self.pattern_detector) for pwd in distinct}
+        if timer is not None:
+            timer.lap("pattern_detection")
+        
+        # Entropy and crack-time math for the whole batch as array operations;
+        # very long passwords would widen every row, so they take the scalar path
+        vector_rows = [pwd for pwd in distinct if len(pwd) <= vectorized.MAX_VECTOR_LENGTH] if vectorized is not None else []
+        numeric = {}
+        if vector_rows:
+            scores = vectorized.score_batch(
+                vector_rows,
+                [len(features[pwd].patterns) for pwd in vector_rows],
+                [hashes[pwd] in leaked_hashes for pwd in vector_rows],
+                [pwd in leaked_variants for pwd in vector_rows]
+            )
+            # The arrays hold brute-force times; patterned passwords go through the guess estimator
+            for pwd, entropy, crack_time in zip(vector_rows, scores["entropy"].tolist(),
+                                                zip(scores["crack_seconds"].tolist(),
+                                                    vectorized.format_crack_times(scores["crack_seconds"]))):
+                numeric[pwd] = entropy, self._estimate_crack_time(features[pwd]) if features[pwd].patterns else crack_time
+        for pwd in distinct:
+            if pwd not in numeric:
+                numeric[pwd] = self._calculate_entropy(features[pwd]), self._estimate_crack_time(features[pwd])
+        entropies = [numeric[pwd][0] for pwd in distinct]
+        crack_times = [numeric[pwd][1] for pwd in distinct]
+        if timer is not None:
+            timer.lap("entropy_and_crack_time")
+        
+        # One predict_proba call for the whole batch
+        ml_strengths = [None] * len(distinct)
+        if include_ml_strength and self.ml_model is not None and distinct:
+            rows = [feature_vector(features[pwd], entropy, crack_time[0])
+                    for pwd, entropy, crack_time in zip(distinct, entropies, crack_times)]
+            ml_strengths = [self.ml_model.strength(p) for p in self.ml_model.predict_proba(rows)]
+            if timer is not None:
+                timer.lap("ml_model")
+        
+        results = {
+            pwd: self._build_result(features[pwd], hashes[pwd] in leaked_hashes, include_suggestions,
+                                    entropy=entropy, crack_time=crack_time, ml_strength=ml_strength,
+                                    include_ml_strength=include_ml_strength,
+                                    is_leaked_variant=pwd in leaked_variants)
+            for pwd, entropy, crack_time, ml_strength in zip(distinct, entropies, crack_times, ml_strengths)
+        }
+        if timer is not None:
+            timer.lap("results")
+        empty = self._empty_result()
+        return [results[pwd] if pwd else empty for pwd in batch]
+    
+    def _build_result(self, features: PasswordFeatures, is_compromised: bool,
+                      include_suggestions: bool = True, entropy: Optional[float] = None,
+                      crack_time: Optional[Tuple[float, str]] = None,
+                      ml_strength: Optional[float] = None, timer=None,
+                      include_ml_strength: bool = True,
+                      is_leaked_variant: bool = False) -> PasswordStrengthResult:
+        """Assemble the analysis result once features and leak status are known
+        
+        Callers that track entropy or crack time incrementally, or score
+        batches with the ML model, may pass them in. `timer` is the caller's
+        StageTimer, if it is timing stages.
+        """
+        patterns = list(features.patterns)
+        
+        # Calculate entropy
+        if entropy is None:
+            entropy = self._calculate_entropy(features)
+            if timer is not None:
+                timer.lap("entropy")
         
         # Estimate crack time
-        time_to_crack_seconds, time_to_crack = self._estimate_crack_time(password, patterns)
+        if crack_time is None:
+            crack_time = self._estimate_crack_time(features)
+            if timer is not None:
+                timer.lap("crack_time")
+        time_to_crack_seconds, time_to_crack = crack_time
+        
+        # Score with the ML model, if one is loaded
+        if include_ml_strength and ml_strength is None and self.ml_model is not None:
+            ml_strength = self.ml_model.strength(self.ml_model.predict_proba_one(
+                feature_vector(features, entropy, time_to_crack_seconds)))
+            if timer is not None:
+                timer.lap("ml_model")
         
         # Determine likely attack vector
-        attack_vector = self._determine_attack_vector(patterns, is_compromised)
+        attack_vector = self._determine_attack_vector(patterns, is_compromised, is_leaked_variant)
         
         # Generate vulnerability factors
         vulnerability_factors = []
         if is_compromised:
             vulnerability_factors.append("Password found in leaked database")
-        if len(password) < 8:
+        elif is_leaked_variant:
+            vulnerability_factors.append("Password is a simple variant of a leaked password")
+        if features.length < 8:
             vulnerability_factors.append("Password too short")
         if patterns:
             for pattern in patterns:
                 vulnerability_factors.append(f"Contains {pattern.replace('_', ' ')}")
             
         # Generate improvement suggestions
-        suggestions = self._generate_suggestions(password, patterns)
+        if timer is not None:
+            timer.skip()
+        suggestions = self._generate_suggestions(features) if include_suggestions else []
+        if timer is not None and include_suggestions:
+            timer.lap("suggestions")
         
         # Calculate overall score (0-100)
-        base_score = min(100, max(0, entropy * 5))  # Base on entropy
+        base_score = min(100, max(0, entropy * self.ENTROPY_SCORE_WEIGHT))  # Base on entropy
         
         # Adjust score based on other factors
         if is_compromised:
-            base_score *= 0.2  # Severely reduce score if compromised
+            base_score *= self.COMPROMISED_SCORE_FACTOR  # Severely reduce score if compromised
+        elif is_leaked_variant:
+            base_score *= self.LEAKED_VARIANT_SCORE_FACTOR
         
         # Adjust for patterns
-        pattern_penalty = max(0, 1.0 - (len(patterns) * 0.15))
+        pattern_penalty = max(0, 1.0 - (len(patterns) * self.PATTERN_PENALTY))
         score = int(base_score * pattern_penalty)
         
         # Return comprehensive results
@@ -295,5 +549,7 @@ class PasswordAnalyzer:
             patterns_detected=patterns,
             entropy=entropy,
             is_compromised=is_compromised,
-            attack_vector=attack_vector
-        )
\ No newline at end of file
+            attack_vector=attack_vector,
+            ml_strength=ml_strength,
+            is_leaked_variant=is_leaked_variant
+        )
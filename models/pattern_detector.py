@@ -0,0 +1,187 @@
+# Pattern Detector - Single-pass pattern scanning for PasswordAnalyzer
+# Dictionary words come from a compact DAWG, keyboard walks and sequences share
+# one Aho-Corasick automaton, and the remaining patterns share one regex
+
+from collections import deque
+from dataclasses import dataclass
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from models.wordlist import CompactDawg
+
+# Order in which pattern labels are reported, matching the original checks
+PATTERN_ORDER = ["sequential_numbers", "repeated_characters", "keyboard_pattern",
+                 "common_word", "year", "date"]
+
+KEYBOARD_PATTERNS = ["qwerty", "asdfgh", "zxcvbn"]
+SEQUENTIAL_NUMBERS = [str(i) + str(i + 1) + str(i + 2) for i in range(8)]
+
+# The leading lookahead only lets the regex stop at positions where a year or
+# date starts; the optional lookaheads after it then capture each kind of match
+# starting there, so overlapping matches (a year inside a date) are all
+# reported in a single left-to-right pass. Every lookahead has a fixed length.
+_STRUCTURAL_PATTERNS = re.compile(
+    r"(?=19\d{2}|20\d{2}|(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01]))"
+    r"(?=(?P<year>19\d{2}|20\d{2}))?"
+    r"(?=(?P<date>(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])))?"
+)
+_STRUCTURAL_LABELS = ["year", "date"]
+
+# Runs of three or more of one character. Matches don't overlap, so each run
+# is scanned once and reported once, at its full length; inside a lookahead
+# tried at every offset, a run of n would cost O(n^2)
+_REPEATED_RUN = re.compile(r"(.)\1{2,}")
+
+
+@dataclass
+class PatternMatch:
+    """A pattern found in a password, with its [start, end) span"""
+    pattern: str  # Pattern label, one of PATTERN_ORDER
+    start: int
+    end: int
+    token: str  # The matched slice of the password
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton mapping literal strings to pattern labels"""
+
+    def __init__(self, literals: Iterable[Tuple[str, str]]):
+        """Compile (literal, label) pairs into an automaton"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Tuple[int, str], ...]] = [()]
+
+        for literal, label in literals:
+            if literal:
+                self._add(literal, label)
+        self._link()
+
+    def _add(self, literal: str, label: str):
+        """Insert one literal into the trie"""
+        state = 0
+        for char in literal:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        if (len(literal), label) not in self._out[state]:
+            self._out[state] += ((len(literal), label),)
+
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def step(self, state: int, char: str) -> Tuple[int, Tuple[Tuple[int, str], ...]]:
+        """Advance from `state` by one character; return the new state and its (length, label) outputs"""
+        goto, fail = self._goto, self._fail
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        return state, self._out[state]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, str]]:
+        """Yield (start, end, label) for every literal occurrence in `text`"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, label in out[state]:
+                yield index + 1 - length, index + 1, label
+
+
+class PatternDetector:
+    """Scans a password once for every pattern PasswordAnalyzer reports
+
+    Dictionary words are matched case-insensitively against the DAWG, keyboard
+    walks and digit sequences by one Aho-Corasick automaton, and repeats,
+    years and dates by one combined regex.
+    """
+
+    def __init__(self, dictionary: CompactDawg, keyboard_patterns: Iterable[str] = KEYBOARD_PATTERNS,
+                 sequences: Iterable[str] = SEQUENTIAL_NUMBERS):
+        """Compile the literal patterns into the automaton"""
+        self.dictionary = dictionary
+        literals = [(pattern, "keyboard_pattern") for pattern in keyboard_patterns]
+        literals += [(sequence, "sequential_numbers") for sequence in sequences]
+        self.automaton = AhoCorasick(literals)
+
+    def _iter_literal_matches(self, lowered: str) -> Iterable[Tuple[int, int, str]]:
+        """Yield (start, end, label) for dictionary words and literal patterns"""
+        for start, end in self.dictionary.find_all(lowered):
+            yield start, end, "common_word"
+        yield from self.automaton.iter_matches(lowered)
+
+    def find_spans(self, password: str) -> List[Tuple[int, int, str]]:
+        """Return (start, end, label) for every pattern occurrence, ordered by start position"""
+        lowered = password.lower()
+        if len(lowered) == len(password):
+            spans = list(self._iter_literal_matches(lowered))
+        else:
+            # Some characters lowercase to several (e.g. 'İ'), so map spans back
+            origins = [index for index, char in enumerate(password) for _ in char.lower()]
+            spans = [(origins[start], origins[end - 1] + 1, label)
+                     for start, end, label in self._iter_literal_matches(lowered)]
+
+        spans.extend((*found.span(), "repeated_characters") for found in _REPEATED_RUN.finditer(password))
+        for found in _STRUCTURAL_PATTERNS.finditer(password):
+            for label in _STRUCTURAL_LABELS:
+                start, end = found.span(label)
+                if start >= 0:
+                    spans.append((start, end, label))
+
+        spans.sort(key=lambda span: (span[0], span[1]))
+        return spans
+
+    def find_matches(self, password: str) -> List[PatternMatch]:
+        """Return every pattern occurrence in the password, ordered by start position"""
+        return [PatternMatch(label, start, end, password[start:end])
+                for start, end, label in self.find_spans(password)]
+
+    @staticmethod
+    def span_labels(spans: Iterable[Tuple[int, int, str]]) -> List[str]:
+        """Collapse (start, end, label) spans into the distinct labels, in reporting order"""
+        found = {label for _, _, label in spans}
+        return [label for label in PATTERN_ORDER if label in found]
+
+    @staticmethod
+    def labels(matches: Iterable[PatternMatch]) -> List[str]:
+        """Collapse matches into the distinct pattern labels, in reporting order"""
+        found = {match.pattern for match in matches}
+        return [label for label in PATTERN_ORDER if label in found]
+
+    def detect(self, password: str) -> List[str]:
+        """Return the distinct pattern labels found in the password
+
+        Same scan as find_matches, but skips building spans when only the
+        labels are needed.
+        """
+        lowered = password.lower()
+        found = {label for _, _, label in self.automaton.iter_matches(lowered)}
+        if next(self.dictionary.find_all(lowered), None) is not None:
+            found.add("common_word")
+        if _REPEATED_RUN.search(password) is not None:
+            found.add("repeated_characters")
+        for match in _STRUCTURAL_PATTERNS.finditer(password):
+            for label in _STRUCTURAL_LABELS:
+                if match.start(label) >= 0:
+                    found.add(label)
+        return [label for label in PATTERN_ORDER if label in found]
@@ -0,0 +1,413 @@
+# Password Policy - Declarative per-tenant password rules compiled into a check plan
+# Rules run cheapest first and stop at the first failure, so most rejections
+# never reach the leak lookup or the pattern scan
+
+import argparse
+from dataclasses import dataclass, field
+import json
+import re
+import sys
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from models.features import PasswordFeatures, character_classes
+from models.pattern_detector import PATTERN_ORDER
+
+CHARACTER_CLASSES = ("upper", "lower", "digit", "special")
+
+
+@dataclass
+class Violation:
+    """One rule a password breaks"""
+    rule: str  # Name of the failed step, such as "length" or "reject_leaked"
+    message: str
+
+
+@dataclass
+class PolicyResult:
+    """Outcome of checking one password against a policy"""
+    compliant: bool
+    violations: List[Violation] = field(default_factory=list)
+    checks_run: int = 0  # Rules evaluated before the plan stopped
+
+
+class _Candidate:
+    """A password under evaluation
+
+    The analyzer's work (features, leak status, crack time) is done when the
+    first rule needs it and then shared with every later rule.
+    """
+    __slots__ = ("password", "analyzer", "_classes", "_features", "_is_compromised", "_is_leaked_variant",
+                 "_crack_time")
+
+    def __init__(self, password: str, analyzer):
+        self.password = password
+        self.analyzer = analyzer
+        self._classes = None
+        self._features = None
+        self._is_compromised = None
+        self._is_leaked_variant = None
+        self._crack_time = None
+
+    @property
+    def classes(self) -> Tuple[bool, bool, bool, bool]:
+        """(upper, lower, digit, special), without running the pattern scan"""
+        if self._classes is None:
+            self._classes = character_classes(self.password)
+        return self._classes
+
+    @property
+    def features(self) -> PasswordFeatures:
+        if self._features is None:
+            self._features = self.analyzer.extract_features(self.password)
+        return self._features
+
+    @property
+    def is_compromised(self) -> bool:
+        if self._is_compromised is None:
+            analyzer = self.analyzer
+            self._is_compromised = analyzer.leak_index.contains(analyzer._hash_password(self.password))
+        return self._is_compromised
+
+    @property
+    def is_leaked_variant(self) -> bool:
+        if self._is_leaked_variant is None:
+            self._is_leaked_variant = (not self.is_compromised and
+                                       bool(self.analyzer._find_leaked_variants([self.password])))
+        return self._is_leaked_variant
+
+    @property
+    def crack_time(self) -> Tuple[float, str]:
+        if self._crack_time is None:
+            self._crack_time = self.analyzer._estimate_crack_time(self.features)
+        return self._crack_time
+
+
+def _prefetch_leak_status(candidates: List[_Candidate], analyzer):
+    """Look up every candidate's digest in one contains_many call"""
+    digests = [analyzer._hash_password(candidate.password) for candidate in candidates]
+    leaked = analyzer.leak_index.contains_many(digests)
+    for candidate, digest in zip(candidates, digests):
+        candidate._is_compromised = digest in leaked
+
+
+def _prefetch_leaked_variants(candidates: List[_Candidate], analyzer):
+    """Look up the variants of every candidate that isn't leaked itself in one call"""
+    _prefetch_leak_status([candidate for candidate in candidates if candidate._is_compromised is None], analyzer)
+    clean = [candidate for candidate in candidates if not candidate._is_compromised]
+    variants = analyzer._find_leaked_variants(candidate.password for candidate in clean)
+    for candidate in candidates:
+        candidate._is_leaked_variant = not candidate._is_compromised and candidate.password in variants
+
+
+@dataclass
+class _Step:
+    """One compiled rule: returns a violation message, or None if the password passes"""
+    rule: str
+    cost: int
+    check: Callable[[_Candidate], Optional[str]]
+    # Batch hook that fills in what `check` needs for many candidates at once
+    prefetch: Optional[Callable[[List[_Candidate], object], None]] = None
+
+
+def _require_int(spec: Mapping, key: str, minimum: int = 0) -> int:
+    value = spec[key]
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+        raise ValueError(f"{key} must be an integer of at least {minimum}")
+    return value
+
+
+def _require_number(spec: Mapping, key: str) -> float:
+    value = spec[key]
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+        raise ValueError(f"{key} must be a non-negative number")
+    return value
+
+
+def _require_bool(spec: Mapping, key: str) -> bool:
+    value = spec.get(key, False)
+    if not isinstance(value, bool):
+        raise ValueError(f"{key} must be true or false")
+    return value
+
+
+def _require_strings(spec: Mapping, key: str, allowed: Optional[Iterable[str]] = None) -> List[str]:
+    values = spec[key]
+    if not isinstance(values, list) or not all(isinstance(value, str) and value for value in values):
+        raise ValueError(f"{key} must be a list of non-empty strings")
+    if allowed is not None:
+        unknown = sorted(set(values).difference(allowed))
+        if unknown:
+            raise ValueError(f"{key} has unknown values {unknown}; expected some of {list(allowed)}")
+    return values
+
+
+# Each builder validates its keys and returns the compiled step, or None if the
+# policy doesn't constrain it. Costs order the plan: string methods first, then
+# regex scans, the leak lookup, the pattern scan and finally the guess estimate.
+
+def _length_step(spec: Mapping) -> Optional[_Step]:
+    minimum = _require_int(spec, "min_length") if "min_length" in spec else 0
+    maximum = _require_int(spec, "max_length", 1) if "max_length" in spec else None
+    if maximum is not None and maximum < minimum:
+        raise ValueError("max_length must not be less than min_length")
+    if not minimum and maximum is None:
+        return None
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        length = len(candidate.password)
+        if length < minimum:
+            return f"Must be at least {minimum} characters long"
+        if maximum is not None and length > maximum:
+            return f"Must be at most {maximum} characters long"
+        return None
+    return _Step("length", 0, check)
+
+
+def _classes_step(spec: Mapping) -> Optional[_Step]:
+    required = _require_strings(spec, "required_classes", CHARACTER_CLASSES) if "required_classes" in spec else []
+    min_classes = _require_int(spec, "min_classes") if "min_classes" in spec else 0
+    if min_classes > len(CHARACTER_CLASSES):
+        raise ValueError(f"min_classes must be at most {len(CHARACTER_CLASSES)}")
+    if not required and not min_classes:
+        return None
+    required_indexes = [(CHARACTER_CLASSES.index(name), name) for name in required]
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        classes = candidate.classes
+        missing = [name for index, name in required_indexes if not classes[index]]
+        if missing:
+            return f"Must contain {', '.join(missing)} characters"
+        if sum(classes) < min_classes:
+            return f"Must contain at least {min_classes} of: uppercase, lowercase, digit, special characters"
+        return None
+    return _Step("character_classes", 1, check)
+
+
+def _repeats_step(spec: Mapping) -> Optional[_Step]:
+    if "max_repeats" not in spec:
+        return None
+    max_repeats = _require_int(spec, "max_repeats", 1)
+    run = re.compile(r"(.)\1{%d}" % max_repeats, re.DOTALL)
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        if run.search(candidate.password):
+            return f"Must not repeat a character more than {max_repeats} times in a row"
+        return None
+    return _Step("max_repeats", 2, check)
+
+
+def _banned_words_step(spec: Mapping) -> Optional[_Step]:
+    if "banned_words" not in spec:
+        return None
+    words = sorted({word.lower() for word in _require_strings(spec, "banned_words")}, key=len, reverse=True)
+    if not words:
+        return None
+    # One alternation, longest first, so the regex engine scans the password once
+    banned = re.compile("|".join(re.escape(word) for word in words))
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        match = banned.search(candidate.password.lower())
+        if match:
+            return f"Must not contain the banned word '{match.group()}'"
+        return None
+    return _Step("banned_words", 3, check)
+
+
+def _leak_step(spec: Mapping) -> Optional[_Step]:
+    # Rejecting variants of leaked passwords implies rejecting the leaked ones
+    if not (_require_bool(spec, "reject_leaked") or _require_bool(spec, "reject_leaked_variants")):
+        return None
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        if candidate.is_compromised:
+            return "Must not appear in a known password leak"
+        return None
+    return _Step("reject_leaked", 10, check, _prefetch_leak_status)
+
+
+def _leaked_variants_step(spec: Mapping) -> Optional[_Step]:
+    if not _require_bool(spec, "reject_leaked_variants"):
+        return None
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        if candidate.is_leaked_variant:
+            return "Must not be a simple variant of a leaked password"
+        return None
+    return _Step("reject_leaked_variants", 11, check, _prefetch_leaked_variants)
+
+
+def _patterns_step(spec: Mapping) -> Optional[_Step]:
+    if "banned_patterns" not in spec:
+        return None
+    banned = [label for label in PATTERN_ORDER if label in _require_strings(spec, "banned_patterns", PATTERN_ORDER)]
+    if not banned:
+        return None
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        found = [label for label in banned if label in candidate.features.patterns]
+        if found:
+            return f"Must not contain {', '.join(label.replace('_', ' ') for label in found)}"
+        return None
+    return _Step("banned_patterns", 20, check)
+
+
+def _crack_time_step(spec: Mapping) -> Optional[_Step]:
+    if "min_crack_seconds" not in spec:
+        return None
+    minimum = _require_number(spec, "min_crack_seconds")
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        seconds, _ = candidate.crack_time
+        if seconds < minimum:
+            _, readable = candidate.analyzer._crack_time_from_seconds(minimum)
+            return f"Must take at least {readable} to crack"
+        return None
+    return _Step("min_crack_seconds", 30, check)
+
+
+def _score_step(spec: Mapping) -> Optional[_Step]:
+    if "min_score" not in spec:
+        return None
+    minimum = _require_int(spec, "min_score")
+
+    def check(candidate: _Candidate) -> Optional[str]:
+        result = candidate.analyzer._build_result(
+            candidate.features, candidate.is_compromised, include_suggestions=False,
+            crack_time=candidate.crack_time, include_ml_strength=False,
+            is_leaked_variant=candidate.is_leaked_variant)
+        if result.score < minimum:
+            return f"Must score at least {minimum} (scores {result.score})"
+        return None
+    return _Step("min_score", 40, check)
+
+
+_STEP_BUILDERS = (_length_step, _classes_step, _repeats_step, _banned_words_step, _leak_step,
+                  _leaked_variants_step, _patterns_step, _crack_time_step, _score_step)
+
+POLICY_KEYS = frozenset({"min_length", "max_length", "required_classes", "min_classes", "max_repeats",
+                         "banned_words", "reject_leaked", "reject_leaked_variants", "banned_patterns",
+                         "min_crack_seconds", "min_score"})
+
+
+class PasswordPolicy:
+    """A policy specification compiled into a plan of checks, cheapest first
+
+    A specification is a JSON object with any of POLICY_KEYS, for example
+    {"min_length": 12, "min_classes": 3, "banned_words": ["acme"], "reject_leaked": true}.
+    Invalid specifications raise ValueError when compiled.
+    """
+
+    def __init__(self, spec: Mapping, name: Optional[str] = None):
+        if not isinstance(spec, Mapping):
+            raise ValueError("A policy must be a JSON object")
+        unknown = sorted(set(spec).difference(POLICY_KEYS))
+        if unknown:
+            raise ValueError(f"Unknown policy keys {unknown}; expected some of {sorted(POLICY_KEYS)}")
+        self.name = name
+        self.spec = dict(spec)
+        steps = [step for step in (builder(spec) for builder in _STEP_BUILDERS) if step is not None]
+        self.plan: Tuple[_Step, ...] = tuple(sorted(steps, key=lambda step: step.cost))
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name or ''} plan={[step.rule for step in self.plan]}>"
+
+    def check(self, password: str, analyzer, fail_fast: bool = True) -> PolicyResult:
+        """Check one password, stopping at the first violation unless `fail_fast` is False"""
+        candidate = _Candidate(password, analyzer)
+        result = PolicyResult(compliant=True)
+        for step in self.plan:
+            result.checks_run += 1
+            message = step.check(candidate)
+            if message is not None:
+                result.compliant = False
+                result.violations.append(Violation(step.rule, message))
+                if fail_fast:
+                    break
+        return result
+
+    def check_many(self, passwords: Iterable[str], analyzer, fail_fast: bool = True) -> List[PolicyResult]:
+        """Check many passwords, returning results in input order
+
+        The plan runs one step at a time over the passwords that haven't
+        failed yet, so the leak lookup is one contains_many call for the
+        survivors of the cheaper rules. Duplicates are checked once.
+        """
+        passwords = list(passwords)
+        candidates = {password: _Candidate(password, analyzer) for password in passwords}
+        results = {password: PolicyResult(compliant=True) for password in candidates}
+        active = list(candidates)
+        for step in self.plan:
+            if not active:
+                break
+            if step.prefetch is not None:
+                step.prefetch([candidates[password] for password in active], analyzer)
+            survivors = []
+            for password in active:
+                result = results[password]
+                result.checks_run += 1
+                message = step.check(candidates[password])
+                if message is not None:
+                    result.compliant = False
+                    result.violations.append(Violation(step.rule, message))
+                    if fail_fast:
+                        continue
+                survivors.append(password)
+            active = survivors
+        return [results[password] for password in passwords]
+
+
+def load_policies(path: str) -> Dict[str, PasswordPolicy]:
+    """Compile a JSON file mapping policy (tenant) names to specifications"""
+    with open(path) as handle:
+        specs = json.load(handle)
+    if not isinstance(specs, dict):
+        raise ValueError(f"{path} must contain a JSON object of named policies")
+    policies = {}
+    for name, spec in specs.items():
+        try:
+            policies[name] = PasswordPolicy(spec, name)
+        except ValueError as error:
+            raise ValueError(f"Policy {name!r} in {path}: {error}") from None
+    return policies
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: validate a policy file, or check passwords from stdin against one policy"""
+    parser = argparse.ArgumentParser(description="Validate password policies and check passwords against them")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    validate = subcommands.add_parser("validate", help="compile every policy in a file and print its plan")
+    validate.add_argument("policies", help="JSON file of named policies")
+
+    check = subcommands.add_parser("check", help="check passwords read from stdin, one per line")
+    check.add_argument("policies", help="JSON file of named policies")
+    check.add_argument("name", help="policy to check against")
+    check.add_argument("--leak-db", default=None, help="leak index (default: built-in list)")
+    check.add_argument("--dictionary", default=None, help="common word list or .dawg (default: built-in list)")
+    check.add_argument("--all", action="store_true", help="report every violation, not just the first")
+
+    args = parser.parse_args(argv)
+    policies = load_policies(args.policies)
+    if args.command == "validate":
+        for name, policy in policies.items():
+            print(f"{name}: {' -> '.join(step.rule for step in policy.plan) or '(no rules)'}")
+        return 0
+
+    if args.name not in policies:
+        parser.error(f"no policy named {args.name!r} in {args.policies}")
+    from models.password_analyzer import PasswordAnalyzer
+
+    analyzer = PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=args.leak_db,
+                                common_words_path=args.dictionary)
+    passwords = [line.rstrip("\r\n") for line in sys.stdin]
+    failures = 0
+    for result in policies[args.name].check_many(passwords, analyzer, not args.all):
+        failures += not result.compliant
+        print(json.dumps({"compliant": result.compliant,
+                          "violations": [violation.message for violation in result.violations]}))
+    print(f"{len(passwords) - failures} of {len(passwords)} passwords comply", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
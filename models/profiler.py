@@ -0,0 +1,59 @@
+# Sampling Profiler - Periodic stack samples of one thread, for profiling single requests
+# Output is the collapsed-stack format read by flamegraph.pl and speedscope
+
+import os
+import sys
+import threading
+from typing import Dict, Tuple
+
+DEFAULT_INTERVAL = 0.001
+MAX_STACK_DEPTH = 128
+
+
+class SamplingProfiler:
+    """Samples one thread's call stack every `interval` seconds from a background thread
+
+    Nothing is installed in the profiled thread, so it runs at full speed.
+    The sampler can only run when it holds the GIL, so CPU-bound stretches
+    shorter than the interpreter's switch interval (5 ms by default) may go
+    unsampled. It is meant for the slow requests, not for microbenchmarks.
+    """
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_INTERVAL):
+        """Profile the thread with identifier `thread_id` (threading.get_ident())"""
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Dict[Tuple, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict[Tuple, int]:
+        """Stop sampling and return the sample counts per stack"""
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        samples = self.samples
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                # Keep code objects, not frames, so no locals are kept alive
+                key = tuple(reversed(stack))
+                samples[key] = samples.get(key, 0) + 1
+
+    def collapsed(self) -> str:
+        """Samples as "outer;...;inner count" lines, heaviest first"""
+        lines = []
+        for stack, count in sorted(self.samples.items(), key=lambda item: -item[1]):
+            frames = ";".join(f"{os.path.basename(code.co_filename)}:{code.co_name}" for code in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
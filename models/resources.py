@@ -0,0 +1,81 @@
+# Lazy Resources - Load heavy components on first use, once, from any thread
+# Dictionaries, leak indexes and models are only loaded when a request needs
+# them, or up front by preload() before a server forks its workers
+
+import threading
+import time
+from typing import Callable, Dict, List
+
+
+class LazyResource:
+    """Decorator for a loader method whose result is computed on first access
+
+    The loaded value is stored in the instance's __dict__, where it shadows
+    this descriptor, so later accesses are plain attribute reads. Loading
+    holds the instance's `_resource_lock` (an RLock, since loaders may use
+    other resources) so concurrent first accesses load only once, and records
+    the seconds spent in the loader in the instance's `load_times`.
+    """
+
+    def __init__(self, loader: Callable):
+        self.loader = loader
+        self.name = loader.__name__
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with instance._resource_lock:
+            # Another thread may have finished loading while this one waited
+            if self.name in instance.__dict__:
+                return instance.__dict__[self.name]
+            # Time spent loading other resources this loader uses is
+            # reported under their names, not this one's
+            nested = instance._nested_load_times
+            nested.append(0.0)
+            started = time.perf_counter()
+            try:
+                value = self.loader(instance)
+            finally:
+                elapsed = time.perf_counter() - started
+                own = elapsed - nested.pop()
+                if nested:
+                    nested[-1] += elapsed
+            instance.load_times[self.name] = own
+            instance.__dict__[self.name] = value
+            return value
+
+
+class LazyResources:
+    """Mixin for classes with LazyResource attributes
+
+    Subclasses call LazyResources.__init__ before touching any resource.
+    """
+
+    def __init__(self):
+        self._resource_lock = threading.RLock()
+        self._nested_load_times: List[float] = []
+        self.load_times: Dict[str, float] = {}
+
+    @classmethod
+    def resource_names(cls):
+        """Names of every lazy resource, in definition order"""
+        return [name for klass in reversed(cls.__mro__) for name, value in vars(klass).items()
+                if isinstance(value, LazyResource)]
+
+    def preload(self) -> Dict[str, float]:
+        """Load every resource now and return the seconds each one took to load"""
+        for name in self.resource_names():
+            getattr(self, name)
+        return dict(self.load_times)
+
+    def is_ready(self, *names: str) -> bool:
+        """Whether the named resources (by default, every resource) have been loaded"""
+        return all(name in self.__dict__ for name in names or self.resource_names())
+
+    def after_fork(self):
+        """Replace the loading lock in a forked child, where another thread of the parent may have held it"""
+        self._resource_lock = threading.RLock()
+        self._nested_load_times = []
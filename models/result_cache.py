@@ -0,0 +1,289 @@
+# Analysis Result Cache - LRU + TTL cache in front of PasswordAnalyzer
+# Keys are keyed hashes of the password; an optional Unix-socket server shares
+# entries between worker processes
+
+import argparse
+from collections import OrderedDict
+import dataclasses
+import hashlib
+import hmac
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Wire protocol, one request per round trip on a persistent connection:
+#   request:  op (1 byte, b"G" get / b"S" set) + key (32 bytes) + payload length (uint32) + payload
+#   response: status (1 byte, b"H" hit / b"M" miss / b"K" stored) + payload length (uint32) + payload
+# Set payloads carry a uint32 TTL in seconds followed by the value bytes.
+_KEY_SIZE = 32
+_REQUEST = struct.Struct("<c%dsI" % _KEY_SIZE)
+_RESPONSE = struct.Struct("<cI")
+
+
+class LRUStore:
+    """Bounded, thread-safe mapping with least-recently-used and time-based eviction"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: bytes):
+        """Return the value for `key`, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: bytes, value, ttl_seconds: Optional[float] = None):
+        """Store `value`, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def after_fork(self):
+        """Replace the lock in a forked child, where another thread of the parent may have held it"""
+        self._lock = threading.Lock()
+
+
+class UnixSocketCacheBackend:
+    """Client for a cache server shared by all workers on one host
+
+    Errors are never raised to callers: a failed round trip counts as a miss,
+    so the analyzer keeps working if the server is down.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 0.05):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.errors = 0
+        self._local = threading.local()  # One connection per thread
+
+    def after_fork(self):
+        """Forget the connections inherited from the parent, which would interleave with its requests"""
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            self._local.conn = conn
+        return conn
+
+    def _round_trip(self, op: bytes, key: bytes, payload: bytes = b"") -> tuple:
+        try:
+            conn = self._connection()
+            conn.sendall(_REQUEST.pack(op, key, len(payload)) + payload)
+            status, length = _RESPONSE.unpack(_recv_exact(conn, _RESPONSE.size))
+            return status, _recv_exact(conn, length)
+        except OSError:
+            self.errors += 1
+            conn = getattr(self._local, "conn", None)
+            if conn is not None:
+                conn.close()
+                self._local.conn = None
+            return b"M", b""
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        """Fetch raw value bytes for `key`, or None on a miss or error"""
+        status, payload = self._round_trip(b"G", key)
+        return payload if status == b"H" else None
+
+    def set(self, key: bytes, value: bytes, ttl_seconds: float):
+        """Store raw value bytes for `key` with the given time to live"""
+        self._round_trip(b"S", key, struct.pack("<I", int(ttl_seconds)) + value)
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    """Read exactly `size` bytes or raise ConnectionError"""
+    chunks = []
+    while size:
+        chunk = conn.recv(size)
+        if not chunk:
+            raise ConnectionError("cache connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class AnalysisCache:
+    """LRU + TTL cache of analysis results keyed by a keyed hash of the password
+
+    The plaintext password is never stored: keys are HMAC-SHA256 digests under
+    `secret`. Workers that share a backend must use the same secret; without
+    one, a random per-process secret is generated and only the local cache is
+    useful. Fields named in `private_fields` (such as suggestions that quote
+    the password) stay in this process: the shared backend only ever sees the
+    other fields, and the reader rebuilds the private ones.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300,
+                 secret: Optional[bytes] = None, backend: Optional[UnixSocketCacheBackend] = None,
+                 value_type: Optional[Callable[..., Any]] = None, private_fields: Iterable[str] = ()):
+        """Create a cache; `value_type` rebuilds dataclass results fetched from the backend"""
+        self._store = LRUStore(max_size, ttl_seconds)
+        self._secret = secret or os.urandom(32)
+        self.backend = backend
+        self.value_type = value_type
+        self.private_fields = tuple(private_fields)
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.rejected = 0
+
+    def key_for(self, password: str, variant: str = "") -> bytes:
+        """Return the cache key for a password and an optional result variant"""
+        return hmac.new(self._secret, variant.encode() + b"\0" + password.encode(), hashlib.sha256).digest()
+
+    def get(self, key: bytes, complete: Optional[Callable[[Any], Any]] = None):
+        """Return the cached result for `key`, or None
+        
+        A result from the shared backend has None in its private fields;
+        `complete` is called with it to fill them in before it is cached here.
+        """
+        value = self._store.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.backend is not None and self.value_type is not None:
+            payload = self.backend.get(key)
+            value = self._decode(payload) if payload is not None else None
+            if value is not None:
+                if complete is not None:
+                    value = complete(value)
+                self._store.set(key, value)
+                self.hits += 1
+                self.backend_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def _decode(self, payload: bytes):
+        """Rebuild a result from a shared entry, or return None if it can't be used
+
+        Entries written by a deploy with other result fields, such as one still
+        running during a rolling restart, or corrupted ones count as misses.
+        """
+        try:
+            fields = json.loads(payload)
+            fields.update(dict.fromkeys(self.private_fields))
+            return self.value_type(**fields)
+        except (AttributeError, TypeError, ValueError):
+            self.rejected += 1
+            return None
+
+    def set(self, key: bytes, value):
+        """Cache `value` locally and, if configured, in the shared backend"""
+        self._store.set(key, value)
+        if self.backend is not None and self.value_type is not None:
+            fields = dataclasses.asdict(value)
+            for name in self.private_fields:
+                del fields[name]
+            self.backend.set(key, json.dumps(fields).encode(), self._store.ttl_seconds)
+
+    def after_fork(self):
+        """Make the cache safe to use in a child forked from a process with other threads"""
+        self._store.after_fork()
+        if self.backend is not None:
+            self.backend.after_fork()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "backend_hits": self.backend_hits,
+            "backend_errors": self.backend.errors if self.backend is not None else 0,
+            "backend_rejected": self.rejected,
+            "size": len(self._store),
+            "evictions": self._store.evictions,
+            "expirations": self._store.expirations,
+        }
+
+
+class _CacheRequestHandler(socketserver.BaseRequestHandler):
+    """Serves get/set requests on one client connection until it closes"""
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                op, key, length = _REQUEST.unpack(_recv_exact(self.request, _REQUEST.size))
+            except (ConnectionError, OSError):
+                return
+            payload = _recv_exact(self.request, length) if length else b""
+
+            if op == b"G":
+                value = store.get(key)
+                response = _RESPONSE.pack(b"H", len(value)) + value if value is not None else _RESPONSE.pack(b"M", 0)
+            elif op == b"S":
+                (ttl_seconds,) = struct.unpack("<I", payload[:4])
+                store.set(key, payload[4:], ttl_seconds)
+                response = _RESPONSE.pack(b"K", 0)
+            else:
+                return
+            self.request.sendall(response)
+
+
+class CacheServer(socketserver.ThreadingUnixStreamServer):
+    """Shared cache server listening on a Unix socket readable only by its owner"""
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, max_size: int = 100000, ttl_seconds: float = 300):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.store = LRUStore(max_size, ttl_seconds)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _CacheRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+
+def main(argv=None) -> int:
+    """Command-line entry point: python -m models.result_cache serve ..."""
+    parser = argparse.ArgumentParser(description="Run the shared analysis result cache server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="serve the cache on a Unix socket")
+    serve.add_argument("socket_path")
+    serve.add_argument("--max-size", type=int, default=100000, help="maximum number of entries")
+    serve.add_argument("--ttl", type=float, default=300, help="entry time to live in seconds")
+    args = parser.parse_args(argv)
+
+    with CacheServer(args.socket_path, args.max_size, args.ttl) as server:
+        print(f"Serving analysis cache on {args.socket_path}")
+        server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+# Scoring Rules - Score weights and crack-time units shared by every scoring path
+# The scalar analyzer, the NumPy batch path and the browser export all read them from here
+
+from typing import Tuple
+
+# Score: entropy times ENTROPY_SCORE_WEIGHT, capped at 100, scaled down if
+# leaked and by PATTERN_PENALTY per pattern
+ENTROPY_SCORE_WEIGHT = 5
+COMPROMISED_SCORE_FACTOR = 0.2
+LEAKED_VARIANT_SCORE_FACTOR = 0.5  # Mangling rules try these soon after the leaked list itself
+PATTERN_PENALTY = 0.15
+
+# (below this many seconds, divide by, unit) for human readable crack times
+CRACK_TIME_UNITS: Tuple[Tuple[int, int, str], ...] = (
+    (60, 1, "seconds"), (3600, 60, "minutes"), (86400, 3600, "hours"),
+    (31536000, 86400, "days"), (31536000 * 100, 31536000, "years"))
+
+
+def format_crack_time(seconds: float) -> str:
+    """Human readable form of a time to crack, in CRACK_TIME_UNITS"""
+    for limit, divisor, unit in CRACK_TIME_UNITS:
+        if seconds < limit:
+            return f"{seconds/divisor:.2f} {unit}"
+    return "centuries"
@@ -0,0 +1,177 @@
+# Vectorized Batch Scoring - NumPy implementation of the analyzer's numeric features
+# Computes entropy, character classes and brute-force crack times for a whole batch at once
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.features import DIGIT_SIZE, LOWERCASE_SIZE, SPECIAL_SIZE, UPPERCASE_SIZE
+from models.guesses import brute_force_log10_guesses, seconds_from_log10_guesses
+from models.scoring import (COMPROMISED_SCORE_FACTOR, ENTROPY_SCORE_WEIGHT, LEAKED_VARIANT_SCORE_FACTOR,
+                            PATTERN_PENALTY, format_crack_time)
+
+# Padding value for the code-point matrix; sorts after every real code point
+PAD = np.uint32(0xFFFFFFFF)
+
+# Passwords longer than this are left to the scalar path: every row of the
+# code-point matrix is padded to the longest password, so one very long
+# password would multiply the memory and time of the whole batch
+MAX_VECTOR_LENGTH = 256
+
+
+def encode_batch(passwords: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode passwords as a PAD-padded (batch, max_length) uint32 code-point matrix
+
+    Returns the matrix and the array of password lengths.
+    """
+    lengths = np.fromiter((len(pwd) for pwd in passwords), dtype=np.int64, count=len(passwords))
+    width = int(lengths.max()) if len(passwords) else 0
+    codes = np.full((len(passwords), width), PAD, dtype=np.uint32)
+    if width:
+        flat = np.frombuffer("".join(passwords).encode("utf-32-le"), dtype="<u4")
+        rows = np.repeat(np.arange(len(passwords)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        cols = np.arange(len(flat)) - np.repeat(starts, lengths)
+        codes[rows, cols] = flat
+    return codes, lengths
+
+
+def _entropy_terms(lengths: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """p * log2(p) for each p = count / length, computed exactly as the scalar path does
+
+    Each distinct (length, count) pair is computed once with math.log2, whose
+    results np.log2 isn't guaranteed to reproduce to the last bit.
+    """
+    pairs, inverse = np.unique(np.stack([lengths, counts]), axis=1, return_inverse=True)
+    terms = np.array([count / length * math.log2(count / length) for length, count in pairs.T.tolist()])
+    return terms[inverse.reshape(-1)]
+
+
+def batch_entropy(codes: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Total Shannon entropy per password, bit-for-bit equal to PasswordAnalyzer._calculate_entropy
+
+    Characters are counted by sorting each row. The per-character terms are
+    then summed in first-occurrence order, the same order the scalar path
+    iterates its histogram, so floating-point results match exactly.
+    """
+    batch, width = codes.shape
+    entropy = np.zeros(batch)
+    if width == 0:
+        return entropy
+
+    order = np.argsort(codes, axis=1, kind="stable")
+    ordered = np.take_along_axis(codes, order, axis=1)
+    valid = np.arange(width) < lengths[:, None]
+
+    starts = valid.copy()
+    starts[:, 1:] &= ordered[:, 1:] != ordered[:, :-1]
+    run_ids = np.cumsum(starts, axis=1) - 1
+    flat_runs = (np.arange(batch)[:, None] * width + run_ids)[valid]
+    counts = np.bincount(flat_runs, minlength=batch * width)
+
+    # Stable sorting keeps each run's first element at its first occurrence
+    rows, cols = np.nonzero(starts)
+    first_positions = order[rows, cols]
+    run_counts = counts[rows * width + run_ids[rows, cols]]
+
+    terms = _entropy_terms(lengths[rows], run_counts)
+
+    # Subtract each row's k-th distinct character in step k, ordered by first occurrence
+    by_position = np.lexsort((first_positions, rows))
+    rows, terms = rows[by_position], terms[by_position]
+    row_starts = np.searchsorted(rows, np.arange(batch))
+    ranks = np.arange(len(rows)) - row_starts[rows]
+    for rank in range(int(ranks.max()) + 1 if len(ranks) else 0):
+        step = ranks == rank
+        entropy[rows[step]] -= terms[step]
+    return entropy * lengths
+
+
+def batch_classes(passwords: Sequence[str], codes: np.ndarray, lengths: np.ndarray) -> Dict[str, np.ndarray]:
+    """Presence of uppercase, lowercase, digit and special characters per password
+
+    ASCII rows are classified with array comparisons; rows with other
+    characters fall back to str methods so Unicode rules match the scalar path.
+    """
+    valid = np.arange(codes.shape[1]) < lengths[:, None]
+    is_upper = (codes >= ord("A")) & (codes <= ord("Z"))
+    is_lower = (codes >= ord("a")) & (codes <= ord("z"))
+    is_digit = (codes >= ord("0")) & (codes <= ord("9"))
+    is_special = valid & ~(is_upper | is_lower | is_digit)
+    classes = {
+        "has_upper": is_upper.any(axis=1),
+        "has_lower": is_lower.any(axis=1),
+        "has_digit": is_digit.any(axis=1),
+        "has_special": is_special.any(axis=1),
+    }
+
+    non_ascii = np.nonzero((valid & (codes > 127)).any(axis=1))[0]
+    for row in non_ascii:
+        password = passwords[row]
+        classes["has_upper"][row] = any(c.isupper() for c in password)
+        classes["has_lower"][row] = any(c.islower() for c in password)
+        classes["has_digit"][row] = any(c.isdigit() for c in password)
+        classes["has_special"][row] = any(not c.isalnum() for c in password)
+    return classes
+
+
+def batch_char_set_size(classes: Dict[str, np.ndarray]) -> np.ndarray:
+    """Brute-force charset size per password, as in PasswordFeatures.char_set_size"""
+    return (classes["has_lower"] * LOWERCASE_SIZE + classes["has_upper"] * UPPERCASE_SIZE
+            + classes["has_digit"] * DIGIT_SIZE + classes["has_special"] * SPECIAL_SIZE).astype(np.int64)
+
+
+def batch_crack_seconds(char_set_size: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Seconds to brute force each password, assuming it has no patterns
+
+    Values come from a table filled by the scalar guess estimator's own
+    functions, one entry per distinct charset size and length, so they match
+    PasswordAnalyzer bit for bit. Passwords with patterns need the scalar
+    estimator's search over token sequences instead.
+    """
+    width = int(lengths.max()) if len(lengths) else 0
+    sizes, size_index = np.unique(char_set_size, return_inverse=True)
+    seconds = np.zeros((len(sizes), width + 1))
+    for i, size in enumerate(sizes.tolist()):
+        for length in range(1, width + 1):
+            seconds[i, length] = seconds_from_log10_guesses(brute_force_log10_guesses(length, size))
+    return seconds[size_index.reshape(-1), lengths]
+
+
+def format_crack_times(seconds: np.ndarray) -> List[str]:
+    """Human readable crack times, using the same units and thresholds as the scalar path"""
+    return [format_crack_time(value) for value in seconds.tolist()]
+
+
+def batch_scores(entropy: np.ndarray, is_compromised: np.ndarray, pattern_counts: np.ndarray,
+                 is_leaked_variant: Optional[np.ndarray] = None) -> np.ndarray:
+    """0-100 scores, following PasswordAnalyzer's scoring formula"""
+    base = np.minimum(100, np.maximum(0, entropy * ENTROPY_SCORE_WEIGHT))
+    if is_leaked_variant is not None:
+        base = np.where(is_leaked_variant & ~is_compromised, base * LEAKED_VARIANT_SCORE_FACTOR, base)
+    base = np.where(is_compromised, base * COMPROMISED_SCORE_FACTOR, base)
+    penalty = np.maximum(0, 1.0 - pattern_counts * PATTERN_PENALTY)
+    return np.trunc(base * penalty).astype(np.int64)
+
+
+def score_batch(passwords: Sequence[str], pattern_counts: Sequence[int],
+                is_compromised: Sequence[bool],
+                is_leaked_variant: Optional[Sequence[bool]] = None) -> Dict[str, np.ndarray]:
+    """Compute every numeric analysis output for a batch of non-empty passwords
+
+    Returns arrays of lengths, entropy, class flags, charset size, brute-force
+    crack seconds and scores, aligned with `passwords`. Callers should keep
+    passwords longer than MAX_VECTOR_LENGTH for the scalar path.
+    """
+    codes, lengths = encode_batch(passwords)
+    pattern_counts = np.asarray(pattern_counts, dtype=np.int64)
+    features = batch_classes(passwords, codes, lengths)
+    features["length"] = lengths
+    features["entropy"] = batch_entropy(codes, lengths)
+    features["char_set_size"] = batch_char_set_size(features)
+    features["crack_seconds"] = batch_crack_seconds(features["char_set_size"], lengths)
+    features["score"] = batch_scores(
+        features["entropy"], np.asarray(is_compromised, dtype=bool), pattern_counts,
+        np.asarray(is_leaked_variant, dtype=bool) if is_leaked_variant is not None else None)
+    return features
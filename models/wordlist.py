@@ -0,0 +1,340 @@
+# Wordlist Dictionary - Compact, array-backed DAWG for common-word detection
+# Builds minimal word graphs from plain or gzip wordlists of any size and caches them on disk
+
+import argparse
+from array import array
+from bisect import bisect_left
+import gzip
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.leak_index import external_sort
+
+# File layout:
+#   header (64 bytes): magic, version, node count, edge count, word count, longest word
+#   edge_start: node count + 1 uint32 offsets into the edge arrays
+#   edge_label: edge count uint32 code points, sorted within each node
+#   edge_target: edge count uint32 node ids
+#   final: node count bytes, 1 where a word ends
+MAGIC = b"PWDAWG01"
+VERSION = 1
+HEADER_FORMAT = "<8sHIIII"
+HEADER_SIZE = 64
+
+DEFAULT_MIN_LENGTH = 3
+
+# Words sorted in memory at a time while building
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def iter_wordlist(paths: Iterable[str], min_length: int = DEFAULT_MIN_LENGTH) -> Iterator[str]:
+    """Yield lowercased words from plain or gzip wordlists, one word per line
+
+    Words shorter than `min_length` are skipped: one- and two-letter entries
+    would flag nearly every password as containing a common word.
+    """
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="ignore") as handle:
+            for line in handle:
+                word = line.strip().lower()
+                if len(word) >= min_length:
+                    yield word
+
+
+def _write_word_run(words: List[str], directory: Optional[str]) -> str:
+    """Spill one sorted chunk of words to a temporary run file, one word per line"""
+    handle = tempfile.NamedTemporaryFile(dir=directory, suffix=".run", delete=False)
+    with handle:
+        for word in words:
+            handle.write(word.encode("utf-8", "surrogatepass") + b"\n")
+    return handle.name
+
+
+def _read_word_run(path: str) -> Iterator[str]:
+    """Stream words back from a run file"""
+    with open(path, "rb") as handle:
+        for line in handle:
+            yield line[:-1].decode("utf-8", "surrogatepass")
+
+
+class _BuildNode:
+    """Graph node on the path of the latest word, which later words may still extend"""
+    __slots__ = ("final", "edges")
+
+    def __init__(self):
+        self.final = False
+        # Characters in the order added, which is sorted; targets are the ids
+        # of written nodes, except the last, which may be on the path
+        self.edges: Dict[str, object] = {}
+
+
+def _build_arrays(sorted_words: Iterable[str]) -> Tuple[array, array, array, bytes, int, int]:
+    """Build the arrays of a minimal DAWG from sorted words (Daciuk et al.'s incremental algorithm)
+
+    Only the latest word's path is held as _BuildNode objects. Once no later
+    word can extend a node, it is replaced by an equal node already written,
+    or written to the arrays itself, so memory grows with the size of the
+    graph rather than the number of words. Nodes are written children first,
+    then the root is moved to the front as node 0. Duplicate words are
+    skipped. Returns the arrays in CompactDawg's layout, the word count and
+    the longest word length.
+    """
+    root = _BuildNode()
+    # Written nodes are numbered from 1; starts[k - 1] is node k's first edge
+    starts = array("I")
+    labels = array("I")
+    targets = array("I")
+    final = bytearray()
+    register: Dict[bytes, int] = {}
+    unchecked: List[Tuple[_BuildNode, str, _BuildNode]] = []
+    previous = ""
+    count = longest = 0
+
+    def write(node: _BuildNode) -> int:
+        node_labels = array("I", map(ord, node.edges))
+        node_targets = array("I", node.edges.values())
+        signature = bytes((node.final,)) + node_labels.tobytes() + node_targets.tobytes()
+        number = register.get(signature)
+        if number is None:
+            number = register[signature] = len(final) + 1
+            starts.append(len(labels))
+            labels.extend(node_labels)
+            targets.extend(node_targets)
+            final.append(node.final)
+        return number
+
+    def minimize(down_to: int):
+        # Write each unchecked node, deepest first, so its children are always written
+        while len(unchecked) > down_to:
+            parent, char, child = unchecked.pop()
+            parent.edges[char] = write(child)
+
+    for word in sorted_words:
+        if word <= previous:
+            if word == previous:
+                continue
+            raise ValueError("words must be added in sorted order")
+        common = 0
+        for a, b in zip(word, previous):
+            if a != b:
+                break
+            common += 1
+        minimize(common)
+
+        node = unchecked[-1][2] if unchecked else root
+        for char in word[common:]:
+            child = _BuildNode()
+            node.edges[char] = child
+            unchecked.append((node, char, child))
+            node = child
+        node.final = True
+
+        previous = word
+        count += 1
+        longest = max(longest, len(word))
+
+    minimize(0)
+    shift = len(root.edges)
+    edge_start = array("I", [0])
+    edge_start.extend(start + shift for start in starts)
+    edge_start.append(shift + len(labels))
+    edge_label = array("I", map(ord, root.edges)) + labels
+    edge_target = array("I", root.edges.values()) + targets
+    return edge_start, edge_label, edge_target, bytes((root.final,)) + final, count, longest
+
+
+class CompactDawg:
+    """Read-only directed acyclic word graph stored in flat integer arrays
+
+    Each node's outgoing edges are a contiguous, label-sorted run of the edge
+    arrays, so a transition is a binary search over a handful of integers.
+    Loaded files are memory-mapped and shared between processes.
+    """
+
+    def __init__(self, edge_start, edge_label, edge_target, final, word_count: int,
+                 max_length: int, buffer=None):
+        """Wrap prebuilt arrays; use from_words() or load() instead of calling directly"""
+        self._edge_start = edge_start
+        self._edge_label = edge_label
+        self._edge_target = edge_target
+        self._final = final
+        self.word_count = word_count
+        self.max_length = max_length
+        self._buffer = buffer  # Keeps a memory mapping alive
+
+    @classmethod
+    def from_words(cls, words: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   run_directory: Optional[str] = None) -> "CompactDawg":
+        """Build a DAWG from any iterable of words, which must not contain newlines
+
+        The words are put in order by an external merge sort that holds at
+        most `chunk_size` of them in memory, spilling sorted runs to
+        `run_directory` (default: the system's temporary directory). Build
+        large dictionaries once with the command-line tool and load() the
+        cached file afterwards.
+        """
+        sorted_words = external_sort(words, chunk_size, _write_word_run, _read_word_run, run_directory)
+        try:
+            return cls(*_build_arrays(sorted_words))
+        finally:
+            sorted_words.close()
+
+    @classmethod
+    def load(cls, path: str) -> "CompactDawg":
+        """Memory-map a DAWG previously written with save()"""
+        with open(path, "rb") as handle:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, node_count, edge_count, word_count, max_length = struct.unpack_from(HEADER_FORMAT, buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            buffer.close()
+            raise ValueError(f"{path} is not a version {VERSION} dictionary file")
+
+        view = memoryview(buffer)
+        offset = HEADER_SIZE
+        edge_start = view[offset:offset + 4 * (node_count + 1)].cast("I")
+        offset += 4 * (node_count + 1)
+        edge_label = view[offset:offset + 4 * edge_count].cast("I")
+        offset += 4 * edge_count
+        edge_target = view[offset:offset + 4 * edge_count].cast("I")
+        offset += 4 * edge_count
+        final = view[offset:offset + node_count]
+        return cls(edge_start, edge_label, edge_target, final, word_count, max_length, buffer)
+
+    def save(self, path: str):
+        """Write the DAWG to `path` in the binary format read by load()
+
+        The file is written under a unique temporary name and renamed into
+        place, so processes saving the same cache at once never mix their writes.
+        """
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                             prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as out:
+                out.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(self._final), len(self._edge_label),
+                                      self.word_count, self.max_length).ljust(HEADER_SIZE, b"\0"))
+                for values in (self._edge_start, self._edge_label, self._edge_target):
+                    out.write(array("I", values).tobytes())
+                out.write(bytes(self._final))
+            # mkstemp makes the file private to its owner; a dictionary is not secret
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def __len__(self) -> int:
+        return self.word_count
+
+    def _step(self, node: int, char: str) -> int:
+        """Follow the edge labelled `char` from `node`, or return -1"""
+        lo, hi = self._edge_start[node], self._edge_start[node + 1]
+        code = ord(char)
+        position = bisect_left(self._edge_label, code, lo, hi)
+        if position < hi and self._edge_label[position] == code:
+            return self._edge_target[position]
+        return -1
+
+    def step(self, node: int, char: str) -> int:
+        """Follow the edge labelled `char` from `node` (0 is the root), or return -1"""
+        return self._step(node, char)
+
+    def is_final(self, node: int) -> bool:
+        """Return whether a word ends at `node`"""
+        return bool(self._final[node])
+
+    def __contains__(self, word: str) -> bool:
+        node = 0
+        for char in word:
+            node = self._step(node, char)
+            if node < 0:
+                return False
+        return bool(self._final[node])
+
+    def __iter__(self) -> Iterator[str]:
+        """Yield every word in sorted order"""
+        stack = [(0, "")]
+        while stack:
+            node, prefix = stack.pop()
+            if self._final[node]:
+                yield prefix
+            lo, hi = self._edge_start[node], self._edge_start[node + 1]
+            for edge in range(hi - 1, lo - 1, -1):
+                stack.append((self._edge_target[edge], prefix + chr(self._edge_label[edge])))
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield the (start, end) span of every dictionary word occurring in `text`
+
+        Each start position walks at most `max_length` edges, so the cost
+        depends on the text length and not on the dictionary size.
+        """
+        step, final = self._step, self._final
+        for start in range(len(text)):
+            node = 0
+            for end in range(start, min(len(text), start + self.max_length)):
+                node = step(node, text[end])
+                if node < 0:
+                    break
+                if final[node]:
+                    yield start, end + 1
+
+    def longest_prefix(self, text: str) -> int:
+        """Return the length of the longest dictionary word that `text` starts with, or 0"""
+        node, longest = 0, 0
+        for index, char in enumerate(text):
+            node = self._step(node, char)
+            if node < 0:
+                break
+            if self._final[node]:
+                longest = index + 1
+        return longest
+
+
+def load_dictionary(path: str, cache_path: Optional[str] = None,
+                    min_length: int = DEFAULT_MIN_LENGTH) -> CompactDawg:
+    """Load a dictionary from a .dawg file, or from a wordlist via a binary cache
+
+    Plain or gzip wordlists are compiled once and cached at `cache_path`
+    (default: the wordlist path plus ".dawg"); the cache is rebuilt when the
+    wordlist is newer than it.
+    """
+    if path.endswith(".dawg"):
+        return CompactDawg.load(path)
+
+    cache_path = cache_path or path + ".dawg"
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        return CompactDawg.load(cache_path)
+
+    dawg = CompactDawg.from_words(iter_wordlist([path], min_length),
+                                  run_directory=os.path.dirname(os.path.abspath(cache_path)))
+    dawg.save(cache_path)
+    return CompactDawg.load(cache_path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m models.wordlist build ..."""
+    parser = argparse.ArgumentParser(description="Build a compact dictionary file from wordlists")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="merge wordlists into one .dawg file")
+    build.add_argument("inputs", nargs="+", help="wordlists, one word per line (.gz supported)")
+    build.add_argument("-o", "--output", required=True, help=".dawg file to write")
+    build.add_argument("--min-length", type=int, default=DEFAULT_MIN_LENGTH,
+                       help=f"skip words shorter than this (default: {DEFAULT_MIN_LENGTH})")
+    build.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                       help="words sorted in memory at a time; more are merged from temporary files")
+
+    args = parser.parse_args(argv)
+    dawg = CompactDawg.from_words(iter_wordlist(args.inputs, args.min_length), args.chunk_size,
+                                  os.path.dirname(os.path.abspath(args.output)))
+    dawg.save(args.output)
+    print(f"Wrote {len(dawg)} words ({len(dawg._final)} nodes) to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# Worker Pool - Pre-warmed process pool that runs CPU-bound analysis for an event loop
+# Admission is bounded, so a burst is refused with PoolUnavailable instead of queueing
+# without limit, and every task has a deadline after which nobody waits for it
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import signal
+import time
+from typing import Callable, Dict, Optional, Set
+
+
+class PoolUnavailable(Exception):
+    """The pool can't take a task: every worker is busy and the queue is full, or a worker died"""
+
+
+class DeadlineExceeded(Exception):
+    """A task's deadline passed before it finished"""
+
+
+_ready_barrier = None
+
+
+def _initialize_worker(initializer: Optional[Callable], initargs: tuple, ready_barrier):
+    global _ready_barrier
+    _ready_barrier = ready_barrier
+    # Forked from a running server: drop its signal handling. The front end
+    # handles Ctrl-C and shuts the pool down
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _run_before(deadline: float, function: Callable, args: tuple):
+    # A task can wait in the executor's call queue after its caller has given
+    # up; skip it rather than spend a worker on a result nobody will read
+    if time.time() >= deadline:
+        raise DeadlineExceeded("deadline passed while queued")
+    return function(*args)
+
+
+def _worker_ready() -> int:
+    # Each worker blocks here until all have arrived, so every worker takes one
+    _ready_barrier.wait()
+    return os.getpid()
+
+
+class WorkerPool:
+    """A fixed set of forked worker processes fed from one event loop
+
+    Workers are forked by start(), after the caller has loaded its resources,
+    so they share the dictionary, leak index and model pages copy-on-write.
+    At most `workers + queue_size` tasks are admitted at a time. A task holds
+    its slot until its worker finishes, even if its caller stopped waiting,
+    so the bound reflects the work actually in progress. run() must be called
+    from the event loop thread.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 initializer: Optional[Callable] = None, initargs: tuple = ()):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = 4 * self.workers if queue_size is None else queue_size
+        self.capacity = self.workers + self.queue_size
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._slot_freed = asyncio.Event()
+        self._counts = {"submitted": 0, "finished": 0, "rejected": 0, "expired": 0, "restarts": 0}
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> Set[int]:
+        """Fork the workers and wait until each has run the initializer; returns their pids
+
+        Forking (rather than spawning) is what lets workers share the
+        parent's loaded resources, so this is POSIX-only.
+        """
+        context = multiprocessing.get_context("fork")
+        # Locks can only be handed to workers as they are forked, not with a task
+        barrier = context.Barrier(self.workers)
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_initialize_worker,
+                                             initargs=(self._initializer, self._initargs, barrier))
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+        return {future.result() for future in futures}
+
+    def shutdown(self):
+        """Cancel queued tasks and wait for running ones"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        """Task counts since start, plus the tasks currently admitted"""
+        return {**self._counts, "pending": self._pending, "capacity": self.capacity, "workers": self.workers}
+
+    async def run(self, function: Callable, *args, deadline: float, wait: bool = False):
+        """Run `function(*args)` in a worker and return its result
+
+        `deadline` is a time.time() value. Raises PoolUnavailable when no
+        slot is free, unless `wait` is set, in which case it waits for a slot
+        until the deadline; raises DeadlineExceeded once the deadline passes.
+        `function` and its arguments and result must be picklable.
+        """
+        if self._executor is None:
+            raise PoolUnavailable("worker pool is not running")
+        while self._pending >= self.capacity:
+            if not wait:
+                self._counts["rejected"] += 1
+                raise PoolUnavailable("all workers are busy")
+            self._slot_freed.clear()
+            try:
+                await asyncio.wait_for(self._slot_freed.wait(), deadline - time.time())
+            except asyncio.TimeoutError:
+                self._counts["expired"] += 1
+                raise DeadlineExceeded("deadline passed waiting for a worker") from None
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            self._counts["expired"] += 1
+            raise DeadlineExceeded("deadline passed before the task started")
+        try:
+            future = self._executor.submit(_run_before, deadline, function, args)
+        except BrokenProcessPool:
+            self._restart()
+            raise PoolUnavailable("a worker process died; the pool was restarted") from None
+        self._pending += 1
+        self._counts["submitted"] += 1
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: self._call_soon(loop, self._task_done))
+
+        try:
+            # Cancelling the wrapper on timeout also cancels the task if it hasn't started
+            return await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            self._counts["expired"] += 1
+            raise DeadlineExceeded("deadline passed before the task finished") from None
+        except BrokenProcessPool:
+            self._restart()
+            raise PoolUnavailable("a worker process died; the pool was restarted") from None
+
+    @staticmethod
+    def _call_soon(loop, callback):
+        try:
+            loop.call_soon_threadsafe(callback)
+        except RuntimeError:  # The loop closed during shutdown
+            pass
+
+    def _task_done(self):
+        self._pending -= 1
+        self._counts["finished"] += 1
+        self._slot_freed.set()
+
+    def _restart(self):
+        # Every task of a broken executor fails, and their callbacks free their slots
+        broken = self._executor
+        if broken is None or not getattr(broken, "_broken", True):
+            return
+        self._counts["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
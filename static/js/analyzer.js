@@ -0,0 +1,491 @@
+// analyzer.js - Password scoring in the browser, from rule tables exported by the Python analyzer
+// Reproduces PasswordAnalyzer's score, crack time, patterns and suggestions; leak status and
+// GenAI text still come from the server. Rebuild the rules with python -m models.client_export build
+(function (root, factory) {
+    if (typeof module === 'object' && module.exports) {
+        module.exports = factory();
+    } else {
+        root.PasswordScorer = factory();
+    }
+})(typeof self !== 'undefined' ? self : this, function () {
+    'use strict';
+
+    const RULES_VERSION = 4;
+
+    // Python's str predicates: isupper, islower, isdecimal, and isalnum (letters and numbers)
+    const UPPER = /\p{Uppercase}/u;
+    const LOWER = /\p{Lowercase}/u;
+    const DECIMAL = /\p{Nd}/u;
+    const ALNUM = /[\p{L}\p{N}]/u;
+    const LETTER = /\p{L}/u;
+
+    // PatternDetector's structural regex; Python's \d is any decimal digit and '.' anything but \n
+    const DIGIT = '\\p{Nd}';
+    const YEAR = `19${DIGIT}{2}|20${DIGIT}{2}`;
+    const DATE = `(?:0[1-9]|1[0-2])(?:0[1-9]|[12]${DIGIT}|3[01])`;
+    // JavaScript can't quantify a lookahead, so each optional one ends in an empty alternative
+    const STRUCTURAL_PATTERNS = new RegExp(
+        `(?=${YEAR}|${DATE})` +
+        `(?=(${YEAR})|)` +
+        `(?=(${DATE})|)`, 'gu');
+    const STRUCTURAL_GROUPS = [[1, 'year'], [2, 'date']];
+    // Each maximal run of a repeated character, found in one linear scan
+    const REPEATED_RUN = /([^\n])\1{2,}/gu;
+
+    function inRanges(code, ranges) {
+        let lo = 0;
+        let hi = ranges.length - 1;
+        while (lo <= hi) {
+            const mid = (lo + hi) >> 1;
+            if (code < ranges[mid][0]) hi = mid - 1;
+            else if (code > ranges[mid][1]) lo = mid + 1;
+            else return true;
+        }
+        return false;
+    }
+
+    // Number of ways to choose k of n, exact below 2^53
+    function comb(n, k) {
+        let result = 1;
+        for (let i = 1; i <= k; i++) {
+            result = result * (n - k + i) / i;
+        }
+        return result;
+    }
+
+    // Python's round-half-even f"{x:.2f}"; toFixed rounds exact ties (odd multiples of 1/8) up
+    function fixed2(x) {
+        const eighths = x * 8;
+        if (Number.isInteger(eighths) && eighths % 2 === 1) {
+            const cents = Math.floor(x * 100);
+            if (cents % 2 === 0) return (cents / 100).toFixed(2);
+        }
+        return x.toFixed(2);
+    }
+
+    function createScorer(rules, options) {
+        if (!rules || rules.version !== RULES_VERSION) {
+            throw new Error(`Expected version ${RULES_VERSION} analyzer rules`);
+        }
+        options = options || {};
+        const referenceYear = options.referenceYear || new Date().getFullYear();
+        const sizes = rules.char_set_sizes;
+        const guesses = rules.guesses;
+        const score = rules.score;
+        const digitRanges = rules.unicode.digit_ranges;
+        const words = new Set(rules.dictionary.words ? rules.dictionary.words.split('\n') : []);
+        const maxWordLength = rules.dictionary.max_length;
+        const literals = rules.keyboard_patterns.map(pattern => [Array.from(pattern), 'keyboard_pattern'])
+            .concat(rules.sequential_numbers.map(sequence => [Array.from(sequence), 'sequential_numbers']));
+        const log10Factorials = [0];
+
+        function isDigit(char) {
+            return DECIMAL.test(char) || inRanges(char.codePointAt(0), digitRanges);
+        }
+
+        // Value of a decimal digit: they are encoded in runs from 0 to 9
+        function digitValue(char) {
+            let code = char.codePointAt(0);
+            if (code < 128) return code - 48;
+            let start = code;
+            while (DECIMAL.test(String.fromCodePoint(start - 1))) start--;
+            return (code - start) % 10;
+        }
+
+        function characterClasses(chars) {
+            let upper = false, lower = false, digit = false, special = false;
+            for (const char of new Set(chars)) {
+                upper = upper || UPPER.test(char);
+                lower = lower || LOWER.test(char);
+                digit = digit || isDigit(char);
+                special = special || !ALNUM.test(char);
+            }
+            return { upper, lower, digit, special };
+        }
+
+        // PatternDetector.find_spans: [start, end, label] in code points
+        function findSpans(password, chars) {
+            let lowered = Array.from(password.toLowerCase());
+            let origins = null;
+            if (lowered.length !== chars.length) {
+                // Some characters lowercase to several (e.g. 'İ'), so map spans back
+                origins = [];
+                chars.forEach((char, index) => {
+                    for (let i = 0; i < Array.from(char.toLowerCase()).length; i++) origins.push(index);
+                });
+            }
+            const literalSpans = [];
+            for (let start = 0; start < lowered.length; start++) {
+                let token = '';
+                for (let end = start; end < Math.min(lowered.length, start + maxWordLength); end++) {
+                    token += lowered[end];
+                    if (words.has(token)) literalSpans.push([start, end + 1, 'common_word']);
+                }
+                for (const [literal, label] of literals) {
+                    let i = 0;
+                    while (i < literal.length && lowered[start + i] === literal[i]) i++;
+                    if (i === literal.length) literalSpans.push([start, start + literal.length, label]);
+                }
+            }
+            const spans = origins === null ? literalSpans : literalSpans.map(
+                ([start, end, label]) => [origins[start], origins[end - 1] + 1, label]);
+
+            // Code point index of each UTF-16 offset
+            const offsets = [];
+            chars.forEach((char, index) => {
+                for (let i = 0; i < char.length; i++) offsets.push(index);
+            });
+            offsets.push(chars.length);
+            for (const found of password.matchAll(REPEATED_RUN)) {
+                spans.push([offsets[found.index], offsets[found.index + found[0].length], 'repeated_characters']);
+            }
+            for (const found of password.matchAll(STRUCTURAL_PATTERNS)) {
+                for (const [group, label] of STRUCTURAL_GROUPS) {
+                    if (found[group] === undefined) continue;
+                    spans.push([offsets[found.index], offsets[found.index + found[group].length], label]);
+                }
+            }
+            return spans;
+        }
+
+        function uppercaseVariations(token) {
+            let upper = 0, lower = 0;
+            for (const char of token) {
+                if (UPPER.test(char)) upper++;
+                if (LOWER.test(char)) lower++;
+            }
+            if (!upper) return 1;
+            if (!lower || (upper === 1 && (UPPER.test(token[0]) || UPPER.test(token[token.length - 1])))) return 2;
+            let variations = 0;
+            for (let i = 1; i <= Math.min(upper, lower); i++) variations += comb(upper + lower, i);
+            return variations;
+        }
+
+        function classSize(char) {
+            if (isDigit(char)) return guesses.repeat_class_sizes.digit;
+            if (LETTER.test(char)) return guesses.repeat_class_sizes.letter;
+            return guesses.repeat_class_sizes.other;
+        }
+
+        // GuessEstimator._token_log10_guesses; `token` is an array of code points
+        function tokenLog10Guesses(label, token) {
+            switch (label) {
+                case 'common_word':
+                    return guesses.log10_word_rank + Math.log10(uppercaseVariations(token));
+                case 'keyboard_pattern':
+                    return Math.log10((token.length - 1) * guesses.keyboard_starting_positions *
+                                      guesses.keyboard_average_degree * uppercaseVariations(token));
+                case 'sequential_numbers': {
+                    const first = token[0];
+                    const base = 'aAzZ019'.includes(first) ? 4 : isDigit(first) ? 10 : 26;
+                    return Math.log10(base * token.length);
+                }
+                case 'repeated_characters':
+                    return Math.log10(classSize(token[0]) * token.length);
+                case 'year': {
+                    const year = token.reduce((value, char) => value * 10 + digitValue(char), 0);
+                    return Math.log10(Math.max(Math.abs(year - referenceYear), guesses.min_year_space));
+                }
+                case 'date':
+                    return guesses.log10_date_guesses;
+            }
+            throw new Error(`Unknown pattern: ${label}`);
+        }
+
+        // log10(n!), from the correctly rounded float of n! as Python's math.log10 takes it
+        function log10Factorial(n) {
+            while (log10Factorials.length <= n) {
+                let factorial = 1n;
+                const k = log10Factorials.length;
+                for (let i = 2n; i <= BigInt(k); i++) factorial *= i;
+                const value = Number(factorial);
+                if (Number.isFinite(value)) {
+                    log10Factorials.push(Math.log10(value));
+                } else {
+                    // Too large for a double: split into a mantissa in [0.5, 1) and a
+                    // power of two, keeping a sticky bit so the mantissa rounds correctly
+                    const bits = factorial.toString(2).length;
+                    const shift = BigInt(bits - 64);
+                    let top = factorial >> shift;
+                    if (top << shift !== factorial) top |= 1n;
+                    log10Factorials.push(Math.log10(Number(top) / 2 ** 64) + Math.log10(2) * bits);
+                }
+            }
+            return log10Factorials[n];
+        }
+
+        function combineLog10Guesses(count, log10Product) {
+            const ordered = log10Product + log10Factorial(count);
+            const growth = (count - 1) * guesses.log10_min_guesses_before_growing_sequence;
+            const high = Math.max(ordered, growth), low = Math.min(ordered, growth);
+            return high + Math.log10(1 + 10 ** (low - high));
+        }
+
+        // guesses._prune: drop covers another of the same kind beats on both
+        // token count and product, then keep the cheapest as they stand
+        function pruneCovers(states) {
+            const ordered = Array.from(states.values()).sort((a, b) => a[0] - b[0] || a[1] - b[1]);
+            const lowest = [Infinity, Infinity];
+            let kept = ordered.filter(state => {
+                if (state[2] < lowest[+state[1]]) {
+                    lowest[+state[1]] = state[2];
+                    return true;
+                }
+                return false;
+            });
+            if (kept.length > guesses.max_cover_states) {
+                kept = kept.map(state => [combineLog10Guesses(state[0], state[2]), state])
+                    .sort((a, b) => a[0] - b[0] || a[1][0] - b[1][0] || a[1][1] - b[1][1])
+                    .slice(0, guesses.max_cover_states)
+                    .map(([, state]) => state)
+                    .sort((a, b) => a[0] - b[0] || a[1] - b[1]);
+            }
+            return kept;
+        }
+
+        // GuessEstimator.log10_guesses: cheapest cover of the password by tokens and brute force
+        function log10Guesses(chars, charSetSize, spans) {
+            const length = chars.length;
+            // Caseless letters alone give an empty alphabet; each costs one guess, as on the server
+            const charCost = Math.log10(Math.max(charSetSize, 1));
+            const longestRepeat = new Map();
+            const tokens = new Map();
+            for (const [start, end, label] of spans) {
+                if (label === 'repeated_characters') {
+                    longestRepeat.set(start, Math.max(end, longestRepeat.has(start) ? longestRepeat.get(start) : end));
+                } else {
+                    tokens.set(`${start},${end},${label}`, [start, end, label]);
+                }
+            }
+            for (const [start, end] of longestRepeat) {
+                tokens.set(`${start},${end},repeated_characters`, [start, end, 'repeated_characters']);
+            }
+            const sorted = Array.from(tokens.values()).sort((a, b) =>
+                a[0] - b[0] || a[1] - b[1] || (a[2] < b[2] ? -1 : a[2] > b[2] ? 1 : 0));
+
+            const byStart = Array.from({ length }, () => []);
+            for (const [start, end, label] of sorted) {
+                let cost = tokenLog10Guesses(label, chars.slice(start, end));
+                if (end - start < length) {
+                    cost = Math.max(cost, end - start === 1 ? guesses.log10_min_submatch_guesses_single_char
+                                                            : guesses.log10_min_submatch_guesses_multi_char);
+                }
+                byStart[start].push([end, cost]);
+            }
+
+            // best[k] maps "token count,ends in brute force" to the cheapest
+            // [count, in gap, log10 product, token part, brute-force length] covering chars[:k]
+            const best = Array.from({ length: length + 1 }, () => new Map());
+            best[0].set('0,false', [0, false, 0, 0, 0]);
+            const offer = (position, count, inGap, product, tokenPart, gapLength) => {
+                const key = `${count},${inGap}`;
+                const current = best[position].get(key);
+                if (current === undefined || product < current[2]) {
+                    best[position].set(key, [count, inGap, product, tokenPart, gapLength]);
+                }
+            };
+            for (let position = 0; position < length; position++) {
+                for (const [count, inGap, product, tokenPart, gapLength] of pruneCovers(best[position])) {
+                    offer(position + 1, inGap ? count : count + 1, true, product + charCost, tokenPart, gapLength + 1);
+                    for (const [end, cost] of byStart[position]) {
+                        offer(end, count + 1, false, product + cost, tokenPart + cost, gapLength);
+                    }
+                }
+            }
+            let result = Infinity;
+            for (const [count, , , tokenPart, gapLength] of best[length].values()) {
+                result = Math.min(result, combineLog10Guesses(count, tokenPart + gapLength * charCost));
+            }
+            return result;
+        }
+
+        function crackTime(seconds) {
+            for (const [limit, divisor, unit] of rules.crack_time_units) {
+                if (seconds < limit) return `${fixed2(seconds / divisor)} ${unit}`;
+            }
+            return 'centuries';
+        }
+
+        function entropyOf(chars) {
+            const counts = new Map();
+            for (const char of chars) counts.set(char, (counts.get(char) || 0) + 1);
+            let entropy = 0.0;
+            for (const count of counts.values()) {
+                const probability = count / chars.length;
+                entropy -= probability * Math.log2(probability);
+            }
+            return entropy * chars.length;
+        }
+
+        function attackVector(patterns, isCompromised, isLeakedVariant) {
+            if (isCompromised) return 'credential stuffing (using leaked passwords)';
+            if (isLeakedVariant) return 'rule-based attack (mangled leaked passwords)';
+            if (patterns.includes('common_word')) return 'dictionary attack';
+            if (['sequential_numbers', 'keyboard_pattern', 'year', 'date'].some(p => patterns.includes(p))) {
+                return 'rule-based attack';
+            }
+            if (patterns.includes('repeated_characters')) return 'mask attack';
+            return 'brute force attack';
+        }
+
+        function improvedVersion(password, chars, classes) {
+            if (chars.length < 8) return 'P@$$w0rd!' + password;
+            let improved = Array.from(password, char => rules.improvement_substitutions[char] ?? char).join('');
+            if (!(classes.special || password.includes('a') || password.includes('i'))) improved += '#$*';
+            if (!classes.upper) {
+                const first = String.fromCodePoint(improved.codePointAt(0));
+                improved = first.toUpperCase() + improved.slice(first.length);
+            }
+            if (!(classes.digit || password.includes('e') || password.includes('o'))) improved += '2024';
+            if (improved === password) improved += '!Secure#';
+            return improved;
+        }
+
+        function suggestionsFor(password, chars, classes, patterns) {
+            const suggestions = [];
+            if (chars.length < 12) suggestions.push('Increase password length to at least 12 characters');
+            if (!classes.upper) suggestions.push('Add uppercase letters');
+            if (!classes.lower) suggestions.push('Add lowercase letters');
+            if (!classes.digit) suggestions.push('Add numeric digits');
+            if (!classes.special) suggestions.push('Add special characters (!@#$%^&*)');
+            if (patterns.includes('sequential_numbers')) suggestions.push("Avoid sequential numbers (like '123')");
+            if (patterns.includes('repeated_characters')) suggestions.push("Avoid repeated characters (like 'aaa')");
+            if (patterns.includes('keyboard_pattern')) suggestions.push("Avoid keyboard patterns (like 'qwerty')");
+            if (patterns.includes('common_word')) suggestions.push('Avoid dictionary words');
+            if (patterns.includes('year') || patterns.includes('date')) {
+                suggestions.push('Avoid using dates, especially birth years');
+            }
+            const improved = improvedVersion(password, chars, classes);
+            if (improved) suggestions.push(`Consider something like: ${improved}`);
+            return suggestions;
+        }
+
+        // PasswordAnalyzer.analyze_password, given the server's leak status; no ml_strength
+        function analyze(password, leak) {
+            leak = leak || {};
+            const isCompromised = Boolean(leak.is_compromised);
+            const isLeakedVariant = !isCompromised && Boolean(leak.is_leaked_variant);
+            if (!password) {
+                return {
+                    score: 0, time_to_crack: 'instant', time_to_crack_seconds: 0,
+                    vulnerability_factors: ['Empty password'], suggestions: ['Create a password'],
+                    patterns_detected: [], entropy: 0, is_compromised: false, attack_vector: 'instant guess',
+                    ml_strength: null, is_leaked_variant: false
+                };
+            }
+            const chars = Array.from(password);
+            const classes = characterClasses(chars);
+            const spans = findSpans(password, chars);
+            const found = new Set(spans.map(span => span[2]));
+            const patterns = rules.pattern_order.filter(label => found.has(label));
+
+            const entropy = entropyOf(chars);
+            const charSetSize = sizes.lower * classes.lower + sizes.upper * classes.upper +
+                sizes.digit * classes.digit + sizes.special * classes.special;
+            // Overflows to Infinity where Python catches OverflowError and returns inf
+            const seconds = 10.0 ** (log10Guesses(chars, charSetSize, spans) - guesses.log10_attempts_per_second);
+
+            const factors = [];
+            if (isCompromised) factors.push('Password found in leaked database');
+            else if (isLeakedVariant) factors.push('Password is a simple variant of a leaked password');
+            if (chars.length < 8) factors.push('Password too short');
+            for (const pattern of patterns) factors.push(`Contains ${pattern.replaceAll('_', ' ')}`);
+
+            let base = Math.min(100, Math.max(0, entropy * score.entropy_weight));
+            if (isCompromised) base *= score.compromised_factor;
+            else if (isLeakedVariant) base *= score.leaked_variant_factor;
+            const penalty = Math.max(0, 1.0 - (patterns.length * score.pattern_penalty));
+
+            return {
+                score: Math.trunc(base * penalty),
+                time_to_crack: crackTime(seconds),
+                time_to_crack_seconds: seconds,
+                vulnerability_factors: factors,
+                suggestions: suggestionsFor(password, chars, classes, patterns),
+                patterns_detected: patterns,
+                entropy: entropy,
+                is_compromised: isCompromised,
+                attack_vector: attackVector(patterns, isCompromised, isLeakedVariant),
+                ml_strength: null,
+                is_leaked_variant: isLeakedVariant
+            };
+        }
+
+        // leak_variants.candidate_variants: canonical forms of a password to look up in
+        // the leak index, lowercased, without affixes and with leet substitutions reversed
+        const variantRules = rules.leak_variants;
+        const affixes = new Set(variantRules.affix_characters);
+        const readings = new Map();
+        for (const [letter, substitutes] of Object.entries(variantRules.substitutions)) {
+            for (const substitute of substitutes) {
+                if (!readings.has(substitute)) readings.set(substitute, []);
+                readings.get(substitute).push(letter);
+            }
+        }
+        const multiCharacter = [...readings].filter(([sub]) => Array.from(sub).length > 1)
+            .map(([sub, letters]) => [sub, letters[0]]);
+        const single = [...readings].filter(([sub]) => Array.from(sub).length === 1);
+        const primary = new Map(single.map(([sub, letters]) => [sub, letters[0]]));
+        const alternate = new Map(single.map(([sub, letters]) => [sub, letters[letters.length - 1]]));
+        const ambiguous = new Set(single.filter(([, letters]) => letters.length > 1).map(([sub]) => sub));
+
+        function stripEnd(chars) {
+            let end = chars.length;
+            while (end > 0 && affixes.has(chars[end - 1])) end--;
+            return chars.slice(0, end);
+        }
+
+        function stripStart(chars) {
+            let start = 0;
+            while (start < chars.length && affixes.has(chars[start])) start++;
+            return chars.slice(start);
+        }
+
+        function unleet(chars, table) {
+            let text = chars.join('');
+            for (const [substitute, letter] of multiCharacter) text = text.replaceAll(substitute, letter);
+            return Array.from(text, char => table.get(char) ?? char).join('');
+        }
+
+        function candidateVariants(password) {
+            if (!variantRules.enabled) return [];
+            const lowered = Array.from(password.toLowerCase());
+            const stripped = stripEnd(lowered);
+            const core = stripStart(stripped);
+            const candidates = [
+                lowered.join(''),
+                stripped.join(''),
+                unleet(stripped, primary),
+                unleet(lowered, primary),
+                stripEnd(Array.from(password)).join(''),  // Original case
+                core.join(''),
+                unleet(core, primary)
+            ];
+            if (stripped.some(char => ambiguous.has(char))) candidates.push(unleet(stripped, alternate));
+
+            const variants = [];
+            for (const candidate of candidates) {
+                if (Array.from(candidate).length >= variantRules.min_length && candidate !== password &&
+                        !variants.includes(candidate)) {
+                    variants.push(candidate);
+                    if (variants.length === variantRules.max_variants) break;
+                }
+            }
+            return variants;
+        }
+
+        // Python's str.is* predicates for one character, as the scorer evaluates them
+        const predicates = {
+            upper: char => UPPER.test(char),
+            lower: char => LOWER.test(char),
+            digit: isDigit,
+            decimal: char => DECIMAL.test(char),
+            alnum: char => ALNUM.test(char),
+            alpha: char => LETTER.test(char)
+        };
+
+        return { analyze, candidateVariants, predicates };
+    }
+
+    return { createScorer, RULES_VERSION };
+});
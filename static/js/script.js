@@ -27,6 +27,27 @@ document.addEventListener('DOMContentLoaded', function() {
     const generatedStrength = document.getElementById('generatedStrength');
     const generatedCrackTime = document.getElementById('generatedCrackTime');
 
+    // Browser scorer (static/js/analyzer.js): passwords are scored here, and the server is
+    // only asked for leak ranges and GenAI text. Until the rules load, the server scores them
+    let localScorer = null;
+    let leakStatus = { password: null };
+    let analysisCount = 0;
+    if (window.PasswordScorer) {
+        fetch('/static/js/analyzer-rules.json')
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Network response was not ok');
+                }
+                return response.json();
+            })
+            .then(rules => {
+                localScorer = PasswordScorer.createScorer(rules);
+            })
+            .catch(error => {
+                console.error('Error loading analyzer rules, scoring on the server:', error);
+            });
+    }
+
     // Toggle password visibility
     togglePasswordBtn.addEventListener('click', function() {
         const type = passwordInput.getAttribute('type') === 'password' ? 'text' : 'password';
@@ -40,9 +61,10 @@ document.addEventListener('DOMContentLoaded', function() {
         minScoreValue.textContent = this.value;
     });
 
-    // Password input handler with debounce
+    // Password input handler: live score on every keystroke, full analysis with debounce
     let debounceTimer;
     passwordInput.addEventListener('input', function() {
+        updateLiveScore(this.value);
         clearTimeout(debounceTimer);
         debounceTimer = setTimeout(() => {
             if (this.value.length > 0) {
@@ -78,6 +100,11 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Function to analyze password
     function analyzePassword(password) {
+        if (localScorer) {
+            analyzeLocally(password);
+            return;
+        }
+        
         // Show loading state
         showLoadingState();
         
@@ -105,6 +132,161 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Score in the browser with the last leak status the server gave for this password
+    function scoreLocally(password) {
+        return localScorer.analyze(password, leakStatus.password === password ? leakStatus : null);
+    }
+
+    // Show the local analysis at once, then rescore when the leak status arrives and add the GenAI text
+    function analyzeLocally(password) {
+        const analysis = ++analysisCount;
+        let genai = { reasoning: '<p><i class="bi bi-cpu"></i> AI is analyzing your password...</p>' };
+        const show = () => {
+            // Drop responses for a password that has since been replaced
+            if (analysis === analysisCount) {
+                displayResults(Object.assign(scoreLocally(password), genai));
+            }
+        };
+        show();
+        
+        checkLeaked(password)
+            .then(data => {
+                leakStatus = Object.assign({ password }, data);
+                show();
+            })
+            .catch(error => {
+                console.error('Error checking leaked passwords:', error);
+            });
+        
+        postJson('/analyze?fields=reasoning,improved_password,improvement_explanation', { password })
+            .then(data => {
+                genai = data;
+                show();
+            })
+            .catch(error => {
+                console.error('Error fetching AI analysis:', error);
+                genai = {};
+                show();
+            });
+    }
+
+    // Leak status without sending the password: hash it and its leaked-variant forms here,
+    // and look for each digest in the /range bucket named by its first five hex characters
+    const HASH_ALGORITHMS = { sha1: 'SHA-1', sha256: 'SHA-256' };
+    let leakHash = 'sha256';
+
+    function hexDigest(text, hashName) {
+        return crypto.subtle.digest(HASH_ALGORITHMS[hashName], new TextEncoder().encode(text))
+            .then(buffer => Array.from(new Uint8Array(buffer), byte => byte.toString(16).padStart(2, '0'))
+                .join('').toUpperCase());
+    }
+
+    function inLeakRange(text) {
+        const hashName = leakHash;
+        return hexDigest(text, hashName).then(hex => fetch(`/range/${hex.slice(0, 5)}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Network response was not ok');
+                }
+                const indexHash = response.headers.get('X-Hash-Algorithm');
+                if (indexHash !== hashName && HASH_ALGORITHMS[indexHash]) {
+                    // The index was built with another algorithm; hash again with it
+                    leakHash = indexHash;
+                    return inLeakRange(text);
+                }
+                return response.text().then(body => body.split('\r\n').includes(hex.slice(5)));
+            }));
+    }
+
+    function checkLeaked(password) {
+        if (!window.crypto || !crypto.subtle) {
+            // SubtleCrypto needs a secure context (HTTPS or localhost)
+            return Promise.reject(new Error('Hashing is unavailable on this page'));
+        }
+        return inLeakRange(password).then(isCompromised => {
+            if (isCompromised) {
+                return { is_compromised: true, is_leaked_variant: false };
+            }
+            return Promise.all(localScorer.candidateVariants(password).map(inLeakRange))
+                .then(found => ({ is_compromised: false, is_leaked_variant: found.includes(true) }));
+        });
+    }
+
+    function postJson(url, body) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(body),
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        });
+    }
+
+    // Incremental scoring session: the server reuses its state for the unchanged
+    // prefix, and any worker can answer since each update carries the whole value
+    let sessionId = null;
+    let sessionQueue = Promise.resolve();
+
+    function updateLiveScore(password) {
+        if (localScorer) {
+            analysisCount++;
+            if (password.length > 0) {
+                displayLiveScore(scoreLocally(password));
+            }
+            return;
+        }
+        
+        // Chain updates so edits reach the server in the order they were typed
+        sessionQueue = sessionQueue
+            .then(() => sessionId ? null : startSession())
+            .then(() => sendSessionEdit(password))
+            .catch(error => {
+                console.error('Error updating live score:', error);
+                // Start a fresh session on the next keystroke (e.g. after it expired)
+                sessionId = null;
+            });
+    }
+
+    function startSession() {
+        return fetch('/session', { method: 'POST' })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Network response was not ok');
+                }
+                return response.json();
+            })
+            .then(data => {
+                sessionId = data.session_id;
+            });
+    }
+
+    function sendSessionEdit(password) {
+        return fetch(`/session/${sessionId}?mode=lite`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ password: password }),
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        })
+        .then(data => {
+            if (password.length > 0 && passwordInput.value === password) {
+                displayLiveScore(data);
+            }
+        });
+    }
+
     // Function to generate secure password
     function generateSecurePassword(minScore, timeThresholdDays) {
         // Show loading state for generated password
@@ -147,12 +329,8 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
-    // Function to display results
-    function displayResults(data) {
-        resultsContainer.classList.remove('d-none');
-        
-        // Update strength meter
-        const score = data.score;
+    // Update the strength meter for a 0-100 score
+    function updateStrengthMeter(score) {
         let color;
         
         if (score < 30) color = "#ff4d4d"; // Red
@@ -163,6 +341,22 @@ document.addEventListener('DOMContentLoaded', function() {
         strengthMeter.style.width = `${score}%`;
         strengthMeter.style.backgroundColor = color;
         strengthText.textContent = `${score}%`;
+    }
+
+    // Show the live score while the full analysis is pending
+    function displayLiveScore(data) {
+        resultsContainer.classList.remove('d-none');
+        updateStrengthMeter(data.score);
+        timeToCrack.textContent = data.time_to_crack;
+        attackVector.textContent = data.attack_vector;
+    }
+
+    // Function to display results
+    function displayResults(data) {
+        resultsContainer.classList.remove('d-none');
+        
+        // Update strength meter
+        updateStrengthMeter(data.score);
         
         // Update time to crack and attack vector
         timeToCrack.textContent = data.time_to_crack;
@@ -0,0 +1,20 @@
+# Shared fixtures - An analyzer on the built-in word list and leak list, and a Flask test client
+
+import pytest
+
+from models.password_analyzer import PasswordAnalyzer
+
+
+@pytest.fixture
+def analyzer():
+    """An analyzer with no data files: built-in common words, which double as the leak list"""
+    return PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=None)
+
+
+@pytest.fixture
+def client():
+    """A test client for app.py, whose analyzer uses the same built-in lists"""
+    pytest.importorskip("flask")
+    import app
+
+    return app.app.test_client()
@@ -0,0 +1,46 @@
+import csv
+import gzip
+import hashlib
+import json
+
+import audit
+
+
+def test_audit_writes_the_report_and_histograms(tmp_path):
+    passwords = tmp_path / "passwords.txt.gz"
+    with gzip.open(passwords, "wb") as handle:
+        handle.write(b"  120 password\n    3 Xq7!mWz2rT#kL9\nnot counted\n    7 \xff\xfe\n    5 123456\n")
+    report, summary = tmp_path / "report.csv", tmp_path / "summary.json"
+
+    assert audit.main([str(passwords), "--format", "counts", "-o", str(report), "--summary", str(summary),
+                       "--workers", "2", "--chunk-size", "1",
+                       "--leak-db", str(tmp_path / "missing.db"), "--dictionary", str(tmp_path / "missing.txt")]) == 0
+
+    with open(report, newline="", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["password_sha256"] for row in rows] == [
+        hashlib.sha256(password).hexdigest() for password in (b"password", b"Xq7!mWz2rT#kL9", b"123456")]
+    assert [int(row["count"]) for row in rows] == [120, 3, 5]
+    assert [row["is_compromised"] for row in rows] == ["True", "False", "True"]
+
+    result = json.loads(summary.read_text())
+    assert (result["passwords"], result["distinct_passwords"], result["compromised"]) == (128, 3, 125)
+    assert result["skipped_lines"] == {"malformed_lines": 1, "undecodable_lines": 1}
+    # Histograms are weighted by each password's count
+    assert sum(result["score_buckets"].values()) == sum(result["attack_vectors"].values()) == 128
+    assert result["score_buckets"][audit._score_bucket(int(rows[0]["score"]))] >= 120
+    assert list(result["score_buckets"]) == sorted(result["score_buckets"], key=lambda bucket: int(bucket.split("-")[0]))
+
+
+def test_jsonl_reports_can_include_the_passwords(tmp_path):
+    passwords, report = tmp_path / "passwords.txt", tmp_path / "report.jsonl"
+    passwords.write_text("letmein\n\nletmein\n")
+    audit.main([str(passwords), "-o", str(report), "--include-passwords", "--workers", "1",
+                "--leak-db", str(tmp_path / "missing.db"), "--dictionary", str(tmp_path / "missing.txt")])
+    rows = [json.loads(line) for line in report.read_text().splitlines()]
+    assert [(row["password"], row["count"]) for row in rows] == [("letmein", 1), ("letmein", 1)]
+
+
+def test_score_buckets():
+    assert [audit._score_bucket(score) for score in (0, 9, 10, 89, 90, 100)] == [
+        "0-9", "0-9", "10-19", "80-89", "90-100", "90-100"]
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+import app as wsgi  # noqa: E402
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+@pytest.mark.parametrize("body, error", [
+    (["password"], "The body must be a JSON object with a passwords list"),
+    ({"passwords": "password"}, "passwords must be a list of strings"),
+    ({"passwords": ["password", 3]}, "passwords must be a list of strings"),
+    ({"passwords": ["x" * (wsgi.MAX_PASSWORD_LENGTH + 1)]},
+     f"Passwords may be at most {wsgi.MAX_PASSWORD_LENGTH} characters"),
+    ({"passwords": ["a"] * (wsgi.MAX_BATCH_SIZE + 1)}, f"At most {wsgi.MAX_BATCH_SIZE} passwords per request"),
+])
+def test_bad_json_batches_are_rejected_before_streaming(client, body, error):
+    response = client.post("/analyze_batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_bad_ndjson_lines_get_error_records(client):
+    body = '"abc"\n{bad\n5\n\n{"password": "password"}\n"' + "y" * 300 + '"\n'
+    response = client.post("/analyze_batch?mode=lite", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200
+    lines = _lines(response)
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert "score" in lines[0] and "score" in lines[3]
+    assert lines[1]["error"] == "Invalid JSON line"
+    assert lines[2]["error"] == "password must be a string"
+    assert lines[4]["error"] == f"password may be at most {wsgi.MAX_PASSWORD_LENGTH} characters"
+
+
+def test_ndjson_batches_stop_at_the_limit():
+    items = list(wsgi._ndjson_items(['"a"'] * (wsgi.MAX_BATCH_SIZE + 5)))
+    assert len(items) == wsgi.MAX_BATCH_SIZE + 1
+    assert items[-1] == (None, f"At most {wsgi.MAX_BATCH_SIZE} passwords per request")
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from benchmarks import genai_bench, suite
+from benchmarks.corpora import CORPORA
+
+
+def test_a_small_suite_run_writes_and_compares_results(tmp_path):
+    pytest.importorskip("flask")
+    output = tmp_path / "results.json"
+    assert suite.main(["--size", "20", "--rounds", "1", "--no-memory", "--flask", "-o", str(output)]) == 0
+
+    report = json.loads(output.read_text())
+    assert report["format_version"] == suite.FORMAT_VERSION
+    assert report["meta"]["corpora"] == {name: 20 for name in CORPORA}
+    results = report["results"]
+    for name in suite.PER_PASSWORD_BENCHMARKS:
+        assert results[f"{name}[short]"]["p50_us"] > 0
+    assert results["analyze_many[short]"]["items_per_second"] > 0
+    assert {"generate[random]", "flask_generate", "flask_analyze[long]", "flask_analyze_batch[long]"} <= set(results)
+
+    # Against itself nothing regresses; against a run ten times faster everything does
+    assert suite.main(["--size", "20", "--rounds", "1", "--no-memory", "--only", "extract_features",
+                       "--baseline", str(output), "--tolerance", "100"]) == 0
+    for metrics in results.values():
+        for metric in ("p50_us", "items_per_second"):
+            if metric in metrics:
+                metrics[metric] *= 10 if metric == "items_per_second" else 0.1
+    output.write_text(json.dumps(report))
+    assert suite.main(["--size", "20", "--rounds", "1", "--no-memory", "--only", "extract_features",
+                       "--baseline", str(output)]) == 1
+
+
+def test_the_genai_benchmark_runs(capsys):
+    assert genai_bench.main(["--passwords", "20", "--rounds", "1"]) == 0
+    assert capsys.readouterr().out.startswith("current:")
@@ -0,0 +1,36 @@
+import shutil
+
+import pytest
+
+from benchmarks.corpora import CORPORA
+from models.client_export import compare_results, run_scorer, write_rules
+from models.leak_variants import candidate_variants
+
+NODE = shutil.which("node")
+pytestmark = pytest.mark.skipif(NODE is None, reason="node is not installed")
+
+# Inputs the generated corpora rarely produce
+EDGE_CASES = ["", "a", "aaa", "aaaab\n\n\nbbb", "x" * 2000, "密码安全", "Пароль2024!", "😀😀😀🔒", "ǅemal1990",
+              "İstanbul", "ﬀ1231", "0101", "12/31/1999", "qwertyuiop", "Password1999!" * 10, "p@ssw0rd",
+              "Summer2024", "letmein!!", "123456789", "!!P@ssw0rd2024!", "he11o", "f()()t", "WELCOME1"]
+
+
+def test_browser_scorer_matches_the_server(analyzer, tmp_path):
+    rules = str(tmp_path / "analyzer-rules.json")
+    write_rules(analyzer, rules)
+
+    passwords = EDGE_CASES + [password for generate in CORPORA.values() for password in generate(200, 3)]
+    cases = []
+    for password in passwords:
+        is_compromised, is_leaked_variant = analyzer.leak_status(password) if password else (False, False)
+        cases.append({"password": password, "is_compromised": is_compromised, "is_leaked_variant": is_leaked_variant})
+    output = run_scorer(cases, rules, NODE)
+
+    mismatches = {}
+    for password, actual, variants in zip(passwords, output["results"], output["variants"]):
+        differing = compare_results(analyzer.analyze_password(password, include_ml_strength=False).__dict__, actual)
+        if variants != candidate_variants(password):
+            differing.append("candidate_variants")
+        if differing:
+            mismatches[password] = differing
+    assert mismatches == {}
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("flask")
+import app as wsgi  # noqa: E402
+
+
+def fail(name):
+    def skipped(*args, **kwargs):
+        pytest.fail(f"{name} ran for a field that wasn't requested")
+    return skipped
+
+
+class FailingModel:
+    predict_proba = predict_proba_one = strength = staticmethod(fail("the ML model"))
+
+
+@pytest.fixture
+def skipped_parts(monkeypatch):
+    """Make every optional part of an analysis fail the test if it runs"""
+    monkeypatch.setattr(wsgi.analyzer, "ml_model", FailingModel())
+    monkeypatch.setattr(wsgi.analyzer, "_generate_suggestions", fail("suggestions"))
+    monkeypatch.setattr(wsgi.genai, "generate_suggestion", fail("the GenAI suggestion"))
+    monkeypatch.setattr(wsgi.genai, "generate_reason_for_weakness", fail("the GenAI reasoning"))
+    return monkeypatch
+
+
+def test_lite_mode_computes_only_the_score(client, skipped_parts):
+    response = client.post("/analyze?mode=lite", json={"password": "lite-Mode-4711"})
+    assert response.status_code == 200
+    assert set(response.get_json()) == {"score", "time_to_crack", "attack_vector"}
+
+
+def test_fields_compute_only_what_they_name(client, skipped_parts):
+    skipped_parts.setattr(wsgi.genai, "generate_reason_for_weakness", lambda *args: "Too predictable")
+
+    response = client.post("/analyze?fields=score, reasoning", json={"password": "fields-Pick-4711"})
+    assert response.get_json() == {"score": response.get_json()["score"], "reasoning": "Too predictable"}
+
+
+def test_the_full_mode_returns_every_field(client):
+    data = client.post("/analyze", json={"password": "every-Field-4711"}).get_json()
+    assert set(data) == set(wsgi.RESULT_FIELDS + wsgi.GENAI_FIELDS)
+    assert client.post("/analyze?fields=score,suggestions", json={"password": ""}).get_json() == {
+        "score": 0, "suggestions": ["Please enter a password"]}
+
+
+@pytest.mark.parametrize("query, error", [
+    ("fields=score,bogus", "Unknown fields: bogus"),
+    ("mode=turbo", 'mode must be "full" or "lite"'),
+])
+def test_bad_field_selections_are_rejected(client, query, error):
+    response = client.post(f"/analyze?{query}", json={"password": "abc"})
+    assert response.status_code == 400 and response.get_json() == {"error": error}
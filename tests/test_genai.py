@@ -0,0 +1,23 @@
+import re
+
+import pytest
+
+from models.genai import PasswordGenAI
+
+# The GenAI text's original checks, which count only ASCII letters and digits
+ASCII_CHECKS = {
+    "has_lowercase": re.compile(r"[a-z]"),
+    "has_uppercase": re.compile(r"[A-Z]"),
+    "has_digit": re.compile(r"[0-9]"),
+    "has_special": re.compile(r"[^a-zA-Z0-9]"),
+    "has_word": re.compile(r"[a-zA-Z]{4,}"),
+}
+
+
+@pytest.mark.parametrize("password", ["Straße٣", "ÉCOLE", "naïveté", "пароль", "漢字12", "İstanbul!", "abcd",
+                                      "Tr0ub4dor&3", ""])
+def test_character_classes_count_only_ascii(password):
+    genai = PasswordGenAI()
+    patterns = genai._identify_patterns(genai.extract_features(password))
+    assert {name: patterns[name] for name in ASCII_CHECKS} == {
+        name: check.search(password) is not None for name, check in ASCII_CHECKS.items()}
@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip("flask")
+import app as wsgi  # noqa: E402
+
+
+def test_local_genai_runs_without_the_event_loop(client, monkeypatch):
+    assert wsgi.genai.backend is None
+
+    def submit(coroutine):
+        coroutine.close()
+        raise AssertionError("local GenAI text was queued on the event loop")
+
+    monkeypatch.setattr(wsgi.genai_runner, "submit", submit)
+    response = client.post("/analyze", json={"password": "summer2024"})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["reasoning"] and data["improved_password"] and data["improvement_explanation"]
+
+    stream = client.post("/analyze?stream=true", json={"password": "summer2024"})
+    assert stream.get_data(as_text=True).count("event: genai") == 2
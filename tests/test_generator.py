@@ -0,0 +1,50 @@
+import pytest
+
+from models.generator import (DIGITS, FULL_CHAR_SET_SIZE, LOWERCASE, MAX_LENGTH, MIN_PASSPHRASE_VOCABULARY,
+                              SPECIALS, UPPERCASE, PasswordGenerator)
+from models.guesses import brute_force_log10_guesses, seconds_from_log10_guesses
+
+
+def test_passphrases_fall_back_to_the_bundled_wordlist(analyzer):
+    generator = PasswordGenerator(analyzer)
+    assert len(generator.dictionary_vocabulary) < MIN_PASSPHRASE_VOCABULARY
+    assert len(generator.passphrase_vocabulary) >= MIN_PASSPHRASE_VOCABULARY
+
+    threshold = 86400 * 365
+    [(passphrase, result)] = generator.generate_passphrase(min_score=60, time_threshold_seconds=threshold)
+    assert result.score >= 60 and result.time_to_crack_seconds >= threshold
+    # The crack time is never longer than a wordlist attack takes
+    words = sum(1 for char in passphrase if char.isupper())
+    assert result.time_to_crack_seconds <= generator._wordlist_seconds(generator.passphrase_vocabulary, words)
+
+
+def test_generate_passphrase_route(client):
+    response = client.post("/generate", json={"mode": "passphrase", "count": 2})
+    assert response.status_code == 200
+    assert len(response.get_json()["passwords"]) == 2
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"time_threshold_days": "forever"}, "time_threshold_days must be a non-negative number"),
+    ({"time_threshold_days": -1}, "time_threshold_days must be a non-negative number"),
+    ({"min_score": "high"}, "min_score must be a number between 0 and 100"),
+    ({"min_score": True}, "min_score must be a number between 0 and 100"),
+    ({"count": 0}, "count must be between 1 and 100"),
+    ({"count": True}, "count must be between 1 and 100"),
+])
+def test_bad_generate_options_are_rejected(client, body, error):
+    response = client.post("/generate", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_random_passwords_of_the_maximum_length_use_every_class(analyzer):
+    generator = PasswordGenerator(analyzer)
+    threshold = seconds_from_log10_guesses(brute_force_log10_guesses(MAX_LENGTH, FULL_CHAR_SET_SIZE))
+    generated = generator.generate(min_score=0, time_threshold_seconds=threshold, count=100)
+    for password, result in generated:
+        assert len(password) == len(set(password)) == MAX_LENGTH
+        assert all(any(char in alphabet for char in password)
+                   for alphabet in (LOWERCASE, UPPERCASE, DIGITS, SPECIALS))
+        assert not any(a in DIGITS and b in DIGITS for a, b in zip(password, password[1:]))
+        assert result.patterns_detected == [] and result.time_to_crack_seconds >= threshold
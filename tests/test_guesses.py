@@ -0,0 +1,82 @@
+import math
+import time
+
+import pytest
+
+from models.guesses import GuessEstimator, brute_force_log10_guesses, combine_log10_guesses
+
+
+def test_brute_force_matches_charset_power():
+    # One token: log10(1! * 26^8 + 10000^0)
+    assert brute_force_log10_guesses(8, 26) == pytest.approx(math.log10(26 ** 8 + 1))
+
+
+@pytest.mark.parametrize("password", ["密码安全", "日本", "กขค"])
+def test_caseless_letters_have_no_alphabet_but_still_score(analyzer, password):
+    # None of the four classes apply, so char_set_size is 0
+    features = analyzer.extract_features(password)
+    assert features.char_set_size == 0
+    assert math.isfinite(brute_force_log10_guesses(len(password), 0))
+    assert math.isfinite(GuessEstimator(10).log10_guesses(password, 0, []))
+
+    result = analyzer.analyze_password(password)
+    assert result.time_to_crack == "0.00 seconds"
+    assert result.score == int(min(100, result.entropy * analyzer.ENTROPY_SCORE_WEIGHT))
+
+
+def test_caseless_letters_in_batches(analyzer):
+    passwords = ["密码安全", "password", "密码安全"]
+    results = list(analyzer.analyze_many(passwords))
+    assert [result.score for result in results] == [analyzer.analyze_password(p).score for p in passwords]
+
+
+def test_caseless_letters_over_http(client):
+    response = client.post("/analyze", json={"password": "密码安全"})
+    assert response.status_code == 200
+    assert response.get_json()["score"] == 40
+
+
+def test_pruned_search_matches_the_exhaustive_one_on_short_passwords(analyzer):
+    # With few tokens no position has more than MAX_COVER_STATES covers, and
+    # dropping dominated covers never changes the result
+    estimator = analyzer.guess_estimator
+    for password in ["password123", "qwerty1999aaa", "Summer2024!!!", "123123letmein"]:
+        features = analyzer.extract_features(password)
+        assert estimator.log10_guesses(password, features.char_set_size, features.pattern_spans) == \
+            exhaustive_log10_guesses(estimator, password, features.char_set_size, features.pattern_spans)
+
+
+def test_search_time_grows_linearly(analyzer):
+    estimator = analyzer.guess_estimator
+    spans = {}
+    for length in (2000, 8000):
+        password = ("123qwerty1999aaa" * length)[:length]
+        spans[length] = password, analyzer.extract_features(password).pattern_spans
+        estimator.log10_guesses(password, 62, spans[length][1])  # Warms the factorial table
+    elapsed = {}
+    for length, (password, found) in spans.items():
+        start = time.perf_counter()
+        estimator.log10_guesses(password, 62, found)
+        elapsed[length] = time.perf_counter() - start
+    assert elapsed[8000] < 8 * elapsed[2000]
+
+
+def exhaustive_log10_guesses(estimator, password, char_set_size, spans):
+    """Every (token count, ends in brute force) state at every position, as before pruning"""
+    char_cost = math.log10(max(char_set_size, 1))
+    by_start = [[] for _ in password]
+    for end, tokens in enumerate(estimator._candidates(password, spans)):
+        for start, cost in tokens:
+            by_start[start].append((end, cost))
+    best = [{} for _ in range(len(password) + 1)]
+    best[0][(0, False)] = (0.0, 0.0, 0)
+    for position in range(len(password)):
+        for (count, in_gap), (product, token_part, gap_length) in best[position].items():
+            moves = [(position + 1, (count if in_gap else count + 1, True), product + char_cost, token_part, gap_length + 1)]
+            moves += [(end, (count + 1, False), product + cost, token_part + cost, gap_length)
+                      for end, cost in by_start[position]]
+            for end, key, new_product, new_token_part, new_gap_length in moves:
+                if key not in best[end] or new_product < best[end][key][0]:
+                    best[end][key] = (new_product, new_token_part, new_gap_length)
+    return min(combine_log10_guesses(count, token_part + gap_length * char_cost)
+               for (count, _), (_, token_part, gap_length) in best[-1].items())
@@ -0,0 +1,49 @@
+import random
+
+from models import incremental
+from models.guesses import extend_covers
+from models.incremental import AnalysisSession
+
+
+def test_session_results_equal_full_analyses(analyzer):
+    rng = random.Random(5)
+    pieces = ["pass", "word", "qwerty", "123", "2024", "1231", "aa", "a", "!", "Ž", "İ", "ß", "\n", "7"]
+    session = AnalysisSession(analyzer)
+    for _ in range(600):
+        action = rng.random()
+        if action < 0.55 and len(session) < 48:
+            session.append(rng.choice(pieces))
+        elif action < 0.85:
+            session.delete(rng.randint(1, 4))
+        else:
+            # Replace with an edit in the middle, as a paste would
+            password = session.password
+            cut = rng.randint(0, len(password))
+            session.set_password(password[:cut] + rng.choice(pieces) + password[cut:])
+        expected = analyzer.analyze_password(session.password, include_suggestions=False)
+        assert session.result() == expected, session.password
+
+
+def test_each_keystroke_only_extends_the_guess_search(analyzer, monkeypatch):
+    extended = []
+    monkeypatch.setattr(incremental, "extend_covers",
+                        lambda covers, *args: extended.append(len(covers)) or extend_covers(covers, *args))
+    session = AnalysisSession(analyzer)
+    alphabets = set()
+    for char in "Password1999!" * 20:
+        session.append(char)
+        extended.clear()
+        session.result()
+        alphabet = session.features().char_set_size
+        if alphabet in alphabets:
+            # One step for the newest prefix, one for the whole password
+            assert len(extended) == 2
+        else:
+            # A new alphabet changes every brute-force cost, so its covers start over
+            assert len(extended) == len(session)
+            alphabets.add(alphabet)
+
+    session.delete(5)
+    extended.clear()
+    session.result()
+    assert extended == [len(session)]
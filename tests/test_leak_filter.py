@@ -0,0 +1,57 @@
+import hashlib
+
+import pytest
+
+from models.leak_filter import BloomFilter, FilteredLeakIndex, build_filter, open_index, parameters_for
+from models.leak_index import main
+from models.leak_segments import create_store
+
+LEAKED = ["password", "123456", "letmein", "correct horse"] + [f"user{n}" for n in range(2000)]
+
+
+def test_bloom_prefilter_gives_the_same_answers(tmp_path):
+    wordlist = tmp_path / "leaked.txt"
+    wordlist.write_text("\n".join(LEAKED), encoding="utf-8")
+    path = str(tmp_path / "leaked.idx")
+    main(["build", str(wordlist), "-o", path, "--bloom-fpr", "0.01"])
+    index = open_index(path)
+    assert isinstance(index, FilteredLeakIndex)
+    assert all(index.contains(index.digest(password)) for password in LEAKED)
+    assert not any(index.contains(index.digest(f"clean{n}")) for n in range(500))
+
+
+def test_the_filter_stays_near_its_target_rate(tmp_path):
+    leaked = [hashlib.sha256(f"leaked{n}".encode()).digest() for n in range(20000)]
+    path = build_filter(leaked, len(leaked), str(tmp_path / "leaked.bloom"), 0.01, b"build")
+    bloom = BloomFilter(path)
+    assert bloom.build_id == b"build".ljust(16, b"\0").hex() and bloom.count == len(leaked)
+    assert all(bloom.might_contain(digest) for digest in leaked)
+    clean = [hashlib.sha256(f"clean{n}".encode()).digest() for n in range(20000)]
+    observed = sum(map(bloom.might_contain, clean)) / len(clean)
+    assert observed < 0.015 and bloom.estimated_false_positive_rate() < 0.015
+    bloom.close()
+
+
+def test_filters_from_another_build_are_ignored(tmp_path):
+    wordlist = tmp_path / "leaked.txt"
+    wordlist.write_text("\n".join(LEAKED), encoding="utf-8")
+    path = str(tmp_path / "leaked.idx")
+    main(["build", str(wordlist), "-o", path, "--bloom-fpr", "0.01"])
+    stale = (tmp_path / "leaked.idx.bloom").read_bytes()
+    main(["build", str(wordlist), "-o", path])
+    (tmp_path / "leaked.idx.bloom").write_bytes(stale)
+    index = open_index(path)
+    assert not isinstance(index, FilteredLeakIndex) and index.contains(index.digest("letmein"))
+    index.close()
+
+
+@pytest.mark.parametrize("rate", [0, -0.1, 1, 1.5])
+def test_unusable_false_positive_rates_are_rejected(tmp_path, rate):
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        parameters_for(1000, rate)
+    with pytest.raises(SystemExit):
+        main(["build", str(tmp_path / "missing.txt"), "-o", str(tmp_path / "leaked.idx"), "--bloom-fpr", str(rate)])
+    assert not (tmp_path / "leaked.idx").exists()
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        create_store(str(tmp_path / "store"), bloom_fpr=rate)
+    assert not (tmp_path / "store").exists()
@@ -0,0 +1,44 @@
+import hashlib
+
+import pytest
+
+from models.leak_index import LeakIndex, main
+
+LEAKED = ["password", "123456", "letmein", "correct horse", "пароль", "密码"] + [f"user{n}" for n in range(2000)]
+
+
+@pytest.fixture(params=["sha256", "sha1"])
+def built(request, tmp_path):
+    wordlist = tmp_path / "leaked.txt"
+    # Duplicates and a blank line, as real dumps have
+    wordlist.write_text("\n".join(LEAKED + LEAKED[:50]) + "\n\n", encoding="utf-8")
+    path = str(tmp_path / "leaked.idx")
+    assert main(["build", str(wordlist), "-o", path, "--hash", request.param, "--chunk-size", "300"]) == 0
+    index = LeakIndex(path)
+    yield index, request.param
+    index.close()
+
+
+def test_built_index_is_sorted_and_deduplicated(built):
+    index, hash_name = built
+    digests = list(index)
+    assert digests == sorted({getattr(hashlib, hash_name)(pwd.encode()).digest() for pwd in LEAKED})
+    assert len(index) == len(LEAKED)
+
+
+def test_lookups(built):
+    index, _ = built
+    assert all(index.digest(password) in index for password in LEAKED)
+    assert not index.contains(index.digest("not leaked"))
+    queried = [index.digest(pwd) for pwd in ["password", "user1999", "user2000", "nope"]]
+    assert index.contains_many(queried) == set(queried[:2])
+
+
+def test_prefix_ranges(built):
+    index, _ = built
+    for digest in list(index)[::97]:
+        prefix = digest.hex()[:5]
+        expected = [other for other in index if other.hex().startswith(prefix)]
+        assert index.digests_with_prefix(prefix.upper()) == expected
+    with pytest.raises(ValueError):
+        index.digests_with_prefix("xyz12")
@@ -0,0 +1,43 @@
+import logging
+import time
+
+from models import leak_segments
+from models.leak_segments import BackgroundCompactor, SegmentedLeakIndex, create_store, ingest
+
+
+def write_list(path, passwords):
+    path.write_text("".join(f"{password}\n" for password in passwords))
+    return str(path)
+
+
+def test_a_manifest_that_keeps_changing_keeps_the_current_segments(tmp_path, monkeypatch):
+    store = str(tmp_path / "store")
+    create_store(store, bloom_fpr=None)
+    ingest(store, [write_list(tmp_path / "first.txt", ["hunter2"])])
+    index = SegmentedLeakIndex(store, check_interval=0)
+    assert index.contains(index.digest("hunter2"))
+
+    ingest(store, [write_list(tmp_path / "second.txt", ["letmein"])])
+
+    def vanished(path):
+        raise FileNotFoundError(path)
+
+    # Every segment disappears as soon as the manifest is read, so refresh gives up
+    monkeypatch.setattr(leak_segments, "open_index", vanished)
+    assert index.contains(index.digest("hunter2"))
+    assert index.segment_count == 1
+
+    monkeypatch.undo()
+    assert index.contains(index.digest("letmein"))
+    assert index.segment_count == 2
+
+
+def test_compaction_failures_are_logged(tmp_path, caplog):
+    compactor = BackgroundCompactor(str(tmp_path / "missing"), interval=0.01)
+    with caplog.at_level(logging.WARNING, logger="models.leak_segments"):
+        compactor.start()
+        deadline = time.monotonic() + 5
+        while not caplog.records and time.monotonic() < deadline:
+            time.sleep(0.01)
+        compactor.stop()
+    assert caplog.records[0].getMessage().startswith("Leak store compaction failed")
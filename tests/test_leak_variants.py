@@ -0,0 +1,47 @@
+import pytest
+
+from models.genai import PasswordGenAI
+from models.leak_variants import LEET_SUBSTITUTIONS, MAX_VARIANTS, MIN_VARIANT_LENGTH, candidate_variants
+from models.password_analyzer import IMPROVEMENT_SUBSTITUTIONS
+
+
+def test_affixes_are_stripped_in_both_directions():
+    variants = candidate_variants("!!P@ssw0rd2024!")
+    assert "p@ssw0rd" in variants          # Lowercased core
+    assert "password" in variants          # Leet reversed too
+    assert "!!P@ssw0rd" in variants        # Original case, suffix only
+    assert variants.index("!!p@ssw0rd") < variants.index("p@ssw0rd")
+
+
+def test_ambiguous_substitutes_get_both_readings():
+    # '1' reads as i first and l second
+    variants = candidate_variants("he11o")
+    assert "heiio" in variants and "hello" in variants
+
+
+def test_multi_character_substitutes_are_reversed():
+    assert "foot" in candidate_variants("f()()t")
+
+
+@pytest.mark.parametrize("password", ["aB3$", "1234", "!!!!ab", "Ab1!"])
+def test_short_canonical_forms_are_dropped(password):
+    assert all(len(variant) >= MIN_VARIANT_LENGTH for variant in candidate_variants(password))
+
+
+def test_variants_never_include_the_password_or_repeat():
+    for password in ["password", "Password1!", "P@55w0rd!!", "hunter2"]:
+        variants = candidate_variants(password)
+        assert password not in variants
+        assert len(set(variants)) == len(variants)
+
+
+def test_variants_are_capped():
+    # Every candidate is distinct here, including the alternate reading of '1'
+    password = "#1L!$+()9X2024?"
+    variants = candidate_variants(password)
+    assert len(variants) == MAX_VARIANTS
+
+
+def test_substitutions_come_from_one_table():
+    assert PasswordGenAI().substitutions == LEET_SUBSTITUTIONS
+    assert all(sub in LEET_SUBSTITUTIONS[letter] for letter, sub in IMPROVEMENT_SUBSTITUTIONS.items())
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from models.llm_backend import HTTPLLMBackend, LLMBackend, LLMError
+
+
+def http_response(body, status=200):
+    return b"HTTP/1.1 %d Status\r\nContent-Length: %d\r\n\r\n" % (status, len(body)) + body
+
+
+def completion(text):
+    return http_response(json.dumps({"choices": [{"message": {"content": f" {text} "}}]}).encode())
+
+
+class Upstream:
+    """A local chat completions endpoint that answers request n with replies[n] after `delay` seconds
+
+    A reply of None closes the connection without answering.
+    """
+
+    def __init__(self, *replies, delay=0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.prompts = []
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(re.search(rb"Content-Length: (\d+)", head).group(1))
+                self.prompts.append(json.loads(await reader.readexactly(length))["messages"][0]["content"])
+                reply = self.replies.pop(0)
+                await asyncio.sleep(self.delay)
+                if reply is None:
+                    break
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1/chat/completions"
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+
+
+def test_the_interface_is_abstract():
+    with pytest.raises(TypeError):
+        LLMBackend()
+
+
+def test_identical_prompts_share_one_request():
+    async def scenario():
+        upstream = Upstream(completion("first"), completion("second"), delay=0.1)
+        async with upstream as url:
+            backend = HTTPLLMBackend(url)
+            results = await asyncio.gather(*(backend.complete(prompt) for prompt in ["a", "a", "b", "a"]))
+            await backend.close()
+        return upstream, backend, results
+
+    upstream, backend, results = asyncio.run(scenario())
+    assert results == ["first", "first", "second", "first"]
+    assert upstream.prompts == ["a", "b"]
+    assert (backend.requests, backend.coalesced) == (2, 2)
+
+
+def test_a_cancelled_request_fails_the_callers_that_joined_it():
+    async def scenario():
+        async with Upstream(completion("late"), completion("again"), delay=0.5) as url:
+            backend = HTTPLLMBackend(url)
+            leader = asyncio.ensure_future(backend.complete("a"))
+            await asyncio.sleep(0.05)
+            joined = asyncio.ensure_future(backend.complete("a"))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            with pytest.raises(LLMError, match="completion cancelled"):
+                await joined
+            # The next call starts a new request
+            assert await backend.complete("a") == "again"
+
+    asyncio.run(scenario())
+
+
+def test_slow_backends_time_out():
+    async def scenario():
+        async with Upstream(completion("late"), delay=1) as url:
+            backend = HTTPLLMBackend(url, timeout=0.1)
+            with pytest.raises(LLMError, match="TimeoutError"):
+                await backend.complete("a")
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("reply, error", [
+    (http_response(b'{"error": "overloaded"}', 503), "backend returned HTTP 503"),
+    (http_response(b"<html>Bad gateway</html>"), "unexpected response format"),
+    (http_response(b'{"choices": []}'), "unexpected response format"),
+    (http_response(b'{"choices": [{"message": {"content": null}}]}'), "unexpected response format"),
+    (b"garbage\r\n\r\n", "completion failed"),
+    (None, "connection closed before response"),
+])
+def test_bad_responses_raise_llm_errors(reply, error):
+    async def scenario():
+        async with Upstream(reply, completion("fine")) as url:
+            backend = HTTPLLMBackend(url)
+            with pytest.raises(LLMError, match=error):
+                await backend.complete("a")
+            # A broken connection is not reused
+            assert await backend.complete("b") == "fine"
+            await backend.close()
+
+    asyncio.run(scenario())
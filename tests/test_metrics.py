@@ -0,0 +1,87 @@
+import re
+import threading
+import time
+
+import pytest
+
+from models.metrics import MetricsRegistry
+from models.profiler import SamplingProfiler
+
+
+def test_render_in_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["path"])
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    registry.callback("queue_depth", "Queued tasks", "gauge", [], lambda: [((), 7)])
+    with pytest.raises(ValueError, match="Duplicate metric requests_total"):
+        registry.counter("requests_total", "Again")
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{path="/a\\"b"} 3' in lines
+    assert lines[lines.index("# TYPE latency_seconds histogram") + 1:][:5] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+    assert lines[-2:] == ["# TYPE queue_depth gauge", "queue_depth 7"]
+
+
+def request_count(client, route):
+    text = client.get("/metrics").get_data(as_text=True)
+    match = re.search(r'^http_request_seconds_count\{route="%s",method="POST",status="200"\} (\d+)$' % route,
+                      text, re.M)
+    return int(match.group(1)) if match else 0
+
+
+def test_metrics_count_requests_and_analysis_stages(client):
+    before = request_count(client, "/analyze")
+    assert client.post("/analyze?mode=lite", json={"password": "Xq7!mWz2rT"}).status_code == 200
+    assert request_count(client, "/analyze") == before + 1
+
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    for series in ('password_stage_seconds_count{component="analyzer",stage="leak_check"}',
+                   'password_leak_checks_total{result="clean"}', 'password_cache_events_total{event="misses"}'):
+        assert series in text
+
+
+def test_profiles_are_only_served_with_the_token(client, monkeypatch):
+    import app as wsgi
+
+    monkeypatch.setattr(wsgi, "PROFILER_TOKEN", "s3cret")
+    assert "X-Profile-Id" not in client.post("/analyze", json={"password": "abc"}).headers
+    response = client.post("/analyze", json={"password": "abc"}, headers={"X-Profile": "s3cret"})
+    profile_id = response.headers["X-Profile-Id"]
+
+    assert client.get(f"/debug/profile/{profile_id}").status_code == 404
+    assert client.get(f"/debug/profile/{profile_id}", headers={"X-Profile": "wrong"}).status_code == 404
+    profile = client.get(f"/debug/profile/{profile_id}", headers={"X-Profile": "s3cret"})
+    assert profile.status_code == 200 and profile.mimetype == "text/plain"
+    missing = client.get("/debug/profile/unknown", headers={"X-Profile": "s3cret"})
+    assert missing.status_code == 404 and missing.get_json() == {"error": "Profile not found or expired"}
+
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_the_profiler_samples_the_profiled_thread():
+    worker = threading.Thread(target=busy_work, args=(0.2,))
+    worker.start()
+    profiler = SamplingProfiler(worker.ident, interval=0.001).start()
+    worker.join()
+    samples = profiler.stop()
+    assert samples
+    lines = profiler.collapsed().splitlines()
+    assert all(re.fullmatch(r"\S+ \d+", line) for line in lines)
+    assert any("test_metrics.py:busy_work" in line for line in lines)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == sum(samples.values())
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from models.ml_scorer import FEATURE_NAMES, TreeEnsemble, load_model, training_rows
+from models.password_analyzer import PasswordAnalyzer
+
+LENGTH, ENTROPY, LOG10_CRACK_SECONDS = (FEATURE_NAMES.index(name)
+                                        for name in ("length", "entropy", "log10_crack_seconds"))
+
+
+def small_ensemble(feature_names=FEATURE_NAMES):
+    """Two hand-built trees over weak/strong: length then entropy, and crack time"""
+    leaf = -1
+    return TreeEnsemble(
+        roots=[0, 5],
+        feature=[LENGTH, leaf, ENTROPY, leaf, leaf, LOG10_CRACK_SECONDS, leaf, leaf],
+        threshold=[8.5, 0.0, 40.0, 0.0, 0.0, 3.0, 0.0, 0.0],
+        left=[1, 1, 3, 3, 4, 6, 6, 7],
+        right=[2, 1, 4, 3, 4, 7, 6, 7],
+        value=[0.5, 0.5, 0.8, 0.2, 0.3, 0.7, 0.6, 0.4, 0.1, 0.9,
+               0.5, 0.5, 0.9, 0.1, 0.3, 0.7],
+        metadata={"feature_names": list(feature_names), "classes": ["weak", "strong"], "model_version": "test-1"},
+    )
+
+
+def sample_passwords(count=400):
+    rng = random.Random(3)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!@#$%^&*"
+    passwords = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 24))) for _ in range(count)]
+    return passwords + ["password", "qwerty1999", "Tr0ub4dor&3"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    model = small_ensemble()
+    path = str(tmp_path / "strength_model.bin")
+    model.save(path)
+    loaded = load_model(path)
+    assert loaded.metadata == model.metadata
+    assert loaded.classes == ("weak", "strong") and loaded.model_version == "test-1"
+    assert loaded.max_depth == model.max_depth == 2
+    rows = [[length] + [0] * 6 + [entropy, crack] + [0] * 6
+            for length in (4, 12) for entropy in (10, 60) for crack in (0, 9)]
+    assert loaded.predict_proba(rows) == model.predict_proba(rows)
+    # Short passwords go left in the first tree; fast cracks go left in the second
+    assert model.predict_proba_one(rows[0]) == [(0.8 + 0.9) / 2, (0.2 + 0.1) / 2]
+
+
+def test_load_rejects_other_files_and_features(tmp_path):
+    garbage = tmp_path / "garbage.bin"
+    garbage.write_bytes(b"not a model" * 10)
+    with pytest.raises(ValueError, match="is not a version"):
+        load_model(str(garbage))
+
+    path = str(tmp_path / "renamed.bin")
+    small_ensemble(FEATURE_NAMES[:-1] + ("pattern_something_else",)).save(path)
+    with pytest.raises(ValueError, match="trained on different features"):
+        load_model(path)
+
+
+def test_batch_probabilities_equal_single_rows_bit_for_bit(analyzer):
+    pytest.importorskip("numpy")
+    model = small_ensemble()
+    rows = training_rows(analyzer, sample_passwords())
+    assert model.predict_proba(rows) == [model.predict_proba_one(row) for row in rows]
+
+
+def test_analysis_with_and_without_a_model(tmp_path, analyzer):
+    passwords = sample_passwords(100)
+    assert analyzer.ml_model is None
+    assert {result.ml_strength for result in analyzer.analyze_many(passwords)} == {None}
+    assert analyzer.analyze_password("Tr0ub4dor&3").ml_strength is None
+
+    path = str(tmp_path / "strength_model.bin")
+    small_ensemble().save(path)
+    scored = PasswordAnalyzer(ml_model_path=path, leaked_password_db_path=None)
+    single = [scored.analyze_password(password, include_suggestions=False) for password in passwords]
+    assert all(0 <= result.ml_strength <= 1 for result in single)
+    assert list(scored.analyze_many(passwords)) == single
+    # Only ml_strength depends on the model
+    unscored = [analyzer.analyze_password(password, include_suggestions=False) for password in passwords]
+    assert [result.score for result in single] == [result.score for result in unscored]
@@ -0,0 +1,69 @@
+import random
+import re
+import time
+
+from models.pattern_detector import PatternDetector
+from models.wordlist import CompactDawg
+
+
+def detector():
+    return PatternDetector(CompactDawg.from_words(["password", "admin"]))
+
+
+def test_repeats_are_reported_once_per_run_at_full_length():
+    spans = detector().find_spans("aaaab\n\n\nbbb")
+    repeats = [(start, end) for start, end, label in spans if label == "repeated_characters"]
+    # Newlines never count, as '.' doesn't match them
+    assert repeats == [(0, 4), (8, 11)]
+
+
+def test_year_inside_date_and_repeat_overlap():
+    spans = detector().find_spans("1111x2020")
+    assert (0, 4, "repeated_characters") in spans
+    assert (0, 4, "date") in spans
+    assert (5, 9, "year") in spans
+
+
+def test_long_runs_scan_in_linear_time():
+    started = time.perf_counter()
+    spans = detector().find_spans("x" * 200000)
+    assert time.perf_counter() - started < 2
+    assert spans == [(0, 200000, "repeated_characters")]
+
+
+def test_api_rejects_overlong_passwords(client):
+    import app
+
+    response = client.post("/analyze", json={"password": "x" * (app.MAX_PASSWORD_LENGTH + 1)})
+    assert response.status_code == 400
+    assert client.post("/analyze", json={"password": "x" * app.MAX_PASSWORD_LENGTH}).status_code == 200
+    assert client.post("/leak_check", json={"password": "x" * (app.MAX_PASSWORD_LENGTH + 1)}).status_code == 400
+    response = client.post("/policy/check", json={"policy": {"min_length": 3},
+                                                  "passwords": ["abcd", "x" * (app.MAX_PASSWORD_LENGTH + 1)]})
+    assert response.status_code == 400
+
+
+def reference_labels(password, words):
+    """The analyzer's original regex and substring checks, in reporting order"""
+    lowered = password.lower()
+    checks = [
+        ("sequential_numbers", any(f"{i}{i + 1}{i + 2}" in password for i in range(8))),
+        ("repeated_characters", re.search(r"(.)\1{2,}", password)),
+        ("keyboard_pattern", any(walk in lowered for walk in ["qwerty", "asdfgh", "zxcvbn"])),
+        ("common_word", any(word in lowered for word in words)),
+        ("year", re.search(r"19\d{2}|20\d{2}", password)),
+        ("date", re.search(r"(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])", password)),
+    ]
+    return [label for label, found in checks if found]
+
+
+def test_labels_match_the_reference_regexes(analyzer):
+    rng = random.Random(11)
+    words = analyzer.DEFAULT_COMMON_WORDS
+    pieces = words + ["qwerty", "ASDFGH", "zxcvbn", "123", "789", "1999", "2024", "0229", "1231", "aaa", "Zzz",
+                      "\n\n\n", "١٢٣", "٢٠٢٤", "İ", "ß", "!", "x", "7"]
+    passwords = ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 5))) for _ in range(3000)]
+    passwords += ["".join(rng.choice("0123456789aA!\n") for _ in range(rng.randint(1, 12))) for _ in range(3000)]
+    detector = analyzer.pattern_detector
+    mismatches = {pwd: detector.detect(pwd) for pwd in passwords if detector.detect(pwd) != reference_labels(pwd, words)}
+    assert mismatches == {}
@@ -0,0 +1,95 @@
+import pytest
+
+from models.policy import PasswordPolicy
+
+FULL_SPEC = {"min_score": 50, "min_crack_seconds": 60, "banned_patterns": ["year"], "reject_leaked_variants": True,
+             "reject_leaked": True, "banned_words": ["acme"], "max_repeats": 2, "min_classes": 3,
+             "max_length": 64, "min_length": 10}
+
+
+def test_plan_runs_the_cheapest_rules_first():
+    plan = [step.rule for step in PasswordPolicy(FULL_SPEC).plan]
+    assert plan == ["length", "character_classes", "max_repeats", "banned_words", "reject_leaked",
+                    "reject_leaked_variants", "banned_patterns", "min_crack_seconds", "min_score"]
+    assert [step.rule for step in PasswordPolicy({"reject_leaked": False, "min_length": 0}).plan] == []
+
+
+@pytest.mark.parametrize("spec, error", [
+    ({"min_lenght": 8}, "Unknown policy keys"),
+    ({"min_length": 12, "max_length": 8}, "max_length must not be less than min_length"),
+    ({"min_length": True}, "min_length must be an integer"),
+    ({"min_classes": 5}, "min_classes must be at most 4"),
+    ({"required_classes": ["upper", "emoji"]}, "required_classes has unknown values ['emoji']"),
+    ({"banned_words": [""]}, "banned_words must be a list of non-empty strings"),
+    ({"reject_leaked": 1}, "reject_leaked must be true or false"),
+    ({"reject_leaked": 0}, "reject_leaked must be true or false"),
+    ({"reject_leaked": ""}, "reject_leaked must be true or false"),
+    ({"reject_leaked": []}, "reject_leaked must be true or false"),
+    ({"reject_leaked_variants": 0}, "reject_leaked_variants must be true or false"),
+    ({"min_crack_seconds": -1}, "min_crack_seconds must be a non-negative number"),
+    ([], "A policy must be a JSON object"),
+])
+def test_invalid_policies_are_rejected(spec, error):
+    with pytest.raises(ValueError, match=error.replace("[", r"\[").replace("]", r"\]")):
+        PasswordPolicy(spec)
+
+
+def test_check_stops_at_the_first_violation(analyzer):
+    policy = PasswordPolicy(FULL_SPEC)
+    result = policy.check("acme", analyzer)
+    assert not result.compliant
+    assert [violation.rule for violation in result.violations] == ["length"]
+    assert result.checks_run == 1
+
+    result = policy.check("acme", analyzer, fail_fast=False)
+    assert [violation.rule for violation in result.violations] == [
+        "length", "character_classes", "banned_words", "min_crack_seconds", "min_score"]
+    assert result.checks_run == len(policy.plan)
+
+    result = policy.check("Tr0ub4dor&3x!kq", analyzer)
+    assert result.compliant and result.violations == [] and result.checks_run == len(policy.plan)
+
+
+def test_check_many_looks_up_leaks_once_for_the_survivors(analyzer, monkeypatch):
+    index = analyzer.leak_index
+    lookups = []
+    contains_many = index.contains_many
+    monkeypatch.setattr(index, "contains_many", lambda digests: lookups.append(list(digests)) or contains_many(digests))
+    monkeypatch.setattr(index, "contains", lambda digest: pytest.fail("checked a single digest"))
+
+    policy = PasswordPolicy({"min_length": 6, "reject_leaked": True})
+    passwords = ["short", "password", "Kq7!vLz2", "password", "letmein", "abc"]
+    results = policy.check_many(passwords, analyzer)
+    assert lookups == [[index.digest(password) for password in ["password", "Kq7!vLz2", "letmein"]]]
+    assert [result.compliant for result in results] == [False, False, True, False, False, False]
+    assert [result.violations[0].rule for result in results if not result.compliant] == [
+        "length", "reject_leaked", "reject_leaked", "reject_leaked", "length"]
+    monkeypatch.undo()
+    assert results == [policy.check(password, analyzer) for password in passwords]
+
+
+def test_policy_check_route(client):
+    body = {"policy": {"min_length": 8, "reject_leaked": True}, "passwords": ["password", "Kq7!vLz2", "abc"]}
+    response = client.post("/policy/check?all=true", json=body)
+    assert response.status_code == 200
+    assert response.get_json() == {"results": [
+        {"compliant": False, "violations": [{"rule": "reject_leaked",
+                                             "message": "Must not appear in a known password leak"}]},
+        {"compliant": True, "violations": []},
+        {"compliant": False, "violations": [{"rule": "length", "message": "Must be at least 8 characters long"}]},
+    ]}
+
+    response = client.post("/policy/check", json={"policy": {"min_classes": 2}, "password": "abcdefgh"})
+    assert response.get_json()["compliant"] is False
+
+
+@pytest.mark.parametrize("body, status, error", [
+    ({"policy": "nope", "password": "x"}, 404, "Unknown policy 'nope'"),
+    ({"policy": {"reject_leaked": 0}, "password": "x"}, 400, "reject_leaked must be true or false"),
+    ({"policy": {"min_length": 8}, "passwords": "x"}, 400, "passwords must be a list of strings"),
+    ({"policy": {"min_length": 8}, "password": 5}, 400, "password must be a string"),
+])
+def test_bad_policy_requests(client, body, status, error):
+    response = client.post("/policy/check", json=body)
+    assert response.status_code == status
+    assert response.get_json() == {"error": error}
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("flask")
+import app as wsgi  # noqa: E402
+
+
+def test_range_route(client):
+    digest = wsgi.analyzer.leak_index.digest("password").hex().upper()
+    response = client.get(f"/range/{digest[:5].lower()}")
+    assert response.status_code == 200
+    assert response.headers["X-Hash-Algorithm"] == "sha256"
+    assert digest[5:] in response.get_data(as_text=True).split("\r\n")
+
+    again = client.get(f"/range/{digest[:5]}", headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+
+
+@pytest.mark.parametrize("path, error", [
+    ("/range/abcd", "prefix must be 5 hex characters"),
+    ("/range/abcdg", "prefix must be 5 hex characters"),
+    ("/range/abcde?hash=sha1", "the leak index uses sha256, not sha1"),
+])
+def test_bad_range_requests(client, path, error):
+    response = client.get(path)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
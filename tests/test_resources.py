@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from models.generator import PasswordGenerator
+from models.password_analyzer import PasswordAnalyzer
+from models.resources import LazyResource, LazyResources
+
+
+class Loader(LazyResources):
+    def __init__(self):
+        LazyResources.__init__(self)
+        self.calls = []
+
+    @LazyResource
+    def words(self):
+        self.calls.append("words")
+        time.sleep(0.05)
+        return ["alpha", "beta"]
+
+    @LazyResource
+    def index(self):
+        self.calls.append("index")
+        time.sleep(0.05)
+        return {word: position for position, word in enumerate(self.words)}
+
+
+def test_concurrent_first_accesses_load_once():
+    loader = Loader()
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def access():
+        barrier.wait()
+        seen.append(loader.index)
+
+    threads = [threading.Thread(target=access) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == ["index", "words"]
+    assert all(index is seen[0] for index in seen)
+    # Loading the words inside the index loader is reported under the words
+    assert set(loader.load_times) == {"words", "index"}
+    assert 0.05 <= loader.load_times["index"] < 0.05 + loader.load_times["words"]
+
+
+def test_preload_reports_every_resource():
+    loader = Loader()
+    assert not loader.is_ready() and Loader.resource_names() == ["words", "index"]
+    assert set(loader.preload()) == {"words", "index"}
+    assert loader.is_ready() and loader.is_ready("words")
+    loader.preload()
+    assert loader.calls == ["words", "index"]
+
+
+def test_healthz_reports_loading_until_preloaded(client, monkeypatch):
+    import app as wsgi
+
+    analyzer = PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=None)
+    monkeypatch.setattr(wsgi, "analyzer", analyzer)
+    monkeypatch.setattr(wsgi, "generator", PasswordGenerator(analyzer))
+    monkeypatch.setattr(wsgi, "_preload_thread", None)
+
+    response = client.get("/healthz")
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "loading"
+
+    # The first probe started loading in the background
+    deadline = time.monotonic() + 10
+    while (response := client.get("/healthz")).status_code != 200:
+        if time.monotonic() > deadline:
+            pytest.fail("resources never finished loading")
+        time.sleep(0.01)
+    report = response.get_json()
+    assert report["ready"] and report["status"] == "ready"
+    assert set(report["load_seconds"]) == set(PasswordAnalyzer.resource_names() + PasswordGenerator.resource_names())
+    assert report["total_load_seconds"] == pytest.approx(sum(report["load_seconds"].values()), abs=1e-3)
@@ -0,0 +1,81 @@
+import json
+import threading
+
+import pytest
+
+from models.leak_segments import create_store, ingest
+from models.password_analyzer import PasswordAnalyzer, PasswordStrengthResult
+from models.result_cache import AnalysisCache, CacheServer, UnixSocketCacheBackend
+
+
+@pytest.fixture
+def cache_socket(tmp_path):
+    path = str(tmp_path / "cache.sock")
+    server = CacheServer(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def worker(socket_path):
+    """An analyzer as one app worker builds it, sharing the cache server"""
+    cache = AnalysisCache(secret=b"shared", backend=UnixSocketCacheBackend(socket_path),
+                          value_type=PasswordStrengthResult, private_fields=("suggestions",))
+    return PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=None, result_cache=cache)
+
+
+def test_shared_entries_never_contain_the_password(cache_socket):
+    password = "Tr0ub4dor&3horse"
+    first, second = worker(cache_socket), worker(cache_socket)
+    expected = first.analyze_password(password)
+    # The last suggestion is a variant of the password itself
+    example = expected.suggestions[-1].rpartition(": ")[2]
+    assert example
+
+    backend = UnixSocketCacheBackend(cache_socket)
+    payload = backend.get(first.result_cache.key_for(password, "full:" + first.leak_index.build_id))
+    assert payload is not None and b"suggestions" not in payload
+    assert password.encode() not in payload and example.encode() not in payload
+
+    # The second worker takes the shared entry and rebuilds the suggestions itself
+    result = second.analyze_password(password)
+    assert second.result_cache.backend_hits == 1
+    assert result == expected
+
+
+def test_lite_results_from_the_shared_cache_have_no_suggestions(cache_socket):
+    first, second = worker(cache_socket), worker(cache_socket)
+    first.analyze_password("correcthorse", include_suggestions=False)
+    result = second.analyze_password("correcthorse", include_suggestions=False)
+    assert second.result_cache.backend_hits == 1
+    assert result.suggestions == []
+
+
+def test_unreadable_shared_entries_are_misses(cache_socket):
+    first = worker(cache_socket)
+    expected = first.analyze_password("correcthorse", include_suggestions=False)
+    key = first.result_cache.key_for("correcthorse", "lite:" + first.leak_index.build_id)
+    backend = UnixSocketCacheBackend(cache_socket)
+    # An entry from a deploy with another result field, then corrupted ones
+    for payload in (json.dumps({**json.loads(backend.get(key)), "renamed_field": 1}).encode(), b"{not json", b"[]"):
+        backend.set(key, payload, 60)
+        other = worker(cache_socket)
+        assert other.analyze_password("correcthorse", include_suggestions=False) == expected
+        assert other.result_cache.backend_hits == 0 and other.result_cache.stats()["backend_rejected"] == 1
+
+
+def test_cached_results_follow_leak_store_ingests(tmp_path):
+    store = str(tmp_path / "store")
+    create_store(store, bloom_fpr=None)
+    cache = AnalysisCache(value_type=PasswordStrengthResult)
+    analyzer = PasswordAnalyzer(ml_model_path=None, leaked_password_db_path=store, result_cache=cache)
+    analyzer.leak_index.check_interval = 0
+    assert not analyzer.analyze_password("Tr0ub4dor&3").is_compromised
+
+    wordlist = tmp_path / "leaked.txt"
+    wordlist.write_text("Tr0ub4dor&3\n")
+    ingest(store, [str(wordlist)])
+    assert analyzer.analyze_password("Tr0ub4dor&3").is_compromised
+    assert cache.hits == 0
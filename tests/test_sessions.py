@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("flask")
+import app as wsgi  # noqa: E402
+
+
+def update(client, session_id, body):
+    return client.post(f"/session/{session_id}?mode=lite", json=body)
+
+
+def test_full_password_updates_work_on_a_worker_without_the_session(client):
+    # As if another worker had created it
+    response = update(client, "started-elsewhere", {"password": "Summer2024!"})
+    assert response.status_code == 200
+    expected = wsgi.analyzer.analyze_password("Summer2024!", include_suggestions=False)
+    assert response.get_json()["score"] == expected.score
+    assert response.get_json()["length"] == 11
+
+
+def test_edits_need_the_session(client):
+    response = update(client, "started-elsewhere-too", {"delete": 1, "append": "x"})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"delete": "one"}, "delete must be a non-negative integer"),
+    ({"delete": -1}, "delete must be a non-negative integer"),
+    ({"append": 5}, "append must be a string"),
+    ({"password": 5}, "password must be a string"),
+    ({"password": "x" * (wsgi.MAX_PASSWORD_LENGTH + 1)},
+     f"password may be at most {wsgi.MAX_PASSWORD_LENGTH} characters"),
+    ({"append": "x" * (wsgi.MAX_PASSWORD_LENGTH + 1)},
+     f"password may be at most {wsgi.MAX_PASSWORD_LENGTH} characters"),
+])
+def test_bad_edits_are_rejected(client, body, error):
+    session_id = client.post("/session").get_json()["session_id"]
+    response = update(client, session_id, body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_non_object_bodies_are_rejected(client):
+    session_id = client.post("/session").get_json()["session_id"]
+    assert update(client, session_id, ["password"]).status_code == 400
@@ -0,0 +1,29 @@
+import random
+import string
+
+import pytest
+
+vectorized = pytest.importorskip("models.vectorized")
+
+
+def corpus(count=2000, seed=7):
+    rng = random.Random(seed)
+    alphabet = string.printable[:94] + "éßİﬀ密码ǅΣ"
+    passwords = ["".join(rng.choice(alphabet[:rng.randint(3, len(alphabet))]) for _ in range(rng.randint(1, 40)))
+                 for _ in range(count)]
+    # Patterns, leaks, caseless letters and the vector length boundary
+    return passwords + ["", "aaaa", "password", "Password1999!", "密码安全", "x" * vectorized.MAX_VECTOR_LENGTH,
+                        "xy" * vectorized.MAX_VECTOR_LENGTH]
+
+
+def test_batch_entropy_is_bit_identical(analyzer):
+    passwords = [password for password in corpus() if password]
+    codes, lengths = vectorized.encode_batch(passwords)
+    entropies = vectorized.batch_entropy(codes, lengths).tolist()
+    assert entropies == [analyzer._calculate_entropy(analyzer.extract_features(pwd)) for pwd in passwords]
+
+
+def test_batch_results_equal_scalar_results(analyzer):
+    passwords = corpus()
+    batch = list(analyzer.analyze_many(passwords, include_suggestions=True))
+    assert batch == [analyzer.analyze_password(password) for password in passwords]
@@ -0,0 +1,42 @@
+import os
+import random
+import stat
+
+from models.wordlist import CompactDawg, load_dictionary, main
+
+WORDS = ["tap", "taps", "top", "tops", "password", "passwords", "pass", "pässe", "top"]
+
+
+def test_the_graph_is_minimal():
+    dawg = CompactDawg.from_words(["tops", "tap", "top", "taps"])
+    # root -t-> ? -a/o-> ? -p-> (final) -s-> (final): "ta" and "to" share one node
+    assert len(dawg._final) == 5
+    assert list(dawg) == ["tap", "taps", "top", "tops"]
+    assert "tap" in dawg and "ta" not in dawg and "tapss" not in dawg
+
+
+def test_external_sort_builds_the_same_graph(tmp_path):
+    rng = random.Random(4)
+    words = ["".join(rng.choice("abcdeé") for _ in range(rng.randint(1, 7))) for _ in range(3000)] + WORDS
+    in_memory = CompactDawg.from_words(words)
+    spilled = CompactDawg.from_words(words, chunk_size=50, run_directory=str(tmp_path))
+    assert list(spilled) == list(in_memory) == sorted(set(words))
+    for name in ("_edge_start", "_edge_label", "_edge_target", "_final"):
+        assert list(getattr(spilled, name)) == list(getattr(in_memory, name))
+    # The sorted runs are removed once the graph is built
+    assert os.listdir(tmp_path) == []
+
+
+def test_build_and_cache_dictionary_files(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("\n".join(WORDS + ["ab", "  Admin  "]) + "\n", encoding="utf-8")
+    output = tmp_path / "words.dawg"
+    assert main(["build", str(wordlist), "-o", str(output), "--chunk-size", "3"]) == 0
+    dawg = CompactDawg.load(str(output))
+    assert list(dawg) == sorted(set(WORDS) | {"admin"})
+    assert list(dawg.find_all("xpasswords!")) == [(1, 5), (1, 9), (1, 10)]
+
+    cached = load_dictionary(str(wordlist))
+    assert list(cached) == list(dawg)
+    assert sorted(os.listdir(tmp_path)) == ["words.dawg", "words.txt", "words.txt.dawg"]
+    assert stat.S_IMODE(os.stat(tmp_path / "words.txt.dawg").st_mode) == 0o644
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from models.worker_pool import DeadlineExceeded, PoolUnavailable, WorkerPool
+
+
+@pytest.fixture
+def pool():
+    """One worker and no queue, so a single task fills it"""
+    pool = WorkerPool(1, 0)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def soon(seconds=5):
+    return time.time() + seconds
+
+
+def test_a_full_pool_refuses_tasks_until_a_slot_frees(pool):
+    async def scenario():
+        busy = asyncio.ensure_future(pool.run(time.sleep, 0.3, deadline=soon()))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolUnavailable, match="all workers are busy"):
+            await pool.run(os.getpid, deadline=soon())
+        await busy
+        return await pool.run(os.getpid, deadline=soon())
+
+    assert asyncio.run(scenario()) != os.getpid()
+    assert pool.stats()["rejected"] == 1 and pool.stats()["pending"] == 0
+
+
+def test_tasks_past_their_deadline_are_abandoned(pool):
+    async def scenario():
+        with pytest.raises(DeadlineExceeded, match="before the task started"):
+            await pool.run(os.getpid, deadline=time.time() - 1)
+        with pytest.raises(DeadlineExceeded, match="before the task finished"):
+            await pool.run(time.sleep, 1, deadline=soon(0.1))
+        # Waiting for a slot gives up at the deadline too
+        with pytest.raises(DeadlineExceeded, match="waiting for a worker"):
+            await pool.run(os.getpid, deadline=soon(0.1), wait=True)
+
+    asyncio.run(scenario())
+    assert pool.stats()["expired"] == 3
+
+
+def test_the_pool_restarts_after_a_worker_dies(pool):
+    async def scenario():
+        first = await pool.run(os.getpid, deadline=soon())
+        with pytest.raises(PoolUnavailable, match="a worker process died"):
+            await pool.run(os._exit, 1, deadline=soon())
+        return first, await pool.run(os.getpid, deadline=soon())
+
+    first, second = asyncio.run(scenario())
+    assert first != second
+    assert pool.stats()["restarts"] == 1
+
+
+@pytest.fixture
+def asgi(monkeypatch):
+    """asgi.py with a one-worker pool, forked as the lifespan startup would"""
+    pytest.importorskip("flask")
+    import asgi
+
+    asgi.wsgi.preload()
+    pool = WorkerPool(1, 0, initializer=asgi._init_worker)
+    monkeypatch.setattr(asgi, "pool", pool)
+    pool.start()
+    yield asgi
+    # A worker stuck on a lock would never finish its task
+    for process in multiprocessing.active_children():
+        process.kill()
+    pool.shutdown()
+
+
+async def request(asgi, path, body, headers=()):
+    """Call the ASGI app and return the status, headers and JSON body"""
+    messages = []
+    received = iter([{"type": "http.request", "body": json.dumps(body).encode()}])
+
+    async def receive():
+        return next(received)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b"", "headers": list(headers)}
+    await asgi.app(scope, receive, send)
+    return (messages[0]["status"], dict(messages[0]["headers"]),
+            json.loads(b"".join(message.get("body", b"") for message in messages[1:])))
+
+
+def test_asgi_answers_503_and_504_when_workers_cannot_help(asgi):
+    async def scenario():
+        busy = asyncio.ensure_future(asgi.pool.run(time.sleep, 0.5, deadline=soon()))
+        await asyncio.sleep(0)
+        status, headers, body = await request(asgi, "/analyze", {"password": "Tr0ub4dor&3"})
+        assert (status, headers[b"retry-after"], body) == (503, b"1", {"error": "all workers are busy"})
+        await busy
+
+        status, _, body = await request(asgi, "/analyze", {"password": "Tr0ub4dor&3"},
+                                        [(b"x-request-timeout", b"0.000001")])
+        assert status == 504 and body["error"].startswith("deadline passed")
+
+        status, _, body = await request(asgi, "/analyze", {"password": "Tr0ub4dor&3"})
+        assert status == 200 and body["score"] > 0
+
+    asyncio.run(scenario())
+
+
+def test_replacement_workers_do_not_inherit_held_locks(asgi):
+    # Another thread of the front end is inside the result cache when the pool re-forks
+    store = asgi.wsgi.result_cache._store
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with store._lock:
+            holding.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait()
+
+    async def scenario():
+        with pytest.raises(PoolUnavailable, match="a worker process died"):
+            await asgi.pool.run(os._exit, 1, deadline=soon())
+        return await request(asgi, "/analyze", {"password": "correct horse"}, [(b"x-request-timeout", b"3")])
+
+    try:
+        status, _, body = asyncio.run(scenario())
+    finally:
+        release.set()
+        holder.join()
+    assert status == 200 and body["time_to_crack"]